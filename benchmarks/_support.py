@@ -0,0 +1,46 @@
+"""Utilitários compartilhados pelos scripts de benchmark do backend."""
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SERVER_DIR = os.path.join(ROOT, "src", "server")
+
+
+def load_app(database_path):
+    """Importa o app Flask apontando para o SQLite informado (precisa vir antes do import)."""
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.abspath(database_path)}"
+    if SERVER_DIR not in sys.path:
+        sys.path.insert(0, SERVER_DIR)
+    import app as app_module
+    return app_module
+
+
+def auth_header(app_module):
+    with app_module.app.app_context():
+        token = app_module.create_access_token(identity="benchmark")
+    return {"Authorization": f"Bearer {token}"}
+
+
+def synthetic_cpf(client_id):
+    """CPF válido (só dígitos) do cliente sintético de id `client_id` (ver seed.py)."""
+    from seed import synthetic_cpf as cpf_for
+    return cpf_for(client_id)
+
+
+def synthetic_phone(client_id):
+    """Celular (E.164) do cliente sintético de id `client_id` (ver seed.py)."""
+    from seed import synthetic_phone as phone_for
+    return phone_for(client_id)
+
+
+def build_portfolio(app_module, clients, contracts_per_client, installments_per_contract, seed=42,
+                    actions_per_client=0):
+    """Cria a carteira sintética de `flask seed` e devolve o número de parcelas."""
+    from models import db
+    from seed import seed_portfolio
+
+    with app_module.app.app_context():
+        db.create_all()
+        stats = seed_portfolio(clients, contracts_per_client, installments_per_contract,
+                               actions_per_client, seed=seed)
+    return stats["installments"]
@@ -0,0 +1,65 @@
+"""Mede a vazão de registro de ações: POST /api/actions um a um vs. POST /api/actions/batch.
+
+Uso (na raiz do projeto):
+
+    python benchmarks/bench_actions_batch.py --actions 10000 --single 1000
+
+O modo individual é medido com `--single` chamadas (uma transação cada) e extrapolado para
+ações/s; o lote envia `--actions` ações em uma única chamada.
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+import _support
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=10000)
+    parser.add_argument("--actions", type=int, default=10000, help="ações enviadas no lote")
+    parser.add_argument("--single", type=int, default=1000, help="chamadas individuais medidas")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app_module = _support.load_app(os.path.join(tmp, "bench.db"))
+        _support.build_portfolio(app_module, args.clients, 1, 1)
+        client = app_module.app.test_client()
+        headers = _support.auth_header(app_module)
+
+        rng = random.Random(7)
+
+        def payload():
+            client_id = rng.randint(1, args.clients)
+            return {
+                "clientCpf": _support.synthetic_cpf(client_id),
+                "contractNumber": f"{client_id:09d}",
+                "selectedInstallmentNumber": 1,
+                "actionType": rng.choice(["Ligação", "SMS", "E-mail"]),
+                "notes": "Resultado da campanha",
+            }
+
+        start = time.perf_counter()
+        for _ in range(args.single):
+            resp = client.post("/api/actions", json=payload(), headers=headers)
+            assert resp.status_code == 201, resp.get_data(as_text=True)
+        single_elapsed = time.perf_counter() - start
+
+        actions = [payload() for _ in range(args.actions)]
+        start = time.perf_counter()
+        resp = client.post("/api/actions/batch", json={"actions": actions}, headers=headers)
+        batch_elapsed = time.perf_counter() - start
+        assert resp.status_code == 201, resp.get_data(as_text=True)[:500]
+
+    single_rate = args.single / single_elapsed
+    batch_rate = args.actions / batch_elapsed
+    print(f"individual: {args.single} chamadas em {single_elapsed:.2f}s -> {single_rate:,.0f} ações/s "
+          f"(estimativa para {args.actions}: {args.actions / single_rate:.1f}s)")
+    print(f"lote:       {args.actions} ações em {batch_elapsed:.2f}s -> {batch_rate:,.0f} ações/s "
+          f"({batch_rate / single_rate:.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
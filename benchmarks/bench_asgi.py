@@ -0,0 +1,200 @@
+"""Teste de carga do servidor síncrono contra um protótipo assíncrono (ASGI) das rotas mais chamadas.
+
+Uso (na raiz do projeto):
+
+    python benchmarks/bench_asgi.py --clients 50000 --concurrency 64 --requests 3000
+
+Registro da avaliação do modo ASGI, que não foi adotado: o protótipo abaixo atende login e
+`/api/client_by_cpf` com views Starlette sobre um engine SQLAlchemy assíncrono (aiosqlite) e o
+hash de senha em um pool de threads, como proposto; o servidor síncrono é o app Flask no
+Werkzeug com threads. Os dois sobem em subprocessos sobre a mesma base sintética e recebem a
+mesma carga: logins (hash de senha) e consultas de cliente por CPF, na proporção de
+`--login-ratio`, com `--concurrency` requisições simultâneas. Para cada servidor são informados
+req/s, p50 e p95.
+
+Depende de pacotes que o backend não usa: starlette, uvicorn, aiosqlite e httpx.
+"""
+import argparse
+import asyncio
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+import _support
+
+USERNAME, PASSWORD = "benchmark", "benchmark"
+PASSWORD_HASH_WORKERS = 4
+ASYNC_POOL_SIZE = 20
+
+
+def async_prototype(app_module, database_path):
+    """App Starlette com login e /api/client_by_cpf assíncronos, nas mesmas respostas do Flask."""
+    from concurrent.futures import ThreadPoolExecutor
+
+    from flask_jwt_extended import decode_token
+    from sqlalchemy import select
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+    from sqlalchemy.orm import selectinload
+    from starlette.applications import Starlette
+    from starlette.responses import JSONResponse
+    from starlette.routing import Route
+
+    from cpf import cpf_digits
+    from models import Client, User
+
+    flask_app = app_module.app
+    engine = create_async_engine(f"sqlite+aiosqlite:///{database_path}", pool_size=ASYNC_POOL_SIZE)
+    sessions = async_sessionmaker(engine, expire_on_commit=False)
+    hash_pool = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="password-hash")
+
+    async def login(request):
+        payload = await request.json()
+        async with sessions() as session:
+            user = await session.scalar(select(User).where(User.username == payload.get("username")).limit(1))
+        loop = asyncio.get_running_loop()
+        if user is None or not await loop.run_in_executor(hash_pool, user.check_password, payload.get("password")):
+            return JSONResponse({"msg": "Nome de usuário ou senha inválidos"}, 401)
+        with flask_app.app_context():
+            token = app_module.create_access_token(identity=user.username)
+        return JSONResponse({"access_token": token})
+
+    async def client_by_cpf(request):
+        try:
+            with flask_app.app_context():
+                decode_token(request.headers.get("Authorization", "")[len("Bearer "):])
+        except Exception:
+            return JSONResponse({"msg": "Token inválido"}, 401)
+        digits = cpf_digits(request.query_params.get("cpf"))
+        async with sessions() as session:
+            client = await session.scalar(select(Client).options(selectinload(Client.phone_numbers))
+                                          .where(Client.cpf_digits == digits))
+            if client is None:
+                return JSONResponse({"msg": "Cliente não encontrado"}, 404)
+            return JSONResponse(app_module._client_to_dict(client))
+
+    async def index(request):
+        return JSONResponse({})
+
+    return Starlette(routes=[
+        Route("/", index),
+        Route("/api/login", login, methods=["POST"]),
+        Route("/api/client_by_cpf", client_by_cpf),
+    ])
+
+
+SERVERS = [
+    ("sync (werkzeug threaded)", [
+        sys.executable, "-c",
+        "import logging, sys, app; from werkzeug.serving import run_simple; "
+        "logging.getLogger('werkzeug').setLevel(logging.WARNING); "
+        "run_simple('127.0.0.1', int(sys.argv[1]), app.app, threaded=True)",
+        "{port}"]),
+    ("asgi (protótipo, uvicorn)", [
+        sys.executable, os.path.abspath(__file__), "--serve-async", "{port}", "--database", "{database}"]),
+]
+
+
+def _serve_async(port, database_path):
+    import uvicorn
+
+    app_module = _support.load_app(database_path)
+    uvicorn.run(async_prototype(app_module, os.path.abspath(database_path)), host="127.0.0.1", port=port,
+                log_level="warning", access_log=False)
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_until_up(base_url, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(base_url + "/", timeout=1)
+            return
+        except httpx.TransportError:
+            time.sleep(0.2)
+    raise RuntimeError(f"servidor em {base_url} não respondeu")
+
+
+async def _load(base_url, args):
+    rng = random.Random(7)
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        login = await client.post("/api/login", json={"username": USERNAME, "password": PASSWORD})
+        headers = {"Authorization": f"Bearer {login.json()['access_token']}"}
+        semaphore = asyncio.Semaphore(args.concurrency)
+        timings, errors = [], 0
+
+        async def one():
+            nonlocal errors
+            async with semaphore:
+                start = time.perf_counter()
+                if rng.random() < args.login_ratio:
+                    response = await client.post("/api/login", json={"username": USERNAME, "password": PASSWORD})
+                else:
+                    cpf = _support.synthetic_cpf(rng.randint(1, args.clients))
+                    response = await client.get("/api/client_by_cpf", params={"cpf": cpf}, headers=headers)
+                timings.append(time.perf_counter() - start)
+                errors += response.status_code != 200
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(args.requests)))
+        elapsed = time.perf_counter() - start
+
+    timings.sort()
+    return (args.requests / elapsed, statistics.median(timings) * 1000,
+            timings[int(len(timings) * 0.95) - 1] * 1000, errors)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=50000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--requests", type=int, default=3000)
+    parser.add_argument("--login-ratio", type=float, default=0.1)
+    parser.add_argument("--serve-async", type=int, metavar="PORTA", help=argparse.SUPPRESS)
+    parser.add_argument("--database", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.serve_async:
+        _serve_async(args.serve_async, args.database)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_path = os.path.join(tmp, "bench.db")
+        app_module = _support.load_app(database_path)
+        _support.build_portfolio(app_module, args.clients, 0, 0)
+        from models import db, User
+        with app_module.app.app_context():
+            user = User(username=USERNAME)
+            user.set_password(PASSWORD)
+            db.session.add(user)
+            db.session.commit()
+
+        env = {**os.environ, "DATABASE_URL": f"sqlite:///{database_path}"}
+        for label, command in SERVERS:
+            port = _free_port()
+            process = subprocess.Popen([part.format(port=port, database=database_path) for part in command],
+                                       cwd=_support.SERVER_DIR, env=env)
+            try:
+                base_url = f"http://127.0.0.1:{port}"
+                _wait_until_up(base_url)
+                throughput, p50, p95, errors = asyncio.run(_load(base_url, args))
+            finally:
+                process.terminate()
+                process.wait()
+            print(f"{label:28s} {throughput:8.0f} req/s | p50 {p50:7.1f} ms | p95 {p95:7.1f} ms"
+                  f" | erros {errors}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Mede a latência de /api/clients/search (FTS5) e /api/clients/by_phone sobre uma base grande.
+
+Uso (na raiz do projeto):
+
+    python benchmarks/bench_client_search.py --clients 2000000 --queries 500
+
+Sorteia buscas por prefixo de nome, prefixo de CPF e trecho de telefone e informa p50/p95/máx
+da função de busca (só banco) e da rota completa (JWT, serialização). A busca reversa por
+telefone é medida com números completos, em formatos variados, de clientes sorteados.
+"""
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+
+import _support
+
+
+def _percentiles(samples):
+    samples = sorted(samples)
+    return (statistics.median(samples) * 1000,
+            samples[int(len(samples) * 0.95) - 1] * 1000,
+            samples[-1] * 1000)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=200000)
+    parser.add_argument("--queries", type=int, default=300)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app_module = _support.load_app(os.path.join(tmp, "bench.db"))
+        start = time.perf_counter()
+        _support.build_portfolio(app_module, args.clients, 0, 0)
+        print(f"base com {args.clients} clientes criada em {time.perf_counter() - start:.1f}s")
+
+        from seed import FIRST_NAMES, LAST_NAMES
+        rng = random.Random(11)
+        queries = []
+        for _ in range(args.queries):
+            client_id = rng.randint(1, args.clients)
+            queries.append(rng.choice([
+                f"{rng.choice(FIRST_NAMES)[:3]} {rng.choice(LAST_NAMES)[:4]}",
+                _support.synthetic_cpf(client_id)[:6],
+                f"9{client_id // 10000 % 10000:04d}-{client_id % 10000:04d}",
+            ]))
+
+        from search import search_clients
+        with app_module.app.app_context():
+            search_clients(queries[0])
+            timings = []
+            for query in queries:
+                start = time.perf_counter()
+                search_clients(query)
+                timings.append(time.perf_counter() - start)
+        print("search_clients: p50 %.2f ms | p95 %.2f ms | máx %.2f ms" % _percentiles(timings))
+
+        client = app_module.app.test_client()
+        headers = _support.auth_header(app_module)
+        timings = []
+        for query in queries:
+            start = time.perf_counter()
+            resp = client.get("/api/clients/search", query_string={"q": query}, headers=headers)
+            timings.append(time.perf_counter() - start)
+            assert resp.status_code == 200
+        print("GET /api/clients/search: p50 %.2f ms | p95 %.2f ms | máx %.2f ms" % _percentiles(timings))
+
+        timings = []
+        for _ in range(args.queries):
+            client_id = rng.randint(1, args.clients)
+            e164 = _support.synthetic_phone(client_id)
+            area, local = e164[3:5], e164[5:]
+            number = rng.choice([f"({area}) {local[:5]}-{local[5:]}", e164, f"0{area}{local}"])
+            start = time.perf_counter()
+            resp = client.get("/api/clients/by_phone", query_string={"number": number}, headers=headers)
+            timings.append(time.perf_counter() - start)
+            assert resp.status_code == 200 and resp.get_json()[0]["id"] == client_id
+        print("GET /api/clients/by_phone: p50 %.2f ms | p95 %.2f ms | máx %.2f ms" % _percentiles(timings))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,302 @@
+"""Suíte de benchmark das rotas da API com orçamentos de latência, consultas SQL e memória.
+
+Uso (na raiz do projeto):
+
+    python benchmarks/bench_endpoints.py                           # small, medium e large
+    python benchmarks/bench_endpoints.py --sizes small --repeat 10
+    python benchmarks/bench_endpoints.py --update-baseline         # regrava o baseline
+
+Cada tamanho de carteira (SIZES) roda em um processo novo, sobre um SQLite temporário gerado
+pelo mesmo gerador de `flask seed`. Cada rota é chamada pelo test client do Flask `--repeat`
+vezes (as rotas pesadas, menos) com o cache de respostas descartado antes de cada chamada, para
+medir o trabalho da rota e não o acerto de cache.
+São registrados p50/p95 da latência, o número de comandos SQL por requisição (o maior entre as
+chamadas) e o pico de memória alocada pelo Python em uma chamada extra sob tracemalloc. Os
+comandos são contados pelo evento `before_cursor_execute` do engine, como na fixture
+`count_queries` dos testes, o que inclui os dois SELECTs da leitura da carteira na
+atualização de saldos (lidos pelo cursor do driver, mas executados pelo engine).
+
+O p95 é comparado com o baseline salvo em benchmarks/baselines/endpoints.json e cada métrica
+com o orçamento de benchmarks/budgets.json (valor único ou por tamanho). O script termina com
+código 1 se alguma rota exceder o orçamento ou responder com status inesperado.
+
+Ficam de fora o stream SSE (/api/stream/actions, que não termina) e /api/protected, que não
+exige JWT.
+"""
+import argparse
+import io
+import json
+import multiprocessing
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import namedtuple
+from datetime import datetime
+
+import _support
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BUDGETS_PATH = os.path.join(BENCH_DIR, "budgets.json")
+BASELINE_PATH = os.path.join(BENCH_DIR, "baselines", "endpoints.json")
+
+# Tamanho: (clientes, contratos por cliente, parcelas por contrato, ações por cliente)
+SIZES = {
+    "small": (1000, 3, 12, 4),
+    "medium": (10000, 3, 12, 4),
+    "large": (50000, 3, 12, 4),
+}
+METRICS = ("p95_ms", "queries", "peak_kib")
+# Rotas que leem a carteira inteira rodam menos vezes
+HEAVY_REPEAT = 3
+BATCH_SIZE = 100
+IMPORT_CLIENTS = 5
+
+Case = namedtuple("Case", "name method build status heavy", defaults=(200, False))
+
+
+def _client_id(ctx, index):
+    # Espalha as chamadas pela carteira de forma determinística
+    return index * 7919 % ctx["clients"] + 1
+
+
+def _cpf(ctx, index):
+    return _support.synthetic_cpf(_client_id(ctx, index))
+
+
+def _contract_number(ctx, index):
+    return f"{(_client_id(ctx, index) - 1) * ctx['contracts_per_client'] + 1:09d}"
+
+
+def _search(ctx, index):
+    from seed import FIRST_NAMES, LAST_NAMES
+    query = f"{FIRST_NAMES[index % len(FIRST_NAMES)][:3]} {LAST_NAMES[index % len(LAST_NAMES)][:4]}"
+    return {"path": "/api/clients/search", "query_string": {"q": query}}
+
+
+def _action(ctx, index):
+    return {"clientCpf": _cpf(ctx, index), "contractNumber": _contract_number(ctx, index),
+            "selectedInstallmentNumber": 1, "actionType": "Tentativa de contato por telefone",
+            "notes": "benchmark"}
+
+
+def _import_file(ctx, index):
+    # Cinco clientes novos (sempre os mesmos: a partir da segunda chamada a carga é um upsert)
+    lines = ["cpf,nome,telefones,contrato,tipo,parcela,vencimento,valor"]
+    for offset in range(1, IMPORT_CLIENTS + 1):
+        client_id = ctx["clients"] + offset
+        for number in range(1, ctx["installments"] + 1):
+            lines.append(f"{_support.synthetic_cpf(client_id)},Cliente Importado {offset},"
+                         f"{_support.synthetic_phone(client_id)},IMP{client_id},Empréstimo Pessoal,"
+                         f"{number},2026-{(number - 1) % 12 + 1:02d}-10,350.00")
+    content = ("\n".join(lines) + "\n").encode("utf-8")
+    return {"path": "/api/import", "data": {"file": (io.BytesIO(content), "carteira.csv")}}
+
+
+CASES = [
+    Case("GET /api/clients", "GET", lambda ctx, i: {"path": "/api/clients"}, heavy=True),
+    Case("GET /api/clients/search", "GET", _search),
+    Case("GET /api/clients/by_phone", "GET", lambda ctx, i: {
+        "path": "/api/clients/by_phone",
+        "query_string": {"number": _support.synthetic_phone(_client_id(ctx, i))}}),
+    Case("GET /api/client_by_cpf", "GET", lambda ctx, i: {
+        "path": "/api/client_by_cpf", "query_string": {"cpf": _cpf(ctx, i)}}),
+    Case("GET /api/contracts", "GET", lambda ctx, i: {
+        "path": "/api/contracts", "query_string": {"cpf": _cpf(ctx, i)}}),
+    Case("GET /api/clients/<cpf>/workspace", "GET", lambda ctx, i: {
+        "path": f"/api/clients/{_cpf(ctx, i)}/workspace"}),
+    Case("POST /api/register", "POST", lambda ctx, i: {
+        "path": "/api/register", "json": {"username": f"bench{i}", "password": "senha_bench"}}, 201),
+    Case("POST /api/login", "POST", lambda ctx, i: {
+        "path": "/api/login", "json": {"username": ctx["username"], "password": ctx["password"]}}),
+    Case("POST /api/logout", "POST", lambda ctx, i: {"path": "/api/logout"}),
+    Case("POST /api/actions", "POST", lambda ctx, i: {
+        "path": "/api/actions", "json": _action(ctx, i)}, 201),
+    Case("POST /api/actions/batch", "POST", lambda ctx, i: {
+        "path": "/api/actions/batch",
+        "json": {"actions": [_action(ctx, i * BATCH_SIZE + k) for k in range(BATCH_SIZE)]}}, 201),
+    Case("GET /api/actions/<client_id>", "GET", lambda ctx, i: {
+        "path": f"/api/actions/{_client_id(ctx, i)}"}),
+    Case("GET /api/actions/<client_id>/export", "GET", lambda ctx, i: {
+        "path": f"/api/actions/{_client_id(ctx, i)}/export"}),
+    Case("GET /api/actions/today_count", "GET", lambda ctx, i: {"path": "/api/actions/today_count"}),
+    Case("GET /api/actions/recent", "GET", lambda ctx, i: {"path": "/api/actions/recent"}),
+    Case("GET /api/overdue_installments", "GET", lambda ctx, i: {
+        "path": "/api/overdue_installments", "query_string": {"limit": 100}}),
+    Case("GET /api/overdue_installments/export", "GET", lambda ctx, i: {
+        "path": "/api/overdue_installments/export", "query_string": {"format": "csv"}}, heavy=True),
+    Case("GET /api/portfolio/aging", "GET", lambda ctx, i: {"path": "/api/portfolio/aging"}),
+    Case("GET /api/portfolio/valuation", "GET", lambda ctx, i: {"path": "/api/portfolio/valuation"}),
+    Case("GET /api/dashboard", "GET", lambda ctx, i: {"path": "/api/dashboard"}),
+    Case("GET /api/cache/stats", "GET", lambda ctx, i: {"path": "/api/cache/stats"}),
+    Case("POST /api/import", "POST", _import_file),
+]
+
+
+def _percentiles(samples):
+    samples = sorted(samples)
+    return statistics.median(samples) * 1000, samples[int(len(samples) * 0.95) - 1] * 1000
+
+
+def _measure(size, database_path, repeat, results):
+    from sqlalchemy import event
+
+    app_module = _support.load_app(database_path)
+    clients, contracts_per_client, installments, actions_per_client = SIZES[size]
+    _support.build_portfolio(app_module, clients, contracts_per_client, installments,
+                             actions_per_client=actions_per_client)
+    from models import db
+    from seed import TEST_PASSWORD, TEST_USERNAME, ensure_test_user
+    with app_module.app.app_context():
+        ensure_test_user()
+        engine = db.engine
+
+    ctx = {"clients": clients, "contracts_per_client": contracts_per_client, "installments": installments,
+           "username": TEST_USERNAME, "password": TEST_PASSWORD}
+    client = app_module.app.test_client()
+    headers = _support.auth_header(app_module)
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+    def call(case, index):
+        app_module.cache.clear()
+        del statements[:]
+        resp = client.open(method=case.method, headers=headers, buffered=False, **case.build(ctx, index))
+        # Consome o corpo (inclusive os streams) como um cliente HTTP faria
+        for _ in resp.response:
+            pass
+        resp.close()
+        return resp.status_code, len(statements)
+
+    endpoints = {}
+    index = 0
+    for case in CASES:
+        runs = min(repeat, HEAVY_REPEAT) if case.heavy else repeat
+        call(case, index)  # aquecimento
+        index += 1
+        timings, queries, statuses = [], 0, set()
+        for _ in range(runs):
+            start = time.perf_counter()
+            status, count = call(case, index)
+            timings.append(time.perf_counter() - start)
+            index += 1
+            queries = max(queries, count)
+            statuses.add(status)
+
+        tracemalloc.start()
+        traced_before = tracemalloc.get_traced_memory()[0]
+        statuses.add(call(case, index)[0])
+        peak = tracemalloc.get_traced_memory()[1] - traced_before
+        tracemalloc.stop()
+        index += 1
+
+        p50, p95 = _percentiles(timings)
+        endpoints[case.name] = {
+            "p50_ms": round(p50, 2), "p95_ms": round(p95, 2), "queries": queries,
+            "peak_kib": round(peak / 1024), "runs": runs,
+            "status": sorted(statuses) if len(statuses) > 1 else statuses.pop(),
+        }
+    results.put({"dataset": {"clients": clients, "contracts_per_client": contracts_per_client,
+                             "installments": installments, "actions_per_client": actions_per_client},
+                 "endpoints": endpoints})
+
+
+def _budget(budgets, case, metric, size):
+    limit = budgets.get(case, {}).get(metric)
+    return limit.get(size) if isinstance(limit, dict) else limit
+
+
+def check_budgets(size, endpoints, budgets):
+    """Lista as violações (rota, métrica, valor, limite) dos resultados de um tamanho."""
+    violations = []
+    for case in CASES:
+        result = endpoints[case.name]
+        if result["status"] != case.status:
+            violations.append((case.name, "status", result["status"], case.status))
+        for metric in METRICS:
+            limit = _budget(budgets, case.name, metric, size)
+            if limit is not None and result[metric] > limit:
+                violations.append((case.name, metric, result[metric], limit))
+    return violations
+
+
+def _load_json(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as fp:
+        return json.load(fp)
+
+
+def _write_json(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as fp:
+        json.dump(data, fp, ensure_ascii=False, indent=2)
+        fp.write("\n")
+
+
+def _print_size(size, result, baseline):
+    dataset = result["dataset"]
+    print(f"\n[{size}] {dataset['clients']} clientes, "
+          f"{dataset['clients'] * dataset['contracts_per_client'] * dataset['installments']} parcelas")
+    print(f"{'rota':<40} {'p50 ms':>9} {'p95 ms':>9} {'vs base':>8} {'SQLs':>5} {'pico KiB':>9}")
+    for name, metrics in result["endpoints"].items():
+        base = baseline.get("sizes", {}).get(size, {}).get("endpoints", {}).get(name)
+        delta = f"{(metrics['p95_ms'] / base['p95_ms'] - 1) * 100:+.0f}%" if base and base["p95_ms"] else "-"
+        print(f"{name:<40} {metrics['p50_ms']:>9.2f} {metrics['p95_ms']:>9.2f} {delta:>8} "
+              f"{metrics['queries']:>5} {metrics['peak_kib']:>9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default=",".join(SIZES), help="tamanhos separados por vírgula")
+    parser.add_argument("--repeat", type=int, default=30, help="chamadas medidas por rota")
+    parser.add_argument("--budgets", default=BUDGETS_PATH)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--update-baseline", action="store_true", help="grava os resultados como baseline")
+    parser.add_argument("--output", help="grava os resultados desta execução em JSON")
+    args = parser.parse_args()
+
+    sizes = [size.strip() for size in args.sizes.split(",") if size.strip()]
+    unknown = set(sizes) - set(SIZES)
+    if unknown:
+        parser.error(f"tamanhos desconhecidos: {', '.join(sorted(unknown))}")
+
+    budgets = _load_json(args.budgets)
+    baseline = _load_json(args.baseline)
+    run = {"generated_at": datetime.now().isoformat(timespec="seconds"),
+           "python": platform.python_version(), "machine": platform.machine(), "repeat": args.repeat,
+           "sizes": {}}
+    violations = []
+    ctx = multiprocessing.get_context("spawn")
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            results = ctx.Queue()
+            proc = ctx.Process(target=_measure, args=(size, os.path.join(tmp, "bench.db"), args.repeat, results))
+            proc.start()
+            result = results.get()
+            proc.join()
+        run["sizes"][size] = result
+        _print_size(size, result, baseline)
+        violations += [(size, *violation) for violation in check_budgets(size, result["endpoints"], budgets)]
+
+    if args.output:
+        _write_json(args.output, run)
+    if args.update_baseline:
+        baseline.update({key: value for key, value in run.items() if key != "sizes"})
+        baseline.setdefault("sizes", {}).update(run["sizes"])
+        _write_json(args.baseline, baseline)
+        print(f"\nbaseline gravado em {args.baseline}")
+
+    if violations:
+        print("\norçamentos excedidos:")
+        for size, name, metric, value, limit in violations:
+            print(f"  [{size}] {name}: {metric} = {value} (limite {limit})")
+        sys.exit(1)
+    print("\ntodas as rotas dentro do orçamento")
+
+
+if __name__ == "__main__":
+    main()
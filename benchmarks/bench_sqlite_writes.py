@@ -0,0 +1,99 @@
+"""Vazão de escritas concorrentes em POST /api/actions antes e depois dos PRAGMAs do SQLite.
+
+Uso (na raiz do projeto):
+
+    python benchmarks/bench_sqlite_writes.py --writers 8 --readers 4 --actions 200
+
+Cada cenário roda em um processo novo, sobre uma base nova, com `--writers` threads
+registrando ações e `--readers` threads consultando clientes por CPF ao mesmo tempo.
+O cenário "antes" reproduz o engine sem ajustes (journal DELETE, synchronous FULL, cache e
+mmap padrão do SQLite); o "depois" usa o perfil de produção (WAL, synchronous NORMAL,
+cache de 64 MiB e mmap de 256 MiB). São informadas ações/s, erros e p95 das leituras.
+"""
+import argparse
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+
+import _support
+
+SCENARIOS = [
+    ("antes (sem ajustes)", {
+        "APP_ENV": "development", "SQLITE_JOURNAL_MODE": "DELETE", "SQLITE_SYNCHRONOUS": "FULL",
+        "SQLITE_CACHE_SIZE_KB": "2000", "SQLITE_MMAP_SIZE": "0", "SQLITE_TEMP_STORE": "DEFAULT",
+    }),
+    ("depois (produção)", {"APP_ENV": "production"}),
+]
+
+
+def _measure(database_path, env, args, results):
+    os.environ.update(env)
+    app_module = _support.load_app(database_path)
+    _support.build_portfolio(app_module, args.clients, 1, 3)
+    headers = _support.auth_header(app_module)
+    stop = threading.Event()
+    written, errors, read_timings = [], [], []
+
+    def writer(worker):
+        client = app_module.app.test_client()
+        for index in range(args.actions):
+            client_id = (worker * args.actions + index) % args.clients + 1
+            response = client.post("/api/actions", headers=headers, json={
+                "clientCpf": _support.synthetic_cpf(client_id),
+                "contractNumber": f"{client_id:09d}",
+                "actionType": "Ligação",
+                "notes": "benchmark",
+            })
+            (written if response.status_code == 201 else errors).append(response.status_code)
+
+    def reader(worker):
+        client = app_module.app.test_client()
+        index = worker
+        while not stop.is_set():
+            start = time.perf_counter()
+            client.get("/api/client_by_cpf", headers=headers,
+                       query_string={"cpf": _support.synthetic_cpf(index % args.clients + 1)})
+            read_timings.append(time.perf_counter() - start)
+            index += args.readers
+
+    writers = [threading.Thread(target=writer, args=(worker,)) for worker in range(args.writers)]
+    readers = [threading.Thread(target=reader, args=(worker,)) for worker in range(args.readers)]
+    start = time.perf_counter()
+    for thread in writers + readers:
+        thread.start()
+    for thread in writers:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    stop.set()
+    for thread in readers:
+        thread.join()
+
+    read_timings.sort()
+    p95 = read_timings[int(len(read_timings) * 0.95) - 1] * 1000 if read_timings else 0.0
+    results.put((len(written) / elapsed, len(errors), len(read_timings), p95))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=5000)
+    parser.add_argument("--writers", type=int, default=8)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--actions", type=int, default=200, help="ações por thread escritora")
+    args = parser.parse_args()
+
+    ctx = multiprocessing.get_context("spawn")
+    print(f"{'cenário':<22} {'ações/s':>9} {'erros':>6} {'leituras':>9} {'p95 leitura (ms)':>17}")
+    for name, env in SCENARIOS:
+        with tempfile.TemporaryDirectory() as tmp:
+            results = ctx.Queue()
+            proc = ctx.Process(target=_measure, args=(os.path.join(tmp, "bench.db"), env, args, results))
+            proc.start()
+            throughput, errors, reads, p95 = results.get()
+            proc.join()
+        print(f"{name:<22} {throughput:>9.0f} {errors:>6} {reads:>9} {p95:>17.1f}")
+
+
+if __name__ == "__main__":
+    main()
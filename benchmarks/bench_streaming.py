@@ -0,0 +1,84 @@
+"""Compara o pico de RSS e o tempo até o primeiro byte entre o JSON tradicional e o NDJSON.
+
+Uso (na raiz do projeto):
+
+    python benchmarks/bench_streaming.py --clients 20000 --contracts 2 --installments 5
+
+Cada medição roda em um processo novo para que o pico de memória de uma não contamine a outra.
+"""
+import argparse
+import multiprocessing
+import os
+import resource
+import tempfile
+import time
+
+import _support
+
+SCENARIOS = [
+    ("overdue json", "/api/overdue_installments", {}),
+    ("overdue ndjson", "/api/overdue_installments", {"Accept": "application/x-ndjson"}),
+    ("clients json", "/api/clients", {}),
+    ("clients ndjson", "/api/clients?stream=1", {}),
+]
+
+
+def _measure(database_path, url, extra_headers, results):
+    app_module = _support.load_app(database_path)
+    client = app_module.app.test_client()
+    headers = {**_support.auth_header(app_module), **extra_headers}
+    client.get("/")
+
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    resp = client.get(url, headers=headers, buffered=False)
+    chunks = iter(resp.response)
+    first = next(chunks, b"")
+    ttfb = time.perf_counter() - start
+    size = len(first) + sum(len(chunk) for chunk in chunks)
+    total = time.perf_counter() - start
+    resp.close()
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    results.put({
+        "ttfb_ms": ttfb * 1000,
+        "total_ms": total * 1000,
+        "bytes": size,
+        # ru_maxrss é o pico do processo em KiB no Linux
+        "peak_rss_delta_mb": (rss_after - rss_before) / 1024,
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=20000)
+    parser.add_argument("--contracts", type=int, default=2, help="contratos por cliente")
+    parser.add_argument("--installments", type=int, default=5, help="parcelas por contrato")
+    args = parser.parse_args()
+
+    ctx = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory() as tmp:
+        database_path = os.path.join(tmp, "bench.db")
+        builder = ctx.Process(target=_build, args=(database_path, args.clients, args.contracts, args.installments))
+        builder.start()
+        builder.join()
+
+        print(f"{'cenário':<16} {'TTFB (ms)':>10} {'total (ms)':>11} {'MB enviados':>12} {'pico RSS +MB':>13}")
+        for name, url, headers in SCENARIOS:
+            results = ctx.Queue()
+            proc = ctx.Process(target=_measure, args=(database_path, url, headers, results))
+            proc.start()
+            row = results.get()
+            proc.join()
+            print(f"{name:<16} {row['ttfb_ms']:>10.1f} {row['total_ms']:>11.1f} "
+                  f"{row['bytes'] / 1e6:>12.1f} {row['peak_rss_delta_mb']:>13.1f}")
+
+
+def _build(database_path, clients, contracts, installments):
+    app_module = _support.load_app(database_path)
+    total = _support.build_portfolio(app_module, clients, contracts, installments)
+    print(f"Carteira gerada: {clients} clientes, {total} parcelas")
+
+
+if __name__ == "__main__":
+    main()
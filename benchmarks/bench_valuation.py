@@ -0,0 +1,58 @@
+"""Mede a atualização de saldos da carteira (multa, juros e correção por tipo de contrato).
+
+Uso (na raiz do projeto):
+
+    python benchmarks/bench_valuation.py --clients 50000 --contracts 4 --installments 5
+
+Informa o tempo do cálculo vetorizado sobre colunas já em memória, o de
+`ValuationEngine.revalue_portfolio` (leitura das parcelas + cálculo) e o da rota
+`/api/portfolio/valuation`.
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import date
+
+import numpy as np
+
+import _support
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=50000)
+    parser.add_argument("--contracts", type=int, default=4, help="contratos por cliente")
+    parser.add_argument("--installments", type=int, default=5, help="parcelas por contrato")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app_module = _support.load_app(os.path.join(tmp, "bench.db"))
+        total = _support.build_portfolio(app_module, args.clients, args.contracts, args.installments)
+        engine = app_module.valuation
+
+        rng = np.random.default_rng(3)
+        amounts = rng.uniform(100, 20000, total)
+        due_dates = np.datetime64(date.today()) - rng.integers(-360, 720, total)
+        rules = rng.integers(0, len(engine.types) + 1, total)
+        start = time.perf_counter()
+        engine.revalue(amounts, due_dates, rules, date.today())
+        print(f"cálculo vetorizado: {total} parcelas em {(time.perf_counter() - start) * 1000:.0f} ms")
+
+        with app_module.app.app_context():
+            start = time.perf_counter()
+            result = engine.revalue_portfolio(app_module.db.session)
+            elapsed = time.perf_counter() - start
+            print(f"revalue_portfolio (leitura + cálculo): {result['totals']['installments']} parcelas "
+                  f"em {elapsed * 1000:.0f} ms")
+
+        client = app_module.app.test_client()
+        headers = _support.auth_header(app_module)
+        start = time.perf_counter()
+        resp = client.get("/api/portfolio/valuation", headers=headers)
+        assert resp.status_code == 200
+        print(f"GET /api/portfolio/valuation: {(time.perf_counter() - start) * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -28,6 +28,8 @@ const ActionHistory = () => {
   const [contractData, setContractData] = useState<any>(null); 
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState<string | null>(null);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const navigate = useNavigate();
   const location = useLocation();
   
@@ -41,6 +43,23 @@ const ActionHistory = () => {
     contractId: paramContractId,
   } = location.state || {};
 
+  const buildFilterParams = () => {
+    const queryParams = [];
+    if (paramContractId) {
+      queryParams.push(`contract_id=${paramContractId}`);
+    }
+    if (paramSelectedInstallmentNumber) {
+      queryParams.push(`installment_number=${paramSelectedInstallmentNumber}`);
+    }
+    return queryParams;
+  };
+
+  // Páginas seguintes do histórico (mais recentes primeiro); a próxima chega em X-Next-Cursor
+  const buildActionsUrl = (clientId: string, cursor: string) => {
+    const queryParams = [...buildFilterParams(), `cursor=${encodeURIComponent(cursor)}`];
+    return `http://localhost:5000/api/actions/${clientId}?${queryParams.join('&')}`;
+  };
+
   useEffect(() => {
     const fetchClientAndActions = async () => {
       setLoading(true);
@@ -52,21 +71,22 @@ const ActionHistory = () => {
           return;
         }
 
-        const clientResponse = await axios.get(`http://localhost:5000/api/client_by_cpf?cpf=${paramClientCpf}`, {
-          headers: { Authorization: `Bearer ${token}` }
-        });
-        if (!clientResponse.data) {
+        // Cliente, contratos e a primeira página de ações em uma única requisição
+        const queryParams = buildFilterParams();
+        const workspaceUrl = `http://localhost:5000/api/clients/${encodeURIComponent(paramClientCpf)}/workspace`;
+        const workspaceResponse = await axios.get(
+          queryParams.length > 0 ? `${workspaceUrl}?${queryParams.join('&')}` : workspaceUrl,
+          { headers: { Authorization: `Bearer ${token}` } }
+        );
+        const workspace = workspaceResponse.data;
+        if (!workspace?.client) {
           setError("Cliente não encontrado.");
           setLoading(false);
           return;
         }
-        const fetchedClient = clientResponse.data;
-        setClientData(fetchedClient);
+        setClientData(workspace.client);
 
-        const contractsResponse = await axios.get(`http://localhost:5000/api/contracts?cpf=${fetchedClient.cpf}`, {
-          headers: { Authorization: `Bearer ${token}` }
-        });
-        const fetchedContract = contractsResponse.data.find(
+        const fetchedContract = (workspace.contracts ?? []).find(
           (c: any) => c.number === paramContractNumber
         );
         if (fetchedContract) {
@@ -80,24 +100,13 @@ const ActionHistory = () => {
           });
         }
 
-        let actionsUrl = `http://localhost:5000/api/actions/${fetchedClient.id}`;
-        const queryParams = [];
-        if (paramContractId) {
-          queryParams.push(`contract_id=${paramContractId}`);
-        }
-        if (paramSelectedInstallmentNumber) {
-          queryParams.push(`installment_number=${paramSelectedInstallmentNumber}`);
-        }
-        if (queryParams.length > 0) {
-          actionsUrl += `?${queryParams.join('&')}`;
-        }
-        const actionsResponse = await axios.get(actionsUrl, {
-          headers: { Authorization: `Bearer ${token}` }
-        });
-        setActions(actionsResponse.data);
+        setActions(workspace.actions ?? []);
+        setNextCursor(workspace.nextActionsCursor ?? null);
 
       } catch (err: any) {
-        setError(err.response?.data?.msg || "Erro ao carregar dados.");
+        setError(err.response?.status === 404
+          ? "Cliente não encontrado."
+          : err.response?.data?.msg || "Erro ao carregar dados.");
         console.error("Erro ao carregar dados em ActionHistory:", err);
       } finally {
         setLoading(false);
@@ -112,6 +121,23 @@ const ActionHistory = () => {
     }
   }, [paramClientCpf, navigate, paramContractNumber, paramContractId, paramSelectedInstallmentNumber]); 
 
+  const handleLoadMore = async () => {
+    if (!clientData || !nextCursor) return;
+    setLoadingMore(true);
+    try {
+      const token = localStorage.getItem('access_token');
+      const response = await axios.get(buildActionsUrl(clientData.id, nextCursor), {
+        headers: { Authorization: `Bearer ${token}` }
+      });
+      setActions((current) => [...current, ...response.data]);
+      setNextCursor(response.headers?.['x-next-cursor'] ?? null);
+    } catch (err: any) {
+      toast.error(err.response?.data?.msg || "Erro ao carregar ações anteriores.");
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const handleBack = () => {
     navigate("/contracts", { state: { clientName: paramClientName, clientCpf: paramClientCpf }});
   };
@@ -243,40 +269,49 @@ const ActionHistory = () => {
                 if (actions.length === 0) {
                   return <p>Nenhum histórico de ações encontrado para este cliente.</p>;
                 }
-                return actions.map((item) => (
-                  <Card key={item.id} className="p-4 bg-card border-border shadow-card">
-                    <div className="space-y-3">
-                      <div className="flex items-start justify-between">
-                        <div className="space-y-1">
-                          <p className="font-medium text-foreground">{item.actionType}</p>
-                          <div className="flex items-center gap-4 text-sm text-muted-foreground">
-                            <span className="flex items-center gap-1">
-                              <Calendar className="w-3 h-3" />
-                              {new Date(item.timestamp).toLocaleDateString('pt-BR')}
-                            </span>
-                            <span className="flex items-center gap-1">
-                              <Clock className="w-3 h-3" />
-                              {new Date(item.timestamp).toLocaleTimeString('pt-BR', { hour: '2-digit', minute: '2-digit' })}
-                            </span>
+                return (
+                  <>
+                    {actions.map((item) => (
+                      <Card key={item.id} className="p-4 bg-card border-border shadow-card">
+                        <div className="space-y-3">
+                          <div className="flex items-start justify-between">
+                            <div className="space-y-1">
+                              <p className="font-medium text-foreground">{item.actionType}</p>
+                              <div className="flex items-center gap-4 text-sm text-muted-foreground">
+                                <span className="flex items-center gap-1">
+                                  <Calendar className="w-3 h-3" />
+                                  {new Date(item.timestamp).toLocaleDateString('pt-BR')}
+                                </span>
+                                <span className="flex items-center gap-1">
+                                  <Clock className="w-3 h-3" />
+                                  {new Date(item.timestamp).toLocaleTimeString('pt-BR', { hour: '2-digit', minute: '2-digit' })}
+                                </span>
+                              </div>
+                              {item.contractNumber && item.installmentNumber && (
+                                <p className="text-xs text-muted-foreground">
+                                  Contrato: {item.contractNumber} • Parcela: {item.installmentNumber}
+                                </p>
+                              )}
+                            </div>
+                            <div className="w-8 h-8 bg-primary/10 rounded-full flex items-center justify-center">
+                              <CheckCircle2 className="w-4 h-4 text-primary" />
+                            </div>
+                          </div>
+                          
+                          <div className="bg-muted/30 rounded-lg p-3">
+                            <p className="text-sm text-muted-foreground mb-1">Operador: {item.operator || "Operador Desconhecido"}</p>
+                            <p className="text-sm text-foreground">{item.notes}</p>
                           </div>
-                          {item.contractNumber && item.installmentNumber && (
-                            <p className="text-xs text-muted-foreground">
-                              Contrato: {item.contractNumber} • Parcela: {item.installmentNumber}
-                            </p>
-                          )}
-                        </div>
-                        <div className="w-8 h-8 bg-primary/10 rounded-full flex items-center justify-center">
-                          <CheckCircle2 className="w-4 h-4 text-primary" />
                         </div>
-                      </div>
-                      
-                      <div className="bg-muted/30 rounded-lg p-3">
-                        <p className="text-sm text-muted-foreground mb-1">Operador: {item.operator || "Operador Desconhecido"}</p>
-                        <p className="text-sm text-foreground">{item.notes}</p>
-                      </div>
-                    </div>
-                  </Card>
-                ));
+                      </Card>
+                    ))}
+                    {nextCursor && (
+                      <Button variant="outline" className="w-full" onClick={handleLoadMore} disabled={loadingMore}>
+                        {loadingMore ? "Carregando..." : "Carregar ações anteriores"}
+                      </Button>
+                    )}
+                  </>
+                );
               })()}
             </div>
           </div>
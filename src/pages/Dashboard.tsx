@@ -48,27 +48,20 @@ const Dashboard = () => {
           return;
         }
 
-        const installmentsResponse = await axios.get('http://localhost:5000/api/overdue_installments', {
+        // Resumo da inadimplência, ações recentes e contagem do dia em uma única requisição
+        const dashboardResponse = await axios.get('http://localhost:5000/api/dashboard', {
           headers: { Authorization: `Bearer ${token}` }
         });
-        setOverdueInstallments(installmentsResponse.data);
+        const { overdue, recentActions: recent, todayCount } = dashboardResponse.data;
+        setOverdueInstallments(overdue.items);
+        setRecentActions(recent);
+        // Totais calculados no banco sobre todas as parcelas em atraso, não só as listadas
+        setTotalOverdueValue(overdue.totals.amount);
+        setTotalOverdueInstallments(overdue.totals.count);
+        setTodayActionsCount(todayCount);
 
-        const recentActionsResponse = await axios.get('http://localhost:5000/api/actions/recent', {
-          headers: { Authorization: `Bearer ${token}` }
-        });
-        setRecentActions(recentActionsResponse.data);
-
-        const totalValue = installmentsResponse.data.reduce((sum: number, inst: any) => sum + inst.amount, 0);
-        setTotalOverdueValue(totalValue);
-        setTotalOverdueInstallments(installmentsResponse.data.length);
-
-        const todayActionsResponse = await axios.get('http://localhost:5000/api/actions/today_count', {
-          headers: { Authorization: `Bearer ${token}` }
-        });
-        setTodayActionsCount(todayActionsResponse.data.count);
-        
         const clientsMap = new Map<string, { name: string; cpf: string; contracts: Set<string>; parcels: number }>();
-        installmentsResponse.data.forEach((row: any) => {
+        overdue.items.forEach((row: any) => {
           const current = clientsMap.get(row.cpf) ?? { name: row.clientName, cpf: row.cpf, contracts: new Set<string>(), parcels: 0 };
           current.contracts.add(row.contractNumber);
           current.parcels += 1;
@@ -91,6 +84,29 @@ const Dashboard = () => {
     fetchDashboardData();
   }, [navigate]);
 
+  // Ações novas e a contagem do dia chegam pelo stream SSE, sem polling
+  useEffect(() => {
+    const token = localStorage.getItem('access_token');
+    if (!token || typeof EventSource === 'undefined') return;
+    // EventSource não envia cabeçalhos; o token vai na query string
+    const source = new EventSource(`http://localhost:5000/api/stream/actions?jwt=${encodeURIComponent(token)}`);
+
+    source.addEventListener('snapshot', (event) => {
+      const { todayCount, recentActions: recent } = JSON.parse((event as MessageEvent).data);
+      setRecentActions(recent);
+      setTodayActionsCount(todayCount);
+    });
+    source.addEventListener('actions', (event) => {
+      const { todayCount, actions } = JSON.parse((event as MessageEvent).data);
+      setRecentActions(prev => [...actions, ...prev]
+        .sort((a, b) => String(b.timestamp).localeCompare(String(a.timestamp)))
+        .slice(0, 10));
+      setTodayActionsCount(todayCount);
+    });
+
+    return () => source.close();
+  }, []);
+
   const handleLogout = () => {
     localStorage.removeItem('access_token'); 
     toast.success("Logout realizado com sucesso!");
@@ -203,6 +219,9 @@ const Dashboard = () => {
           <div className="flex items-center justify-between">
             <h2 className="text-2xl font-semibold text-foreground">Parcelas Inadimplentes</h2>
             <div className="flex items-center gap-4">
+              <span className="text-sm text-muted-foreground">
+                Mostrando {overdueInstallments.length} de {totalOverdueInstallments}
+              </span>
             </div>
           </div>
           <Card className="p-0 bg-card border-border shadow-card">
@@ -14,6 +14,15 @@ jest.mock('react-router-dom', () => ({
 
 const mockedAxios = axios as jest.Mocked<typeof axios>;
 
+// Resposta de /api/clients/<cpf>/workspace: cliente, contratos e a primeira página de ações
+const workspace = (client: any, contracts: any[], actions: any[]) => ({
+  client,
+  contracts,
+  actions,
+  hasMoreActions: false,
+  nextActionsCursor: null,
+});
+
 describe('ActionHistory page', () => {
   beforeEach(() => {
     jest.clearAllMocks();
@@ -29,16 +38,15 @@ describe('ActionHistory page', () => {
     const actions = [{ actionType: 'test', timestamp: new Date().toISOString(), notes: 'ok' }];
 
     const mockedAxios = axios as jest.Mocked<typeof axios>;
-    mockedAxios.get.mockImplementation((url: string) => {
-      if (url.includes('client_by_cpf')) return Promise.resolve({ data: client });
-      if (url.includes('/api/actions/')) return Promise.resolve({ data: actions });
-      return Promise.resolve({ data: [] });
-    });
+    mockedAxios.get.mockResolvedValue({ data: workspace(client, [], actions) });
 
     render(<ActionHistory />);
 
     await waitFor(() => expect(mockedAxios.get).toHaveBeenCalled());
     expect(screen.getByText(/Histórico e Registro de Ação/i)).toBeInTheDocument();
+    // Cliente, contratos e ações chegam em uma única requisição ao workspace
+    expect(mockedAxios.get).toHaveBeenCalledTimes(1);
+    expect(mockedAxios.get.mock.calls[0][0]).toBe('http://localhost:5000/api/clients/111/workspace');
   });
 
   // Sem token, deve navegar para a página de login e mostrar erro de autenticação
@@ -56,10 +64,7 @@ describe('ActionHistory page', () => {
   test('client not found sets error message', async () => {
     localStorage.setItem('access_token', 'tok');
     const mockedAxios = axios as jest.Mocked<typeof axios>;
-    mockedAxios.get.mockImplementation((url: string) => {
-      if (url.includes('client_by_cpf')) return Promise.resolve({ data: null });
-      return Promise.resolve({ data: [] });
-    });
+    mockedAxios.get.mockRejectedValue({ response: { status: 404, data: { msg: 'Cliente com CPF 111 não encontrado' } } });
     render(<ActionHistory />);
     await waitFor(() => expect(screen.getByText(/Cliente não encontrado\./i)).toBeInTheDocument());
   });
@@ -71,16 +76,14 @@ describe('ActionHistory page', () => {
     const contracts = [ { id: 'cid', number: 'C1', type: 'Tipo', installmentValue: 100, dueDate: '2025-08-01', daysOverdue: 5, fineValue: 10 } ];
     const actions = [ { actionType: 'Contato', timestamp: new Date().toISOString(), notes: 'fez contato', operator: 'OP1', contractNumber: 'C1', installmentNumber: 1 } ];
     const mockedAxios = axios as jest.Mocked<typeof axios>;
-    mockedAxios.get.mockImplementation((url: string) => {
-      if (url.includes('client_by_cpf')) return Promise.resolve({ data: client });
-      if (url.includes('/api/contracts')) return Promise.resolve({ data: contracts });
-      if (url.includes('/api/actions/')) return Promise.resolve({ data: actions });
-      return Promise.resolve({ data: [] });
-    });
+    mockLocationState = { clientCpf: '111', contractNumber: 'C1', contractId: 'cid', selectedInstallmentNumber: 1 };
+    mockedAxios.get.mockResolvedValue({ data: workspace(client, contracts, actions) });
 
     render(<ActionHistory />);
 
     await waitFor(() => expect(mockedAxios.get).toHaveBeenCalled());
+    expect(mockedAxios.get.mock.calls[0][0]).toBe(
+      'http://localhost:5000/api/clients/111/workspace?contract_id=cid&installment_number=1');
     // contract number shown
     expect(screen.getByText(/Contrato C1/i)).toBeInTheDocument();
     // action item rendered (use getAllByText to avoid ambiguity)
@@ -88,6 +91,28 @@ describe('ActionHistory page', () => {
     expect(screen.getAllByText(/fez contato/i).length).toBeGreaterThan(0);
   });
 
+  // Histórico paginado: o botão busca a próxima página com o cursor de X-Next-Cursor
+  test('loads older actions with the next cursor', async () => {
+    localStorage.setItem('access_token', 'tok');
+    const client = { id: '1', name: 'Client', cpf: '111', phones: ['123'] };
+    const firstPage = [{ id: 2, actionType: 'Mais recente', timestamp: new Date().toISOString(), notes: '' }];
+    const secondPage = [{ id: 1, actionType: 'Mais antiga', timestamp: new Date().toISOString(), notes: '' }];
+    const mockedAxios = axios as jest.Mocked<typeof axios>;
+    mockedAxios.get.mockImplementation((url: string) => {
+      if (url.includes('/workspace')) return Promise.resolve({ data: { ...workspace(client, [], firstPage), nextActionsCursor: 'abc' } });
+      if (url.includes('/api/actions/1?cursor=abc')) return Promise.resolve({ data: secondPage, headers: {} });
+      return Promise.reject(new Error(`URL inesperada: ${url}`));
+    });
+
+    render(<ActionHistory />);
+    const loadMore = await screen.findByText(/Carregar ações anteriores/i);
+    fireEvent.click(loadMore);
+
+    await waitFor(() => expect(screen.getByText(/Mais antiga/i)).toBeInTheDocument());
+    expect(screen.getByText(/Mais recente/i)).toBeInTheDocument();
+    expect(screen.queryByText(/Carregar ações anteriores/i)).not.toBeInTheDocument();
+  });
+
   // Botão voltar navega para /contracts com estado
   test('back button navigates to contracts with state', async () => {
     localStorage.setItem('access_token', 'tok');
@@ -95,12 +120,7 @@ describe('ActionHistory page', () => {
     const contracts: any[] = [];
     const actions: any[] = [];
     const mockedAxios = axios as jest.Mocked<typeof axios>;
-    mockedAxios.get.mockImplementation((url: string) => {
-      if (url.includes('client_by_cpf')) return Promise.resolve({ data: client });
-      if (url.includes('/api/contracts')) return Promise.resolve({ data: contracts });
-      if (url.includes('/api/actions/')) return Promise.resolve({ data: actions });
-      return Promise.resolve({ data: [] });
-    });
+    mockedAxios.get.mockResolvedValue({ data: workspace(client, contracts, actions) });
 
     render(<ActionHistory />);
     await waitFor(() => expect(mockedAxios.get).toHaveBeenCalled());
@@ -117,12 +137,7 @@ describe('ActionHistory page', () => {
     const contracts: any[] = [];
     const actions: any[] = [];
     const mockedAxios = axios as jest.Mocked<typeof axios>;
-    mockedAxios.get.mockImplementation((url: string) => {
-      if (url.includes('client_by_cpf')) return Promise.resolve({ data: client });
-      if (url.includes('/api/contracts')) return Promise.resolve({ data: contracts });
-      if (url.includes('/api/actions/')) return Promise.resolve({ data: actions });
-      return Promise.resolve({ data: [] });
-    });
+    mockedAxios.get.mockResolvedValue({ data: workspace(client, contracts, actions) });
 
     render(<ActionHistory />);
     await waitFor(() => expect(mockedAxios.get).toHaveBeenCalled());
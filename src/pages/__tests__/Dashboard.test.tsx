@@ -1,5 +1,5 @@
 import React from 'react';
-import { render, screen, waitFor, fireEvent } from '@testing-library/react';
+import { act, render, screen, waitFor, fireEvent } from '@testing-library/react';
 import Dashboard from '../Dashboard';
 import axios from 'axios';
 
@@ -10,18 +10,28 @@ const mockedAxios = axios as jest.Mocked<typeof axios>;
 const mockNavigate = jest.fn();
 jest.mock('react-router-dom', () => ({ useNavigate: () => mockNavigate }));
 
+// Resposta de /api/dashboard: parcelas listadas com os totais, ações recentes e contagem do dia
+const dashboardData = (installments: any[], recentActions: any[] = [], todayCount = 0) => ({
+  overdue: {
+    items: installments,
+    totals: {
+      count: installments.length,
+      amount: installments.reduce((sum, inst) => sum + inst.amount, 0),
+      clients: new Set(installments.map((inst) => inst.cpf)).size,
+      contracts: new Set(installments.map((inst) => inst.contractNumber)).size,
+    },
+  },
+  recentActions,
+  todayCount,
+});
+
 describe('Dashboard page', () => {
   beforeEach(() => jest.clearAllMocks());
 
     test('renders and shows dashboard content after data load', async () => {
       // Comentário para leigos: aqui simulamos o retorno do servidor com dados
       const installments = [{ id: '1', clientName: 'A', cpf: '111', contractNumber: 'C1', installmentNumber: 1, dueDate: new Date().toISOString(), daysOverdue: 5, amount: 100 }];
-      mockedAxios.get.mockImplementation((url: string) => {
-        if (url.includes('overdue_installments')) return Promise.resolve({ data: installments });
-        if (url.includes('actions/recent')) return Promise.resolve({ data: [] });
-        if (url.includes('actions/today_count')) return Promise.resolve({ data: { count: 0 } });
-        return Promise.resolve({ data: {} });
-      });
+      mockedAxios.get.mockResolvedValue({ data: dashboardData(installments) });
 
     // garantir token para que o componente carregue os dados
     localStorage.setItem('access_token', 'tok');
@@ -50,12 +60,7 @@ describe('Dashboard page', () => {
   // Quando não há atividades recentes, mostra mensagem apropriada
   test('shows no recent activity message when none', async () => {
     const installments: any[] = [];
-    mockedAxios.get.mockImplementation((url: string) => {
-      if (url.includes('overdue_installments')) return Promise.resolve({ data: installments });
-      if (url.includes('actions/recent')) return Promise.resolve({ data: [] });
-      if (url.includes('actions/today_count')) return Promise.resolve({ data: { count: 0 } });
-      return Promise.resolve({ data: {} });
-    });
+    mockedAxios.get.mockResolvedValue({ data: dashboardData(installments) });
     localStorage.setItem('access_token', 'tok');
     render(<Dashboard />);
     await waitFor(() => expect(mockedAxios.get).toHaveBeenCalled());
@@ -65,12 +70,7 @@ describe('Dashboard page', () => {
   // handleProceed: sem seleção deve mostrar erro via toast
   test('handleProceed shows error when no client selected', async () => {
     const installments: any[] = [];
-    mockedAxios.get.mockImplementation((url: string) => {
-      if (url.includes('overdue_installments')) return Promise.resolve({ data: installments });
-      if (url.includes('actions/recent')) return Promise.resolve({ data: [] });
-      if (url.includes('actions/today_count')) return Promise.resolve({ data: { count: 0 } });
-      return Promise.resolve({ data: {} });
-    });
+    mockedAxios.get.mockResolvedValue({ data: dashboardData(installments) });
     localStorage.setItem('access_token', 'tok');
     render(<Dashboard />);
     await waitFor(() => expect(mockedAxios.get).toHaveBeenCalled());
@@ -85,12 +85,7 @@ describe('Dashboard page', () => {
   test('logout clears token, shows success toast and navigates home', async () => {
     localStorage.setItem('access_token', 'tok');
     const installments = [{ id: '1', clientName: 'A', cpf: '111', contractNumber: 'C1', installmentNumber: 1, dueDate: new Date().toISOString(), daysOverdue: 5, amount: 100 }];
-    mockedAxios.get.mockImplementation((url: string) => {
-      if (url.includes('overdue_installments')) return Promise.resolve({ data: installments });
-      if (url.includes('actions/recent')) return Promise.resolve({ data: [] });
-      if (url.includes('actions/today_count')) return Promise.resolve({ data: { count: 0 } });
-      return Promise.resolve({ data: {} });
-    });
+    mockedAxios.get.mockResolvedValue({ data: dashboardData(installments) });
 
     render(<Dashboard />);
     await waitFor(() => expect(mockedAxios.get).toHaveBeenCalled());
@@ -118,12 +113,7 @@ describe('Dashboard page', () => {
       { id: '2', clientName: 'Cliente A', cpf: '111', contractNumber: 'C2', installmentNumber: 1, dueDate: new Date().toISOString(), daysOverdue: 3, amount: 50 },
     ];
 
-    mockedAxios.get.mockImplementation((url: string) => {
-      if (url.includes('overdue_installments')) return Promise.resolve({ data: installments });
-      if (url.includes('actions/recent')) return Promise.resolve({ data: [] });
-      if (url.includes('actions/today_count')) return Promise.resolve({ data: { count: 0 } });
-      return Promise.resolve({ data: {} });
-    });
+    mockedAxios.get.mockResolvedValue({ data: dashboardData(installments) });
 
     localStorage.setItem('access_token', 'tok');
     render(<Dashboard />);
@@ -153,12 +143,7 @@ describe('Dashboard page', () => {
     ];
     const recent = [{ actionType: 'AçãoX', timestamp: new Date().toISOString(), clientName: 'B', type: 'info' }];
 
-    mockedAxios.get.mockImplementation((url: string) => {
-      if (url.includes('overdue_installments')) return Promise.resolve({ data: installments });
-      if (url.includes('actions/recent')) return Promise.resolve({ data: recent });
-      if (url.includes('actions/today_count')) return Promise.resolve({ data: { count: 1 } });
-      return Promise.resolve({ data: {} });
-    });
+    mockedAxios.get.mockResolvedValue({ data: dashboardData(installments, recent, 1) });
     localStorage.setItem('access_token', 'tok');
     render(<Dashboard />);
     await waitFor(() => expect(mockedAxios.get).toHaveBeenCalled());
@@ -169,4 +154,47 @@ describe('Dashboard page', () => {
     // atividade recente aparece
     expect(screen.getByText(/AçãoX/i)).toBeInTheDocument();
   });
+
+  // Uma única requisição a /api/dashboard; as métricas vêm dos totais, não só das parcelas listadas
+  test('loads everything from the aggregated dashboard endpoint', async () => {
+    const installments = [{ id: '1', clientName: 'C', cpf: '333', contractNumber: 'C9', installmentNumber: 1, dueDate: new Date().toISOString(), daysOverdue: 1, amount: 10 }];
+    const data = dashboardData(installments, [], 7);
+    data.overdue.totals = { count: 57, amount: 12345, clients: 20, contracts: 30 };
+    mockedAxios.get.mockResolvedValue({ data });
+    localStorage.setItem('access_token', 'tok');
+    render(<Dashboard />);
+
+    await waitFor(() => expect(screen.getByText(/Mostrando 1 de 57/i)).toBeInTheDocument());
+    expect(mockedAxios.get).toHaveBeenCalledTimes(1);
+    expect(mockedAxios.get.mock.calls[0][0]).toContain('/api/dashboard');
+    expect(screen.getByText('57')).toBeInTheDocument();
+    expect(screen.getByText('7')).toBeInTheDocument();
+  });
+
+  // Ações novas chegam pelo stream SSE de /api/stream/actions, sem novas requisições
+  test('subscribes to the actions stream and applies pushed actions', async () => {
+    const listeners: Record<string, (event: any) => void> = {};
+    const close = jest.fn();
+    const FakeEventSource = jest.fn().mockImplementation(() => ({
+      addEventListener: (name: string, listener: (event: any) => void) => { listeners[name] = listener; },
+      close,
+    }));
+    (window as any).EventSource = FakeEventSource;
+    mockedAxios.get.mockResolvedValue({ data: dashboardData([], [], 3) });
+    localStorage.setItem('access_token', 'tok');
+    const { unmount } = render(<Dashboard />);
+
+    await waitFor(() => expect(screen.getByText('3')).toBeInTheDocument());
+    expect(FakeEventSource).toHaveBeenCalledWith('http://localhost:5000/api/stream/actions?jwt=tok');
+
+    const pushed = { actionType: 'Ligação SSE', timestamp: new Date().toISOString(), clientName: 'D' };
+    act(() => listeners.actions({ data: JSON.stringify({ created: 1, todayCount: 4, actions: [pushed] }) }));
+    expect(screen.getByText(/Ligação SSE/i)).toBeInTheDocument();
+    expect(screen.getByText('4')).toBeInTheDocument();
+    expect(mockedAxios.get).toHaveBeenCalledTimes(1);
+
+    unmount();
+    expect(close).toHaveBeenCalled();
+    delete (window as any).EventSource;
+  });
 });
@@ -1,26 +1,102 @@
 
-from flask import Flask, request, jsonify, Response
+from flask import Flask, request, jsonify, Response, stream_with_context
 from flask_migrate import Migrate
-from models import db, User, Client, Contract, Installment, Action
-from config import Config
-from datetime import date, datetime
+from sqlalchemy import and_, case, event, func, insert, or_, select
+from sqlalchemy.orm import Session, joinedload, selectinload
+from models import (db, User, Client, ClientPhone, Contract, Installment, Action, ActionArchive,
+                    bump_client_versions, include_in_migrations)
+from config import get_config
+from database import configure_engine, engine_options, pool_options
+from archive import ARCHIVE_BIND, archive_actions, archive_cutoff, ensure_archive_schema, has_archive_schema
+from replica import REPLICA_BIND, ReplicaRouter, copy_database
+from importer import ImportFormatError, detect_format, import_portfolio
+from exporter import EXPORT_FORMATS, stream_csv, stream_xlsx
+from cache import ResponseCache
+from instrumentation import Instrumentation
+from cpf import cpf_digits
+from phones import normalize_phone
+from search import search_clients
+from seed import TEST_PASSWORD, TEST_USERNAME, ensure_demo_clients, ensure_test_user, seed_portfolio
+from valuation import ValuationEngine
+from broker import RESYNC, MessageBroker
+from datetime import date, datetime, timezone
 from flask_jwt_extended import create_access_token, JWTManager, jwt_required, get_jwt_identity, unset_jwt_cookies
 from flask_cors import CORS
 import os
+import json
+import base64
+import click
+import heapq
+import time
 from datetime import timedelta
+from itertools import chain, islice
 
 
 app = Flask(__name__)
-app.config.from_object(Config)
-
+app.config.from_object(get_config())
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options(app.config)
+binds = {}
+if app.config['REPLICA_DATABASE_URL']:
+    binds[REPLICA_BIND] = {
+        'url': app.config['REPLICA_DATABASE_URL'],
+        **pool_options(app.config['REPLICA_DATABASE_URL'], app.config)}
+# O arquivo das ações antigas fica no próprio banco principal se ARCHIVE_DATABASE_URL estiver vazia
+archive_url = app.config['ARCHIVE_DATABASE_URL'] or app.config['SQLALCHEMY_DATABASE_URI']
+binds[ARCHIVE_BIND] = {'url': archive_url, **pool_options(archive_url, app.config)}
+app.config['SQLALCHEMY_BINDS'] = binds
+
+instrumentation = Instrumentation(app)
 db.init_app(app)
-migrate = Migrate(app, db)
+with app.app_context():
+    for engine in db.engines.values():
+        configure_engine(engine, app.config)
+        instrumentation.instrument_engine(engine)
+    replicas = ReplicaRouter(app, db.engines.get(REPLICA_BIND))
+migrate = Migrate(app, db, render_as_batch=True, include_object=include_in_migrations)
 
 app.config["JWT_SECRET_KEY"] = os.environ.get(
     'JWT_SECRET_KEY',  'sua-super-chave-secreta-para-jwt')
 jwt = JWTManager(app)
+instrumentation.instrument_jwt(jwt)
+
+CORS(app, expose_headers=["X-Next-Cursor", "ETag", "Server-Timing"])
+
+cache = ResponseCache(app)
+# Quem acabou de gravar lê do primário; o cache pode ter sido preenchido a partir da réplica
+# atrasada por outro usuário depois da escrita
+cache.bypass_when(replicas.sticky_request)
+broker = MessageBroker(app)
+valuation = ValuationEngine(app.config['VALUATION_RULES'])
+
+# Tags de cache afetadas pela escrita de cada modelo (respostas que exibem seus dados)
+CACHE_TAGS_BY_MODEL = (
+    (Action, ('actions',)),
+    (Installment, ('portfolio',)),
+    (Contract, ('portfolio',)),
+    (Client, ('portfolio', 'actions')),
+    (ClientPhone, ('portfolio',)),
+)
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_cache_tags(session, flush_context):
+    tags = session.info.setdefault('cache_tags', set())
+    for obj in chain(session.new, session.dirty, session.deleted):
+        for model, model_tags in CACHE_TAGS_BY_MODEL:
+            if isinstance(obj, model):
+                tags.update(model_tags)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_cache_after_commit(session):
+    tags = session.info.pop('cache_tags', None)
+    if tags:
+        cache.invalidate(*tags)
+
 
-CORS(app)
+@event.listens_for(Session, 'after_rollback')
+def _discard_cache_tags(session):
+    session.info.pop('cache_tags', None)
 
 
 @app.route('/')
@@ -31,17 +107,42 @@ def index():
 @app.route('/api/clients', methods=['GET'])
 @jwt_required()
 def get_clients():
-    clients = Client.query.all()
-    return jsonify(
-        [
-            {
-                'id': client.id,
-                'name': client.name,
-                'cpf': client.cpf,
-                'phones': client.phones.split(',') if client.phones else []
-            } for client in clients
-        ]
-    )
+    # Telefones de todos os clientes (ou do lote corrente, no stream) em uma consulta IN
+    query = Client.query.options(selectinload(Client.phone_numbers)).order_by(Client.id)
+    if _wants_stream():
+        return _ndjson_response(query, _client_to_dict)
+
+    return jsonify([_client_to_dict(client) for client in query.all()])
+
+
+@app.route('/api/clients/search', methods=['GET'])
+@jwt_required()
+def search_clients_route():
+    """Typeahead por parte do nome, prefixo do CPF ou telefone (índice FTS5), melhores primeiro."""
+    limit = request.args.get('limit', app.config['CLIENT_SEARCH_LIMIT'], type=int)
+    limit = max(1, min(limit, app.config['CLIENT_SEARCH_LIMIT_MAX']))
+    clients = search_clients(request.args.get('q', ''), limit)
+    return jsonify([_client_to_dict(client) for client in clients])
+
+
+@app.route('/api/clients/by_phone', methods=['GET'])
+@jwt_required()
+def get_clients_by_phone():
+    """Identifica o cliente de uma chamada recebida pelo número (índice de client_phone.number).
+
+    Aceita o número em qualquer formato; devolve uma lista porque um telefone pode ser
+    compartilhado por mais de um cliente.
+    """
+    number = normalize_phone(request.args.get('number'))
+    if number is None:
+        return jsonify({"msg": "Telefone inválido"}), 400
+
+    clients = Client.query.join(Client.phone_numbers).filter(ClientPhone.number == number).options(
+        selectinload(Client.phone_numbers)).order_by(Client.id).all()
+    if not clients:
+        return jsonify({"msg": f"Nenhum cliente com o telefone {request.args.get('number')}"}), 404
+
+    return jsonify([_client_to_dict(client) for client in clients])
 
 
 @app.route('/api/client_by_cpf', methods=['GET'])
@@ -51,16 +152,63 @@ def get_client_by_cpf():
     if not client_cpf:
         return jsonify({"msg": "CPF do cliente é obrigatório"}), 400
 
-    client = Client.query.filter_by(cpf=client_cpf).first()
+    client = _find_client_by_cpf(client_cpf, joinedload(Client.phone_numbers))
     if not client:
         return jsonify({"msg": f"Cliente com CPF {client_cpf} não encontrado"}), 404
 
-    return jsonify({
+    return _conditional_client_response(client, 'client', lambda: _client_to_dict(client))
+
+
+def _find_client_by_cpf(raw_cpf, *options):
+    """Busca pelo índice de cpf_digits, aceitando o CPF com ou sem pontuação.
+
+    `options` são opções de carregamento (ex.: os telefones, para quem serializa o cliente).
+    """
+    digits = cpf_digits(raw_cpf)
+    if digits is None:
+        return None
+    # one_or_none (o índice é único) evita o LIMIT que faria o joinedload virar subconsulta
+    return Client.query.options(*options).filter_by(cpf_digits=digits).one_or_none()
+
+
+def _conditional_client_response(client, scope, build):
+    """Responde 304 sem montar o corpo quando o If-None-Match bate com a versão do cliente."""
+    # A data entra no ETag porque daysOverdue muda na virada do dia mesmo sem escritas
+    etag = f'{scope}-{client.id}-{client.version}-{date.today().isoformat()}'
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = jsonify(build())
+    response.set_etag(etag)
+    # Sempre revalidar com o servidor; a resposta depende do usuário autenticado
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+
+def _client_to_dict(client):
+    return {
         'id': client.id,
         'name': client.name,
         'cpf': client.cpf,
-        'phones': client.phones.split(',') if client.phones else []
-    })
+        'phones': client.phones
+    }
+
+
+def _wants_stream():
+    if request.args.get('stream') == '1':
+        return True
+    best = request.accept_mimetypes.best_match(['application/json', 'application/x-ndjson'])
+    return best == 'application/x-ndjson'
+
+
+def _ndjson_response(query, serialize):
+    # yield_per lê as linhas do cursor em lotes; nada é acumulado além do lote corrente
+    def generate():
+        for row in query.yield_per(app.config['STREAM_BATCH_SIZE']):
+            yield app.json.dumps(serialize(row)) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
 
 
 @app.route('/api/contracts', methods=['GET'])
@@ -70,47 +218,50 @@ def get_contracts():
     if not client_cpf:
         return jsonify({"msg": "CPF do cliente é obrigatório"}), 400
 
-    client = Client.query.filter_by(cpf=client_cpf).first()
+    client = _find_client_by_cpf(client_cpf)
     if not client:
         return jsonify({"msg": f"Cliente com CPF {client_cpf} não encontrado"}), 404
 
-    contracts_data = [_build_contract_data(contract, client.cpf) for contract in client.contracts]
-    return jsonify(contracts_data)
+    def build():
+        # Uma consulta para os contratos e outra (IN) para todas as parcelas deles
+        contracts = Contract.query.filter_by(client_id=client.id).options(
+            selectinload(Contract.installments)).order_by(Contract.id).all()
+        values = valuation.revalue_contracts(contracts)
+        return [_build_contract_data(contract, client.cpf, values[contract.id]) for contract in contracts]
 
+    return _conditional_client_response(client, 'contracts', build)
+
+
+def _build_contract_data(contract, client_cpf, values):
+    contract_data = _contract_summary(contract, client_cpf, values)
+    contract_data['installments'] = _build_installments_data(contract.installments)
+    return contract_data
+
+
+def _contract_summary(contract, client_cpf, values):
+    # Agregados gravados no contrato; `values` são os totais de valuation.revalue_contracts
+    current_date = date.today()
+    total_amount = contract.total_amount
+    earliest_due_date = contract.earliest_due_date
+    days_overdue = (current_date - earliest_due_date).days if earliest_due_date else 0
 
-def _build_contract_data(contract, client_cpf):
-    total_amount = _calculate_total_amount(contract)
-    earliest_overdue = _find_earliest_overdue_installment(contract.installments)
-    days_overdue = _calculate_days_overdue_from_installment(earliest_overdue)
-    
     return {
         'id': contract.id,
         'number': contract.number,
         'clientCpf': client_cpf,
         'type': contract.type,
         'installmentValue': total_amount,
-        'dueDate': earliest_overdue.due_date.isoformat(),
+        'installmentCount': contract.installment_count,
+        'dueDate': earliest_due_date.isoformat() if earliest_due_date else None,
         'daysOverdue': days_overdue,
-        'fineValue': total_amount * 0.05,
+        'fineValue': round(values['fine'], 2),
+        'interestValue': round(values['interest'], 2),
+        'correctionValue': round(values['correction'], 2),
         'status': 'Em Atraso',
-        'updatedValue': total_amount * 1.10,
-        'installments': _build_installments_data(contract.installments)
+        'updatedValue': round(values['updated'], 2),
     }
 
 
-def _calculate_total_amount(contract):
-    return sum(inst.amount for inst in contract.installments)
-
-
-def _find_earliest_overdue_installment(installments):
-    return min(installments, key=lambda x: x.due_date)
-
-
-def _calculate_days_overdue_from_installment(installment):
-    current_date = date.today()
-    return (current_date - installment.due_date).days
-
-
 def _build_installments_data(installments):
     current_date = date.today()
     
@@ -186,7 +337,7 @@ def create_action():
     if not client_cpf or not action_type:
         return jsonify({"msg": "CPF do cliente e tipo de ação são obrigatórios"}), 400
 
-    client = Client.query.filter_by(cpf=client_cpf).first()
+    client = _find_client_by_cpf(client_cpf)
     if not client:
         return jsonify({"msg": f"Cliente com CPF {client_cpf} não encontrado"}), 404
 
@@ -212,165 +363,917 @@ def create_action():
 
     db.session.add(new_action)
     db.session.commit()
+    _publish_actions([_recent_action_to_dict(new_action, client)], created=1)
 
     return jsonify({"msg": "Ação registrada com sucesso", "action_id": new_action.id}), 201
 
 
+# Tipo esperado de cada campo dos itens de /api/actions/batch
+BATCH_ITEM_FIELDS = {
+    'clientCpf': str,
+    'actionType': str,
+    'contractNumber': str,
+    'selectedInstallmentNumber': int,
+    'status': str,
+    'notes': str,
+    'timestamp': str,
+}
+
+
+@app.route("/api/actions/batch", methods=["POST"])
+@jwt_required()
+def create_actions_batch():
+    data = request.get_json(silent=True)
+    items = data.get('actions') if isinstance(data, dict) else data
+    if not isinstance(items, list) or not items:
+        return jsonify({"msg": "Lista de ações é obrigatória"}), 400
+
+    max_size = app.config['ACTIONS_BATCH_MAX_SIZE']
+    if len(items) > max_size:
+        return jsonify({"msg": f"O lote excede o limite de {max_size} ações"}), 413
+
+    items = [item if isinstance(item, dict) else {} for item in items]
+    type_errors = {index: fields for index, fields in enumerate(map(_invalid_batch_fields, items)) if fields}
+    valid_items = [item for index, item in enumerate(items) if index not in type_errors]
+    # Duas consultas IN (em blocos de 10 mil valores) resolvem todos os CPFs e contratos do lote
+    clients = _fetch_in_chunks(
+        lambda chunk: db.session.query(Client.cpf_digits, Client.id, Client.name, Client.cpf)
+        .filter(Client.cpf_digits.in_(chunk)),
+        {cpf_digits(item.get('clientCpf')) for item in valid_items} - {None})
+    clients_by_cpf = {digits: client_id for digits, client_id, _, _ in clients}
+    client_names = {client_id: (name, cpf) for _, client_id, name, cpf in clients}
+    contracts_by_number = {
+        number: (contract_id, client_id)
+        for number, contract_id, client_id in _fetch_in_chunks(
+            lambda chunk: db.session.query(Contract.number, Contract.id, Contract.client_id)
+            .filter(Contract.number.in_(chunk)),
+            {item.get('contractNumber') for item in valid_items if item.get('contractNumber')})
+    }
+
+    operator_username = get_jwt_identity() or "Operador Desconhecido"
+    received_at = datetime.utcnow()
+    results = []
+    rows = []
+    row_indexes = []
+    for index, item in enumerate(items):
+        if index in type_errors:
+            results.append({"index": index, "status": 400,
+                            "msg": f"Tipo inválido nos campos: {', '.join(type_errors[index])}"})
+            continue
+
+        client_cpf = item.get('clientCpf')
+        contract_number = item.get('contractNumber')
+        action_type = item.get('actionType')
+
+        if not client_cpf or not action_type:
+            results.append({"index": index, "status": 400,
+                            "msg": "CPF do cliente e tipo de ação são obrigatórios"})
+            continue
+
+        client_id = clients_by_cpf.get(cpf_digits(client_cpf))
+        if client_id is None:
+            results.append({"index": index, "status": 404,
+                            "msg": f"Cliente com CPF {client_cpf} não encontrado"})
+            continue
+
+        contract_id = None
+        if contract_number:
+            contract_id, contract_client_id = contracts_by_number.get(contract_number, (None, None))
+            if contract_client_id != client_id:
+                results.append({"index": index, "status": 404,
+                                "msg": f"Contrato {contract_number} para o cliente {client_cpf} não encontrado"})
+                continue
+
+        row = {
+            'client_id': client_id,
+            'action_type': action_type,
+            'status': item.get('status', 'Concluída'),
+            'notes': item.get('notes', ''),
+            'contract_id': contract_id,
+            'installment_number': item.get('selectedInstallmentNumber'),
+            'operator': operator_username,
+            # Todas as linhas com as mesmas chaves para caberem em um único executemany
+            'timestamp': received_at
+        }
+        if item.get('timestamp'):
+            try:
+                row['timestamp'] = _parse_timestamp(item['timestamp'])
+            except ValueError:
+                results.append({"index": index, "status": 400, "msg": "Data/hora da ação inválida"})
+                continue
+        rows.append(row)
+        row_indexes.append(index)
+
+    if rows:
+        action_ids = _insert_actions(rows)
+        # O INSERT em lote não passa pelo flush do ORM
+        bump_client_versions(db.session.connection(), {row['client_id'] for row in rows})
+        db.session.commit()
+        cache.invalidate('actions')
+        results.extend({"index": index, "status": 201, "action_id": action_id}
+                       for index, action_id in zip(row_indexes, action_ids))
+
+        # Só as mais recentes vão para os dashboards conectados; o total entra como delta.
+        # O lote já foi commitado: uma falha aqui não pode virar 500 (o cliente repetiria o envio)
+        try:
+            newest = heapq.nlargest(10, zip(rows, action_ids), key=lambda pair: pair[0]['timestamp'])
+            actions_data = [{
+                "id": action_id,
+                "actionType": row['action_type'],
+                "timestamp": row['timestamp'].isoformat(),
+                "clientName": client_names[row['client_id']][0],
+                "clientCpf": client_names[row['client_id']][1],
+                "status": row['status'],
+                "notes": row['notes'],
+                "operator": row['operator'],
+            } for row, action_id in newest]
+            today_delta = sum(1 for row in rows if row['timestamp'].date() == date.today())
+        except Exception:
+            app.logger.exception("Falha ao montar a notificação do lote de ações")
+        else:
+            _publish_actions(actions_data, created=len(rows), today_delta=today_delta)
+
+    results.sort(key=lambda result: result['index'])
+    failed = len(results) - len(rows)
+    status_code = 201 if not failed else 207
+    return jsonify({"created": len(rows), "failed": failed, "results": results}), status_code
+
+
+def _insert_actions(rows):
+    """Grava as ações do lote em uma transação e devolve os ids na ordem de `rows`.
+
+    No SQLite, INSERT ... RETURNING com a ordem dos parâmetros garantida vira um INSERT por
+    linha. Lá o lote sai em um único executemany sem RETURNING e os ids são relidos na mesma
+    transação: o primeiro INSERT toma o lock de escrita do banco até o commit, então as últimas
+    len(rows) linhas da tabela são as do lote, com ids crescentes na ordem dos parâmetros.
+    """
+    stmt = insert(Action).execution_options(render_nulls=True)
+    if db.session.get_bind(Action).dialect.name != 'sqlite':
+        return db.session.scalars(stmt.returning(Action.id, sort_by_parameter_order=True), rows).all()
+    db.session.execute(stmt, rows)
+    action_ids = db.session.scalars(select(Action.id).order_by(Action.id.desc()).limit(len(rows))).all()
+    return action_ids[::-1]
+
+
+def _invalid_batch_fields(item):
+    """Campos do item do lote com valor de tipo inesperado (ausente ou null é aceito)."""
+    return [
+        field for field, expected in BATCH_ITEM_FIELDS.items()
+        if item.get(field) is not None
+        and (not isinstance(item[field], expected) or isinstance(item[field], bool))
+    ]
+
+
+def _parse_timestamp(value):
+    """Data/hora ISO 8601 como datetime ingênuo em UTC, como as gravadas pelo servidor (utcnow).
+
+    Valores com fuso são convertidos para UTC; ValueError se o texto não for uma data/hora.
+    """
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def _fetch_in_chunks(build_query, values, chunk_size=10000):
+    values = list(values)
+    rows = []
+    for start in range(0, len(values), chunk_size):
+        rows.extend(build_query(values[start:start + chunk_size]).all())
+    return rows
+
+
 @app.route("/api/actions/<int:client_id>", methods=["GET"])
 @jwt_required()
 def get_actions_by_client(client_id):
+    """Histórico de ações do cliente, da mais recente para a mais antiga, paginado por cursor.
+
+    `limit` define o tamanho da página e o cabeçalho X-Next-Cursor traz o `cursor` da próxima.
+    `since` (data/hora ISO, inclusiva) limita às ações a partir desse momento, para o front
+    buscar só o que chegou depois da última carga. Com `include_archived=1` o histórico inclui
+    as ações já movidas para o arquivo (archive.py).
+    """
     client = Client.query.get_or_404(client_id)
 
-    contract_id = request.args.get('contract_id', type=int)
-    installment_number = request.args.get('installment_number', type=int)
+    limit = request.args.get('limit', app.config['CLIENT_ACTIONS_PAGE_SIZE'], type=int)
+    try:
+        sources = _client_actions_sources(client.id, request.args)
+    except ValueError:
+        return jsonify({"msg": "Data inválida em since"}), 400
+    try:
+        # O número do contrato vem no mesmo SELECT (outer join), sem carregar action.contract por linha
+        rows, next_cursor = _client_actions_page(sources, limit, request.args.get('cursor'))
+    except (TypeError, ValueError):
+        return jsonify({"msg": "Cursor inválido"}), 400
+
+    response = jsonify([_client_action_row_to_dict(row, client) for row in rows])
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response
+
+
+def _client_actions_page(sources, limit, cursor=None):
+    """Página das consultas de `_client_actions_sources` a partir do cursor (timestamp, id);
+    devolve também o cursor da página seguinte (None na última)."""
+    if cursor:
+        cursor_timestamp, cursor_id = _decode_cursor(cursor)
+        cursor_timestamp = datetime.fromisoformat(cursor_timestamp)
+        cursor_id = int(cursor_id)
+        sources = [(query.filter(or_(
+            model.timestamp < cursor_timestamp,
+            and_(model.timestamp == cursor_timestamp, model.id < cursor_id)
+        )), model) for query, model in sources]
+
+    limit = max(1, min(limit, app.config['CLIENT_ACTIONS_PAGE_SIZE_MAX']))
+    # Cada tabela contribui no máximo limit + 1 linhas; a intercalação mantém a ordem do cursor
+    rows = list(islice(_merge_client_actions(
+        query.limit(limit + 1).all() for query, _ in sources), limit + 1))
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, _encode_cursor(rows[-1].timestamp.isoformat(), rows[-1].id)
+
+
+def _client_action_row_to_dict(row, client):
+    return {
+        'id': row.id,
+        'actionType': row.action_type,
+        'timestamp': row.timestamp.isoformat(),
+        'status': row.status,
+        'notes': row.notes,
+        'clientName': client.name,
+        'clientCpf': client.cpf,
+        'contractNumber': row.contract_number,
+        'installmentNumber': row.installment_number,
+        'operator': row.operator
+    }
 
-    query = Action.query.filter_by(client_id=client.id)
 
+@app.route("/api/clients/<cpf>/workspace", methods=["GET"])
+@jwt_required()
+def get_client_workspace(cpf):
+    """Cliente, resumo dos contratos e a primeira página de ações em uma única requisição.
+
+    Custa sempre três consultas (cliente, contratos e ações), qualquer que seja o volume.
+    `contract_id`, `installment_number` e `include_archived` filtram as ações como em
+    /api/actions/<client_id>, e `actions_limit` define o tamanho da página.
+    """
+    client = _find_client_by_cpf(cpf, joinedload(Client.phone_numbers))
+    if not client:
+        return jsonify({"msg": f"Cliente com CPF {cpf} não encontrado"}), 404
+    try:
+        sources = _client_actions_sources(client.id, request.args)
+    except ValueError:
+        return jsonify({"msg": "Data inválida em since"}), 400
+
+    def build():
+        # As parcelas vêm no mesmo SELECT (join) só para a atualização dos saldos
+        contracts = Contract.query.filter_by(client_id=client.id).options(
+            joinedload(Contract.installments)).order_by(Contract.id).all()
+        values = valuation.revalue_contracts(contracts)
+        limit = request.args.get('actions_limit', app.config['WORKSPACE_ACTIONS_LIMIT'], type=int)
+        rows, next_cursor = _client_actions_page(sources, limit)
+        return {
+            'client': _client_to_dict(client),
+            'contracts': [_contract_summary(contract, client.cpf, values[contract.id]) for contract in contracts],
+            'actions': [_client_action_row_to_dict(row, client) for row in rows],
+            'hasMoreActions': next_cursor is not None,
+            # Continua o histórico em /api/actions/<client_id>?cursor=
+            'nextActionsCursor': next_cursor,
+        }
+
+    return _conditional_client_response(client, 'workspace', build)
+
+
+@app.route("/api/actions/<int:client_id>/export", methods=["GET"])
+@jwt_required()
+def export_actions_by_client(client_id):
+    client = Client.query.get_or_404(client_id)
+
+    try:
+        sources = _client_actions_sources(client.id, request.args)
+    except ValueError:
+        return jsonify({"msg": "Data inválida em since"}), 400
+    header = ['Data/hora', 'Tipo', 'Status', 'Observações', 'Contrato', 'Parcela', 'Operador']
+    rows = (
+        (row.timestamp, row.action_type, row.status, row.notes,
+         row.contract_number, row.installment_number, row.operator)
+        for row in _merge_client_actions(
+            query.yield_per(app.config['STREAM_BATCH_SIZE']) for query, _ in sources)
+    )
+    return _export_response(f"acoes_{client.id}_{date.today().isoformat()}", 'Ações', header, rows)
+
+
+def _client_actions_sources(client_id, args):
+    """Consultas do histórico do cliente, cada uma com o seu modelo: a tabela quente e, com
+    `include_archived=1`, o arquivo das ações antigas, se a tabela dele já tiver sido criada.
+
+    ValueError se `since` não for uma data/hora ISO; com fuso, é convertido para UTC.
+    """
+    since = args.get('since')
+    since = _parse_timestamp(since) if since else None
+    sources = [(_client_actions_query(client_id, args, since), Action)]
+    if args.get('include_archived') == '1' and has_archive_schema(db.engines[ARCHIVE_BIND]):
+        sources.append((_client_actions_query(client_id, args, since, archived=True), ActionArchive))
+    return sources
+
+
+def _client_actions_query(client_id, args, since=None, archived=False):
+    if archived:
+        # O arquivo guarda o número do contrato na própria linha, sem join com o banco principal
+        model = ActionArchive
+        query = db.session.query(
+            ActionArchive.id,
+            ActionArchive.action_type,
+            ActionArchive.timestamp,
+            ActionArchive.status,
+            ActionArchive.notes,
+            ActionArchive.installment_number,
+            ActionArchive.operator,
+            ActionArchive.contract_number
+        )
+    else:
+        model = Action
+        query = db.session.query(
+            Action.id,
+            Action.action_type,
+            Action.timestamp,
+            Action.status,
+            Action.notes,
+            Action.installment_number,
+            Action.operator,
+            Contract.number.label('contract_number')
+        ).outerjoin(
+            Contract, Action.contract_id == Contract.id
+        )
+    query = query.filter(model.client_id == client_id)
+
+    contract_id = args.get('contract_id', type=int)
+    installment_number = args.get('installment_number', type=int)
     if contract_id:
-        query = query.filter_by(contract_id=contract_id)
+        query = query.filter(model.contract_id == contract_id)
     if installment_number:
-        query = query.filter_by(installment_number=installment_number)
-
-    actions = query.order_by(Action.timestamp.desc()).all()
-
-    actions_data = []
-    for action in actions:
-        actions_data.append({
-            'id': action.id,
-            'actionType': action.action_type,
-            'timestamp': action.timestamp.isoformat(),
-            'status': action.status,
-            'notes': action.notes,
-            'clientName': client.name,
-            'clientCpf': client.cpf,
-            'contractNumber': action.contract.number if action.contract else None,
-            'installmentNumber': action.installment_number,
-            'operator': action.operator
-        })
-    return jsonify(actions_data)
+        query = query.filter(model.installment_number == installment_number)
+    if since:
+        query = query.filter(model.timestamp >= since)
+
+    return query.order_by(model.timestamp.desc(), model.id.desc())
+
+
+def _merge_client_actions(streams):
+    """Intercala as linhas já ordenadas por (timestamp, id) decrescente de cada fonte.
+
+    Uma ação que o arquivamento copiou mas ainda não apagou da tabela quente aparece nas duas
+    fontes com a mesma chave, lado a lado; só a primeira é devolvida.
+    """
+    previous_id = None
+    for row in heapq.merge(*streams, key=lambda row: (row.timestamp, row.id), reverse=True):
+        if row.id != previous_id:
+            yield row
+        previous_id = row.id
+
+
+def _export_response(basename, sheet_title, header, rows):
+    file_format = request.args.get('format', 'xlsx')
+    if file_format not in EXPORT_FORMATS:
+        return jsonify({"msg": "Formato de exportação inválido: use xlsx ou csv"}), 400
+
+    if file_format == 'xlsx':
+        body = stream_xlsx(sheet_title, header, rows)
+    else:
+        body = stream_csv(header, rows)
+
+    response = Response(stream_with_context(body), mimetype=EXPORT_FORMATS[file_format])
+    response.headers['Content-Disposition'] = f'attachment; filename="{basename}.{file_format}"'
+    return response
 
 
 @app.route("/api/actions/today_count", methods=["GET"])
 @jwt_required()
+@cache.cached(tags=('actions',))
 def get_today_actions_count():
+    return jsonify({"count": _today_actions_count()})
+
+
+def _today_actions_count():
     current_date = date.today()
-    today_actions_count = Action.query.filter(
+    return Action.query.filter(
         Action.timestamp >= current_date,
         Action.timestamp < current_date + timedelta(days=1)
     ).count()
-    return jsonify({"count": today_actions_count})
 
 
 @app.route('/api/overdue_installments', methods=['GET'])
 @jwt_required()
+@cache.cached(tags=('portfolio',))
 def get_overdue_installments():
     current_date = date.today()
 
-    overdue_installments = Installment.query.filter(
-        Installment.due_date < current_date).all()
-
-    installments_data = []
-    for inst in overdue_installments:
-        client_name = inst.contract.client.name
-        client_cpf = inst.contract.client.cpf
-        days_overdue = (current_date - inst.due_date).days
-
-        installments_data.append({
-            'id': inst.id,
-            'clientName': client_name,
-            'cpf': client_cpf,
-            'contractNumber': inst.contract.number,
-            'installmentNumber': inst.number,
-            'dueDate': inst.due_date.isoformat(),
-            'daysOverdue': days_overdue,
-            'amount': inst.amount
-        })
+    limit = request.args.get('limit', type=int)
+    cursor = request.args.get('cursor')
+
+    query = _overdue_installments_query(current_date, request.args)
+
+    if cursor:
+        try:
+            cursor_due_date, cursor_id = _decode_cursor(cursor)
+            cursor_due_date = date.fromisoformat(cursor_due_date)
+            cursor_id = int(cursor_id)
+        except (TypeError, ValueError):
+            return jsonify({"msg": "Cursor inválido"}), 400
+        query = query.filter(or_(
+            Installment.due_date < cursor_due_date,
+            and_(Installment.due_date == cursor_due_date, Installment.id < cursor_id)
+        ))
+
+    if limit:
+        limit = max(1, min(limit, app.config['OVERDUE_PAGE_SIZE_MAX']))
+
+    if _wants_stream():
+        if limit:
+            query = query.limit(limit)
+        return _ndjson_response(query, lambda row: _overdue_row_to_dict(row, current_date))
+
+    next_cursor = None
+    if limit:
+        rows = query.limit(limit + 1).all()
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = _encode_cursor(rows[-1].due_date.isoformat(), rows[-1].id)
+    else:
+        rows = query.all()
+
+    response = jsonify([_overdue_row_to_dict(row, current_date) for row in rows])
+    if next_cursor:
+        response.headers['X-Next-Cursor'] = next_cursor
+    return response
+
+
+def _overdue_installments_query(current_date, args):
+    query = db.session.query(
+        Installment.id,
+        Installment.number,
+        Installment.due_date,
+        Installment.amount,
+        Contract.number.label('contract_number'),
+        Client.name.label('client_name'),
+        Client.cpf.label('client_cpf')
+    ).join(
+        Contract, Installment.contract_id == Contract.id
+    ).join(
+        Client, Contract.client_id == Client.id
+    ).filter(Installment.due_date < current_date)
+
+    contract_types = args.getlist('contract_type')
+    if contract_types:
+        query = query.filter(Contract.type.in_(contract_types))
+
+    min_amount = args.get('min_amount', type=float)
+    if min_amount is not None:
+        query = query.filter(Installment.amount >= min_amount)
+    max_amount = args.get('max_amount', type=float)
+    if max_amount is not None:
+        query = query.filter(Installment.amount <= max_amount)
+
+    # daysOverdue = hoje - vencimento, então os limites viram intervalos de due_date
+    min_days = args.get('min_days_overdue', type=int)
+    if min_days is not None:
+        query = query.filter(Installment.due_date <= current_date - timedelta(days=min_days))
+    max_days = args.get('max_days_overdue', type=int)
+    if max_days is not None:
+        query = query.filter(Installment.due_date >= current_date - timedelta(days=max_days))
+
+    # Menor atraso primeiro, como a ordenação por daysOverdue feita antes em Python
+    return query.order_by(Installment.due_date.desc(), Installment.id.desc())
+
+
+def _overdue_row_to_dict(row, current_date):
+    return {
+        'id': row.id,
+        'clientName': row.client_name,
+        'cpf': row.client_cpf,
+        'contractNumber': row.contract_number,
+        'installmentNumber': row.number,
+        'dueDate': row.due_date.isoformat(),
+        'daysOverdue': (current_date - row.due_date).days,
+        'amount': row.amount
+    }
+
+
+def _encode_cursor(*values):
+    raw = json.dumps(values, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def _decode_cursor(cursor):
+    padded = cursor + '=' * (-len(cursor) % 4)
+    try:
+        return json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, UnicodeDecodeError) as exc:
+        raise ValueError("cursor inválido") from exc
+
+
+@app.route('/api/overdue_installments/export', methods=['GET'])
+@jwt_required()
+def export_overdue_installments():
+    current_date = date.today()
+    query = _overdue_installments_query(current_date, request.args)
+
+    header = ['Cliente', 'CPF', 'Contrato', 'Parcela', 'Vencimento', 'Dias em atraso', 'Valor']
+    rows = (
+        (row.client_name, row.client_cpf, row.contract_number, row.number,
+         row.due_date, (current_date - row.due_date).days, row.amount)
+        for row in query.yield_per(app.config['STREAM_BATCH_SIZE'])
+    )
+    return _export_response(f"parcelas_em_atraso_{current_date.isoformat()}", 'Parcelas em atraso', header, rows)
+
 
-    sorted_installments = sorted(
-        installments_data, key=lambda x: x['daysOverdue'])
+@app.route('/api/portfolio/aging', methods=['GET'])
+@jwt_required()
+@cache.cached(tags=('portfolio',))
+def get_portfolio_aging():
+    current_date = date.today()
+    edges = app.config['AGING_BUCKETS']
+
+    # Cada faixa vai até `edge` dias de atraso; a primeira condição verdadeira vence
+    bucket = case(
+        *[(Installment.due_date >= current_date - timedelta(days=edge), index)
+          for index, edge in enumerate(edges)],
+        else_=len(edges)
+    ).label('bucket')
+
+    rows = db.session.query(
+        bucket,
+        Contract.type,
+        func.count(Installment.id),
+        func.sum(Installment.amount)
+    ).join(
+        Contract, Installment.contract_id == Contract.id
+    ).filter(
+        Installment.due_date < current_date
+    ).group_by(bucket, Contract.type).all()
+
+    labels = _aging_bucket_labels(edges)
+    buckets = [dict(label, count=0, amount=0.0) for label in labels]
+    by_type = {}
+    for index, contract_type, count, amount in rows:
+        buckets[index]['count'] += count
+        buckets[index]['amount'] += amount
+        type_buckets = by_type.setdefault(
+            contract_type, [dict(label, count=0, amount=0.0) for label in labels])
+        type_buckets[index]['count'] = count
+        type_buckets[index]['amount'] = round(amount, 2)
+
+    for item in buckets:
+        item['amount'] = round(item['amount'], 2)
 
-    return jsonify(sorted_installments)
+    return jsonify({
+        'asOf': current_date.isoformat(),
+        'buckets': buckets,
+        'byType': by_type,
+        'totals': {
+            'count': sum(item['count'] for item in buckets),
+            'amount': round(sum(item['amount'] for item in buckets), 2)
+        }
+    })
+
+
+@app.route('/api/portfolio/valuation', methods=['GET'])
+@jwt_required()
+@cache.cached(tags=('portfolio',))
+def get_portfolio_valuation():
+    """Saldo atualizado (multa, juros e correção pelas regras de cada tipo) de toda a carteira.
+
+    `as_of` (AAAA-MM-DD) simula a atualização em outra data; o padrão é hoje.
+    """
+    as_of = request.args.get('as_of')
+    try:
+        as_of = date.fromisoformat(as_of) if as_of else date.today()
+    except ValueError:
+        return jsonify({"msg": "as_of inválido: use AAAA-MM-DD"}), 400
+    return jsonify(valuation.revalue_portfolio(db.session, as_of))
+
+
+def _aging_bucket_labels(edges):
+    labels = []
+    lower = 1
+    for edge in edges:
+        labels.append({'label': f'{lower}-{edge}', 'minDays': lower, 'maxDays': edge})
+        lower = edge + 1
+    labels.append({'label': f'{lower}+', 'minDays': lower, 'maxDays': None})
+    return labels
 
 
 @app.route("/api/actions/recent", methods=["GET"])
 @jwt_required()
+@cache.cached(tags=('actions',))
 def get_recent_actions():
-    actions = Action.query.order_by(Action.timestamp.desc()).limit(10).all()
-    actions_data = []
-    for action in actions:
-        actions_data.append({
-            "id": action.id,
-            "actionType": action.action_type,
-            "timestamp": action.timestamp.isoformat(),
-            "clientName": action.client.name if action.client else "",
-            "clientCpf": action.client.cpf if action.client else "",
-            "status": action.status,
-            "notes": action.notes,
-            "operator": action.operator,
+    return jsonify(_recent_actions_data())
+
+
+def _recent_actions_data(limit=10):
+    # O cliente vem no mesmo SELECT, em vez de uma consulta por ação
+    actions = Action.query.options(joinedload(Action.client)).order_by(
+        Action.timestamp.desc()).limit(limit).all()
+    return [_recent_action_to_dict(action, action.client) for action in actions]
+
+
+def _recent_action_to_dict(action, client):
+    return {
+        "id": action.id,
+        "actionType": action.action_type,
+        "timestamp": action.timestamp.isoformat(),
+        "clientName": client.name if client else "",
+        "clientCpf": client.cpf if client else "",
+        "status": action.status,
+        "notes": action.notes,
+        "operator": action.operator,
+    }
+
+
+ACTIONS_TOPIC = 'actions'
+
+
+def _publish_actions(actions_data, created, today_delta=None):
+    """Publica ações recém-gravadas (já commitadas) para os streams de /api/stream/actions.
+
+    Erros são apenas registrados: a escrita já foi confirmada e a resposta não pode virar 500.
+    """
+    try:
+        if today_delta is None:
+            today = date.today().isoformat()
+            today_delta = sum(1 for action in actions_data if action['timestamp'][:10] == today)
+        broker.publish(ACTIONS_TOPIC, {
+            'day': date.today().isoformat(),
+            'created': created,
+            'todayDelta': today_delta,
+            'actions': actions_data,
         })
-    return jsonify(actions_data)
+    except Exception:
+        app.logger.exception("Falha ao publicar ações no stream")
+
+
+@app.route("/api/stream/actions", methods=["GET"])
+# EventSource não envia cabeçalhos; o token também é aceito na query string (?jwt=...)
+@jwt_required(locations=['headers', 'query_string'])
+def stream_actions():
+    """Stream SSE com as ações novas e a contagem do dia, no lugar do polling do dashboard.
+
+    Envia `snapshot` (ações recentes e contagem atual) na conexão e `actions` a cada escrita,
+    com `todayCount` mantido incrementalmente pelos deltas publicados.
+    """
+    keepalive = app.config['SSE_KEEPALIVE_SECONDS']
+
+    def snapshot():
+        data = {'todayCount': _today_actions_count(), 'recentActions': _recent_actions_data()}
+        # Libera a conexão do pool enquanto o stream fica ocioso
+        db.session.remove()
+        return data
+
+    def generate():
+        # A assinatura vem antes da leitura inicial para não perder ações gravadas no meio
+        with broker.subscribe(ACTIONS_TOPIC) as subscription:
+            state = snapshot()
+            counted_day = date.today()
+            yield _sse_event('snapshot', state)
+            while True:
+                message = subscription.get(timeout=keepalive)
+                if date.today() != counted_day or message is RESYNC:
+                    state = snapshot()
+                    counted_day = date.today()
+                    yield _sse_event('snapshot', state)
+                    continue
+                if message is None:
+                    yield ': keepalive\n\n'
+                    continue
+                if message['day'] == counted_day.isoformat():
+                    state['todayCount'] += message['todayDelta']
+                yield _sse_event('actions', {
+                    'created': message['created'],
+                    'todayCount': state['todayCount'],
+                    'actions': message['actions'],
+                })
+
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    # Impede que proxies (nginx) segurem os eventos em buffer
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def _sse_event(name, data):
+    return f"event: {name}\ndata: {app.json.dumps(data)}\n\n"
+
+
+DASHBOARD_SECTIONS = ('overdue', 'recentActions', 'todayCount')
+
+
+@app.route("/api/dashboard", methods=["GET"])
+@jwt_required()
+@cache.cached(tags=('portfolio', 'actions'))
+def get_dashboard():
+    """Resumo da inadimplência, ações recentes e contagem do dia em uma única requisição.
+
+    `sections` (separadas por vírgula ou repetidas) escolhe as partes devolvidas; sem ele, todas.
+    Os filtros de /api/overdue_installments valem para o resumo, e `overdue_limit` define
+    quantas parcelas entram na lista.
+    """
+    sections = [name for value in request.args.getlist('sections') for name in value.split(',') if name]
+    unknown = sorted(set(sections) - set(DASHBOARD_SECTIONS))
+    if unknown:
+        return jsonify({"msg": f"Seções desconhecidas: {', '.join(unknown)}"}), 400
+    sections = sections or DASHBOARD_SECTIONS
+
+    # Todas as consultas rodam na mesma transação de leitura, vendo o mesmo estado do banco
+    _begin_read_transaction()
+    data = {}
+    if 'overdue' in sections:
+        limit = request.args.get('overdue_limit', app.config['DASHBOARD_OVERDUE_LIMIT'], type=int)
+        limit = max(0, min(limit, app.config['OVERDUE_PAGE_SIZE_MAX']))
+        data['overdue'] = _overdue_summary(date.today(), request.args, limit)
+    if 'recentActions' in sections:
+        data['recentActions'] = _recent_actions_data()
+    if 'todayCount' in sections:
+        data['todayCount'] = _today_actions_count()
+    return jsonify(data)
+
+
+def _begin_read_transaction():
+    """Abre com BEGIN explícito a transação da conexão usada pelas leituras da requisição.
+
+    O pysqlite só emite BEGIN antes de escritas: sem ele, cada SELECT roda em sua própria
+    transação implícita e pode ver um estado diferente do anterior. A transação termina no
+    rollback da sessão ao fim da requisição. Nos demais bancos o driver já abre a transação.
+    """
+    connection = db.session.connection(bind_arguments={'clause': select(Action.id)})
+    if connection.dialect.name == 'sqlite' and not connection.connection.dbapi_connection.in_transaction:
+        connection.exec_driver_sql('BEGIN')
+
+
+def _overdue_summary(current_date, args, limit):
+    query = _overdue_installments_query(current_date, args)
+    filtered = query.order_by(None).subquery()
+    count, amount, clients, contracts = db.session.query(
+        func.count(filtered.c.id),
+        func.coalesce(func.sum(filtered.c.amount), 0.0),
+        func.count(func.distinct(filtered.c.client_cpf)),
+        func.count(func.distinct(filtered.c.contract_number)),
+    ).one()
+    items = query.limit(limit).all() if limit else []
+    return {
+        'items': [_overdue_row_to_dict(row, current_date) for row in items],
+        'totals': {'count': count, 'amount': amount, 'clients': clients, 'contracts': contracts},
+    }
+
+
+@app.route("/api/cache/stats", methods=["GET"])
+@jwt_required()
+def get_cache_stats():
+    return jsonify(cache.stats())
+
+
+@app.route("/api/import", methods=["POST"])
+@jwt_required()
+def import_portfolio_file():
+    upload = request.files.get('file')
+    if not upload or not upload.filename:
+        return jsonify({"msg": "Arquivo da carteira é obrigatório (campo 'file')"}), 400
+
+    chunk_size = request.form.get('chunk_size', type=int) or app.config['IMPORT_CHUNK_SIZE']
+    chunk_size = max(1, min(chunk_size, app.config['IMPORT_CHUNK_SIZE_MAX']))
+    try:
+        file_format = request.form.get('format') or detect_format(upload.filename)
+        stats = import_portfolio(upload.stream, file_format, chunk_size=chunk_size)
+    except ImportFormatError as exc:
+        db.session.rollback()
+        return jsonify({"msg": str(exc)}), 400
+    finally:
+        # Lotes já gravados ficam visíveis mesmo se a importação parar no meio
+        cache.invalidate('portfolio', 'actions')
+
+    return jsonify(stats)
+
+
+@app.cli.command('replica-sync')
+@click.option('--lag', type=float, default=2.0, help='Segundos entre as cópias (atraso simulado).')
+@click.option('--once', is_flag=True, help='Copia uma única vez e sai.')
+def replica_sync_command(lag, once):
+    """Simula a replicação local copiando o SQLite primário sobre a réplica a cada --lag s."""
+    if REPLICA_BIND not in db.engines:
+        raise click.ClickException("REPLICA_DATABASE_URL não está definida")
+    primary, replica = db.engine.url, db.engines[REPLICA_BIND].url
+    if primary.get_backend_name() != 'sqlite' or replica.get_backend_name() != 'sqlite':
+        raise click.ClickException("A simulação só copia bancos SQLite em arquivo")
+
+    while True:
+        copy_database(primary.database, replica.database)
+        click.echo(f"Réplica atualizada às {datetime.now():%H:%M:%S}")
+        if once:
+            break
+        time.sleep(lag)
+
+
+@app.cli.command('seed')
+@click.option('--clients', type=int, default=1000, show_default=True, help='Clientes gerados.')
+@click.option('--contracts-per-client', type=int, default=3, show_default=True, help='Contratos por cliente.')
+@click.option('--installments', type=int, default=12, show_default=True, help='Parcelas por contrato.')
+@click.option('--actions-per-client', type=int, default=4, show_default=True,
+              help='Média de ações registradas por cliente.')
+@click.option('--seed', 'random_seed', type=int, default=42, show_default=True, help='Semente do gerador.')
+@click.option('--chunk-size', type=int, default=10000, show_default=True, help='Clientes gravados por lote.')
+def seed_command(clients, contracts_per_client, installments, actions_per_client, random_seed, chunk_size):
+    """Gera uma carteira sintética determinística (clientes, contratos, parcelas e ações)."""
+    def report(stats):
+        click.echo(f"{stats['clients']} clientes, {stats['installments']} parcelas ({stats['seconds']:.0f}s)")
+
+    db.create_all()
+    if ensure_test_user():
+        click.echo(f"Usuário '{TEST_USERNAME}' criado (senha: {TEST_PASSWORD})")
+    try:
+        stats = seed_portfolio(clients, contracts_per_client, installments, actions_per_client,
+                               seed=random_seed, chunk_size=chunk_size, progress=report)
+    finally:
+        cache.invalidate('portfolio', 'actions')
+    click.echo(
+        f"Concluído em {stats['seconds']:.1f}s: {stats['clients']} clientes, {stats['phones']} telefones, "
+        f"{stats['contracts']} contratos, {stats['installments']} parcelas, {stats['actions']} ações")
+
+
+@app.cli.command('import-portfolio')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--chunk-size', type=int, default=None, help='Linhas gravadas por lote.')
+def import_portfolio_command(path, chunk_size):
+    """Importa clientes, contratos e parcelas de um arquivo XLSX ou CSV."""
+    def report(stats):
+        click.echo(f"{stats['rows']} linhas importadas ({stats['rowsPerSecond']:.0f} linhas/s)")
+
+    try:
+        file_format = detect_format(path)
+        with open(path, 'rb') as stream:
+            stats = import_portfolio(stream, file_format,
+                                     chunk_size=chunk_size or app.config['IMPORT_CHUNK_SIZE'],
+                                     progress=report)
+    except ImportFormatError as exc:
+        raise click.ClickException(str(exc))
+    finally:
+        cache.invalidate('portfolio', 'actions')
+
+    click.echo(
+        f"Concluído em {stats['seconds']:.1f}s: "
+        f"{stats['clientsCreated']} clientes novos, {stats['clientsUpdated']} atualizados; "
+        f"{stats['contractsCreated']} contratos novos, {stats['contractsUpdated']} atualizados; "
+        f"{stats['installmentsCreated']} parcelas novas, {stats['installmentsUpdated']} atualizadas; "
+        f"{stats['rejected']} linhas rejeitadas.")
+    for error in stats['errors']:
+        click.echo(f"  linha {error['line']}: {error['msg']}", err=True)
+
+
+@app.cli.command('archive-init')
+def archive_init_command():
+    """Cria a tabela do arquivo de ações no bind 'archive', que fica fora das migrações."""
+    ensure_archive_schema(db.engines[ARCHIVE_BIND])
+    click.echo(f"Tabela {ActionArchive.__tablename__} pronta em {db.engines[ARCHIVE_BIND].url!r}")
+
+
+@app.cli.command('archive-actions')
+@click.option('--days', type=int, default=None, help='Idade mínima, em dias, das ações arquivadas.')
+@click.option('--batch-size', type=int, default=None, help='Ações movidas por lote.')
+@click.option('--max-batches', type=int, default=None, help='Para depois desse número de lotes.')
+@click.option('--pause', type=float, default=None, help='Segundos de espera entre os lotes.')
+def archive_actions_command(days, batch_size, max_batches, pause):
+    """Move as ações antigas para o arquivo em lotes curtos; pode ser interrompido e retomado."""
+    def report(stats):
+        click.echo(f"{stats['archived']} ações arquivadas em {stats['batches']} lotes ({stats['seconds']:.0f}s)")
+
+    try:
+        before = archive_cutoff(app.config['ACTION_ARCHIVE_DAYS'] if days is None else days)
+    except ValueError as exc:
+        raise click.ClickException(str(exc))
+    try:
+        stats = archive_actions(
+            before,
+            batch_size=batch_size or app.config['ACTION_ARCHIVE_BATCH_SIZE'],
+            max_batches=max_batches,
+            pause=app.config['ACTION_ARCHIVE_PAUSE'] if pause is None else pause,
+            progress=report)
+    finally:
+        cache.invalidate('actions')
+    click.echo(f"Concluído em {stats['seconds']:.1f}s: {stats['archived']} ações anteriores a "
+               f"{before:%Y-%m-%d} arquivadas")
 
 
 if __name__ == '__main__':
 
     with app.app_context():
         db.create_all()
-        if not User.query.filter_by(username="teste_user").first():
-            print("Adicionando usuário de teste...")
-            test_user = User(username="teste_user")
-            test_user.set_password("senha_teste")
-            db.session.add(test_user)
-            db.session.commit()
-            print("Usuário 'teste_user' criado com sucesso.")
+        if ensure_test_user():
+            print(f"Usuário '{TEST_USERNAME}' criado com sucesso.")
 
         if not Client.query.first():
             print("Adicionando dados iniciais...")
-            client1 = Client(name="Maria Silva Santos", cpf="123.456.789-01",
-                             phones="(62) 99999-1234,(62) 3333-5678")
-            client2 = Client(name="João Carlos Oliveira",
-                             cpf="987.654.321-02", phones="(62) 98888-2345")
-            db.session.add_all([client1, client2])
-            db.session.commit()
-
-            contract1 = Contract(number="123456789",
-                                 type="Crédito Rural", client=client1)
-            contract2 = Contract(number="987654321",
-                                 type="Financiamento Veículo", client=client1)
-            contract3 = Contract(number="456789123",
-                                 type="Conta Corrente", client=client2)
-            # Contrato de parcela única
-            contract4 = Contract(number="111222333",
-                                 type="Empréstimo Pessoal", client=client1)
-            db.session.add_all([contract1, contract2, contract3, contract4])
-            db.session.commit()
-
-            inst1_1 = Installment(contract=contract1, number=1, due_date=date(
-                2024, 9, 15), amount=15420.50)
-            inst1_2 = Installment(contract=contract1, number=2, due_date=date(
-                2024, 10, 15), amount=15420.50)
-            inst1_3 = Installment(contract=contract1, number=3, due_date=date(
-                2024, 11, 15), amount=15420.50)
-            inst1_4 = Installment(contract=contract1, number=4, due_date=date(
-                2024, 12, 15), amount=15420.50)
-
-            inst2_1 = Installment(contract=contract2, number=1, due_date=date(
-                2024, 10, 1), amount=2890.75)
-            inst2_2 = Installment(contract=contract2, number=2, due_date=date(
-                2024, 11, 1), amount=2890.75)
-            inst2_3 = Installment(contract=contract2, number=3, due_date=date(
-                2024, 12, 1), amount=2890.75)
-
-            inst3_1 = Installment(contract=contract3, number=1, due_date=date(
-                2024, 12, 10), amount=5670.00)
-            inst3_2 = Installment(contract=contract3, number=2, due_date=date(
-                2025, 1, 10), amount=5670.00)
-
-            inst4_1 = Installment(contract=contract4, number=1, due_date=date(
-                2024, 11, 20), amount=1000.00)
-
-            db.session.add_all([inst1_1, inst1_2, inst1_3, inst1_4,
-                               inst2_1, inst2_2, inst2_3, inst3_1, inst3_2, inst4_1])
-            db.session.commit()
+            # Clientes fixos (usados pelos testes funcionais) e a carteira sintética
+            ensure_demo_clients()
+            seed_portfolio(clients=50, contracts_per_client=2, installments=6)
             print("Dados iniciais adicionados com sucesso.")
 
     app.run(debug=True)
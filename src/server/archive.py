@@ -0,0 +1,101 @@
+"""Arquivamento das ações antigas: partição quente/fria da tabela `action`.
+
+A tabela `action` fica só com o histórico recente, que é o que as rotas quentes (ações do
+dia, ações recentes, dashboard e a primeira página do histórico) consultam. `flask
+archive-actions` move as ações com mais de `ACTION_ARCHIVE_DAYS` dias para `action_archive`,
+no bind 'archive' (`ARCHIVE_DATABASE_URL`, que pode ser outro arquivo SQLite; vazio usa o
+próprio banco principal). Cada lote, do mais antigo para o mais novo, passa por duas
+transações curtas, para não segurar o lock de escrita do SQLite:
+
+1. copia as ações (com o número do contrato) para o arquivo, substituindo as de mesmo id;
+2. apaga as mesmas ações da tabela quente e incrementa a versão dos clientes afetados.
+
+Se o processo parar entre os dois passos, o lote fica nos dois lugares até a próxima execução,
+que o copia de novo e conclui a remoção; as leituras que juntam as duas tabelas descartam os
+ids repetidos. O histórico por cliente só lê o arquivo quando pedido (`include_archived=1`) e
+enquanto a tabela do arquivo não existe (antes de `flask archive-init` ou do primeiro
+arquivamento, que a cria) o pedido devolve só a tabela quente.
+"""
+import time
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import func, inspect, select
+
+from models import ARCHIVE_BIND, db, Action, ActionArchive, Contract, bump_client_versions
+
+__all__ = ['ARCHIVE_BIND', 'archive_actions', 'archive_cutoff', 'ensure_archive_schema', 'has_archive_schema']
+
+
+def ensure_archive_schema(engine):
+    """Cria a tabela do arquivo (e seu índice) no engine do bind, se ainda não existir."""
+    ActionArchive.__table__.create(engine, checkfirst=True)
+
+
+def has_archive_schema(engine):
+    """Se a tabela do arquivo já existe no engine do bind."""
+    return inspect(engine).has_table(ActionArchive.__tablename__)
+
+
+def archive_cutoff(days, today=None):
+    """Meia-noite de `days` dias atrás: ações anteriores a ela vão para o arquivo."""
+    if days < 1:
+        raise ValueError("O horizonte do arquivamento é de pelo menos 1 dia")
+    today = today or date.today()
+    return datetime.combine(today - timedelta(days=days), datetime.min.time())
+
+
+def archive_actions(before, batch_size=2000, max_batches=None, pause=0.0, progress=None):
+    """Move para o arquivo as ações com timestamp anterior a `before`; devolve as contagens.
+
+    `max_batches` limita a execução (a próxima continua de onde esta parou) e `pause` é a espera
+    entre os lotes. `progress`, se informado, recebe as contagens a cada lote. A tabela do
+    arquivo é criada na primeira execução, se ainda não existir.
+    """
+    ensure_archive_schema(db.engines[ARCHIVE_BIND])
+    actions = Action.__table__
+    archive = ActionArchive.__table__
+    contracts = Contract.__table__
+    batch = (
+        select(*actions.c, contracts.c.number.label('contract_number'))
+        .select_from(actions.outerjoin(contracts, actions.c.contract_id == contracts.c.id))
+        .where(actions.c.timestamp < before)
+        # Sem AUTOINCREMENT o SQLite reaproveita o maior id apagado; a ação de maior id fica na
+        # tabela quente para que uma ação nova nunca receba o id de uma já arquivada
+        .where(actions.c.id < select(func.max(actions.c.id)).scalar_subquery())
+        .order_by(actions.c.timestamp, actions.c.id)
+        .limit(batch_size)
+    )
+    columns = [column.name for column in archive.c if column.name != 'archived_at']
+    started = time.perf_counter()
+    stats = {'archived': 0, 'batches': 0}
+
+    while max_batches is None or stats['batches'] < max_batches:
+        rows = db.session.execute(batch).mappings().all()
+        if not rows:
+            break
+        ids = [row['id'] for row in rows]
+        archived_at = datetime.utcnow()
+
+        # Passo 1: cópia idempotente para o arquivo (o bind sai da tabela de cada comando)
+        db.session.execute(archive.delete().where(archive.c.id.in_(ids)))
+        db.session.execute(archive.insert(), [
+            {**{name: row[name] for name in columns}, 'archived_at': archived_at} for row in rows])
+        db.session.commit()
+
+        # Passo 2: remoção da tabela quente; a versão muda os ETags do histórico dos clientes
+        db.session.execute(actions.delete().where(actions.c.id.in_(ids)))
+        bump_client_versions(db.session.connection(), {row['client_id'] for row in rows})
+        db.session.commit()
+
+        stats['archived'] += len(rows)
+        stats['batches'] += 1
+        stats['seconds'] = time.perf_counter() - started
+        if progress:
+            progress(stats)
+        if len(rows) < batch_size:
+            break
+        if pause:
+            time.sleep(pause)
+
+    stats['seconds'] = time.perf_counter() - started
+    return stats
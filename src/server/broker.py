@@ -0,0 +1,199 @@
+"""Pub/sub de eventos do backend para os streams Server-Sent Events.
+
+Quem grava publica uma mensagem em um tópico (`publish`) depois do commit; cada conexão SSE
+abre uma assinatura (`subscribe`) e recebe as mensagens publicadas a partir dali.
+
+Backends disponíveis (`EVENTS_BACKEND`):
+
+- `memory`: filas do próprio processo; adequado para um único worker.
+- `sqlite`: tabela de eventos em um arquivo SQLite local, lida por polling curto pelas
+  assinaturas, de modo que uma publicação em um worker chega aos streams dos demais.
+"""
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+
+# Devolvido por `Subscription.get` quando mensagens foram perdidas e o estado precisa ser relido
+RESYNC = object()
+
+
+class MemorySubscription:
+    def __init__(self, broker, topic, max_pending):
+        self._broker = broker
+        self.topic = topic
+        self._queue = queue.Queue(maxsize=max_pending)
+
+    def deliver(self, message):
+        try:
+            self._queue.put_nowait(message)
+        except queue.Full:
+            # Consumidor lento: descarta o que está pendente e pede uma releitura completa
+            with self._queue.mutex:
+                self._queue.queue.clear()
+            self._queue.put_nowait(RESYNC)
+
+    def get(self, timeout):
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self._broker.unsubscribe(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class MemoryBroker:
+    name = 'memory'
+
+    def __init__(self, max_pending=1000):
+        self.max_pending = max_pending
+        self._subscriptions = set()
+        self._lock = threading.Lock()
+
+    def publish(self, topic, message):
+        with self._lock:
+            subscriptions = [sub for sub in self._subscriptions if sub.topic == topic]
+        for subscription in subscriptions:
+            subscription.deliver(message)
+
+    def subscribe(self, topic):
+        subscription = MemorySubscription(self, topic, self.max_pending)
+        with self._lock:
+            self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def subscriber_count(self):
+        return len(self._subscriptions)
+
+
+class SQLiteSubscription:
+    def __init__(self, broker, topic):
+        self._broker = broker
+        self.topic = topic
+        self._pending = []
+        self._last_id = broker.last_id()
+
+    def get(self, timeout):
+        deadline = time.monotonic() + timeout
+        while not self._pending:
+            rows = self._broker.read_after(self.topic, self._last_id)
+            if rows:
+                if rows[0][0] > self._last_id + 1 and self._broker.pruned_after(self._last_id):
+                    # As mensagens seguintes já foram removidas pela retenção
+                    self._pending.append(RESYNC)
+                self._last_id = rows[-1][0]
+                self._pending.extend(json.loads(payload) for _, payload in rows)
+                break
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            time.sleep(min(self._broker.poll_interval, remaining))
+        return self._pending.pop(0)
+
+    def close(self):
+        self._broker.unsubscribe(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class SQLiteBroker:
+    name = 'sqlite'
+
+    def __init__(self, path, poll_interval=0.2, retention=10000):
+        self.path = path
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self._local = threading.local()
+        self._subscriptions = set()
+        self._lock = threading.Lock()
+        conn = self._connect()
+        conn.execute("CREATE TABLE IF NOT EXISTS broker_message ("
+                     "id INTEGER PRIMARY KEY AUTOINCREMENT, topic TEXT NOT NULL, "
+                     "payload TEXT NOT NULL, created_at REAL NOT NULL)")
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_broker_message_topic_id ON broker_message (topic, id)")
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def publish(self, topic, message):
+        conn = self._connect()
+        cursor = conn.execute("INSERT INTO broker_message (topic, payload, created_at) VALUES (?, ?, ?)",
+                              (topic, json.dumps(message), time.time()))
+        conn.execute("DELETE FROM broker_message WHERE id <= ?", (cursor.lastrowid - self.retention,))
+
+    def read_after(self, topic, last_id):
+        return self._connect().execute(
+            "SELECT id, payload FROM broker_message WHERE topic = ? AND id > ? ORDER BY id",
+            (topic, last_id)).fetchall()
+
+    def last_id(self):
+        return self._connect().execute("SELECT COALESCE(MAX(id), 0) FROM broker_message").fetchone()[0]
+
+    def pruned_after(self, last_id):
+        oldest = self._connect().execute("SELECT MIN(id) FROM broker_message").fetchone()[0]
+        return oldest is not None and oldest > last_id + 1
+
+    def subscribe(self, topic):
+        subscription = SQLiteSubscription(self, topic)
+        with self._lock:
+            self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def subscriber_count(self):
+        # Apenas as assinaturas deste processo
+        return len(self._subscriptions)
+
+
+class MessageBroker:
+    def __init__(self, app=None):
+        self.backend = MemoryBroker()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        backend = app.config.get('EVENTS_BACKEND', 'memory')
+        if backend == 'memory':
+            self.backend = MemoryBroker()
+        elif backend == 'sqlite':
+            path = app.config.get('EVENTS_SQLITE_PATH') or os.path.join(app.instance_path, 'events.db')
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self.backend = SQLiteBroker(path, poll_interval=app.config.get('EVENTS_POLL_INTERVAL', 0.2))
+        else:
+            raise ValueError(f"EVENTS_BACKEND desconhecido: {backend}")
+        app.extensions['message_broker'] = self
+
+    def publish(self, topic, message):
+        self.backend.publish(topic, message)
+
+    def subscribe(self, topic):
+        return self.backend.subscribe(topic)
+
+    def subscriber_count(self):
+        return self.backend.subscriber_count()
@@ -0,0 +1,243 @@
+"""Cache de respostas das rotas GET de leitura frequente (dashboards).
+
+As entradas expiram por TTL e são descartadas por LRU quando o limite é atingido. A invalidação
+é feita por tags: cada tag tem um contador de geração que entra na chave, então incrementar o
+contador (`invalidate`) torna obsoletas de uma vez todas as respostas que dependem dela.
+
+Backends disponíveis (`CACHE_BACKEND`):
+
+- `memory`: dicionário do próprio processo; adequado para um único worker.
+- `sqlite`: arquivo SQLite local compartilhado entre os workers da mesma máquina, inclusive
+  as gerações das tags, de modo que uma escrita em um worker invalida os demais.
+- `null`: desliga o cache.
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+from functools import wraps
+
+from flask import Response, current_app, request
+
+# Cabeçalhos da resposta original que precisam ser devolvidos junto com o corpo em cache
+CACHED_HEADERS = ('X-Next-Cursor',)
+
+
+class NullCacheBackend:
+    name = 'null'
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value, ttl):
+        pass
+
+    def generation(self, tag):
+        return 0
+
+    def bump(self, tag):
+        pass
+
+    def clear(self):
+        pass
+
+    def __len__(self):
+        return 0
+
+
+class MemoryCacheBackend:
+    name = 'memory'
+
+    def __init__(self, max_entries=1024, clock=time.monotonic):
+        self.max_entries = max_entries
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._generations = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= self._clock():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (self._clock() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def generation(self, tag):
+        return self._generations.get(tag, 0)
+
+    def bump(self, tag):
+        with self._lock:
+            self._generations[tag] = self._generations.get(tag, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteCacheBackend:
+    name = 'sqlite'
+
+    def __init__(self, path, max_entries=1024, clock=time.time):
+        self.path = path
+        self.max_entries = max_entries
+        self._clock = clock
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS cache_entry ("
+                         "key TEXT PRIMARY KEY, value BLOB NOT NULL, "
+                         "expires_at REAL NOT NULL, accessed_at REAL NOT NULL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_cache_entry_accessed_at "
+                         "ON cache_entry (accessed_at)")
+            conn.execute("CREATE TABLE IF NOT EXISTS cache_generation ("
+                         "tag TEXT PRIMARY KEY, generation INTEGER NOT NULL)")
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        conn = self._connect()
+        now = self._clock()
+        row = conn.execute("SELECT value, expires_at FROM cache_entry WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        if row[1] <= now:
+            conn.execute("DELETE FROM cache_entry WHERE key = ?", (key,))
+            return None
+        conn.execute("UPDATE cache_entry SET accessed_at = ? WHERE key = ?", (now, key))
+        return pickle.loads(row[0])
+
+    def set(self, key, value, ttl):
+        conn = self._connect()
+        now = self._clock()
+        conn.execute("INSERT OR REPLACE INTO cache_entry (key, value, expires_at, accessed_at) "
+                     "VALUES (?, ?, ?, ?)", (key, pickle.dumps(value), now + ttl, now))
+        conn.execute("DELETE FROM cache_entry WHERE key IN (SELECT key FROM cache_entry "
+                     "ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)", (self.max_entries,))
+
+    def generation(self, tag):
+        row = self._connect().execute(
+            "SELECT generation FROM cache_generation WHERE tag = ?", (tag,)).fetchone()
+        return row[0] if row else 0
+
+    def bump(self, tag):
+        self._connect().execute(
+            "INSERT INTO cache_generation (tag, generation) VALUES (?, 1) "
+            "ON CONFLICT(tag) DO UPDATE SET generation = generation + 1", (tag,))
+
+    def clear(self):
+        self._connect().execute("DELETE FROM cache_entry")
+
+    def __len__(self):
+        return self._connect().execute("SELECT COUNT(*) FROM cache_entry").fetchone()[0]
+
+
+class ResponseCache:
+    def __init__(self, app=None):
+        self.backend = NullCacheBackend()
+        self.default_ttl = 30
+        self.hits = 0
+        self.misses = 0
+        self._bypass = []
+        self._counter_lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        backend = app.config.get('CACHE_BACKEND', 'memory')
+        max_entries = app.config.get('CACHE_MAX_ENTRIES', 1024)
+        if backend == 'memory':
+            self.backend = MemoryCacheBackend(max_entries)
+        elif backend == 'sqlite':
+            path = app.config.get('CACHE_SQLITE_PATH') or os.path.join(app.instance_path, 'response_cache.db')
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self.backend = SQLiteCacheBackend(path, max_entries)
+        elif backend == 'null':
+            self.backend = NullCacheBackend()
+        else:
+            raise ValueError(f"CACHE_BACKEND desconhecido: {backend}")
+        self.default_ttl = app.config.get('CACHE_DEFAULT_TTL', 30)
+        app.extensions['response_cache'] = self
+
+    def bypass_when(self, predicate):
+        """Registra um predicado que, verdadeiro na requisição, executa a view sem ler nem gravar o cache."""
+        self._bypass.append(predicate)
+
+    def cached(self, tags, ttl=None):
+        """Decora uma view GET; a chave combina rota, query string, Accept, data e gerações das tags."""
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                if any(predicate() for predicate in self._bypass):
+                    return view(*args, **kwargs)
+                key = self._key(tags)
+                entry = self.backend.get(key)
+                if entry is not None:
+                    self._count(hit=True)
+                    body, mimetype, headers = entry
+                    return Response(body, mimetype=mimetype, headers=headers)
+
+                self._count(hit=False)
+                response = current_app.make_response(view(*args, **kwargs))
+                if response.status_code == 200 and not response.is_streamed:
+                    headers = {name: response.headers[name] for name in CACHED_HEADERS if name in response.headers}
+                    self.backend.set(key, (response.get_data(), response.mimetype, headers),
+                                     ttl or self.default_ttl)
+                return response
+            return wrapper
+        return decorator
+
+    def invalidate(self, *tags):
+        for tag in tags:
+            self.backend.bump(tag)
+
+    def clear(self):
+        self.backend.clear()
+        with self._counter_lock:
+            self.hits = self.misses = 0
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'backend': self.backend.name,
+            'entries': len(self.backend),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hitRatio': round(self.hits / total, 4) if total else 0.0,
+        }
+
+    def _count(self, hit):
+        with self._counter_lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def _key(self, tags):
+        args = '&'.join(f'{name}={value}' for name, value in sorted(request.args.items(multi=True)))
+        generations = ','.join(f'{tag}:{self.backend.generation(tag)}' for tag in tags)
+        # A data entra na chave porque daysOverdue e today_count mudam na virada do dia
+        return f'{request.path}?{args}|{request.headers.get("Accept", "")}|{date.today().isoformat()}|{generations}'
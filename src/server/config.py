@@ -1,3 +1,4 @@
+import json
 import os
 
 
@@ -6,3 +7,141 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.environ.get(
         'DATABASE_URL') or 'sqlite:///site.db'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # Pool de conexões do engine (database.engine_options; ignorado no SQLite em memória)
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 5))
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 10))
+    DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 3600))
+    DB_POOL_PRE_PING = os.environ.get('DB_POOL_PRE_PING', '0') == '1'
+
+    # Réplica de leitura (replica.py): URL do bind 'replica' (vazia desliga), segundos em que
+    # as leituras de quem acabou de gravar ficam no primário e pausa após uma falha da réplica
+    REPLICA_DATABASE_URL = os.environ.get('REPLICA_DATABASE_URL')
+    REPLICA_STICKY_SECONDS = float(os.environ.get('REPLICA_STICKY_SECONDS', 5))
+    REPLICA_RETRY_INTERVAL = float(os.environ.get('REPLICA_RETRY_INTERVAL', 10))
+
+    # Arquivamento das ações (archive.py): banco do arquivo (vazio: o próprio banco principal),
+    # idade em dias a partir da qual as ações saem da tabela quente, ações movidas por lote e
+    # pausa em segundos entre os lotes para não segurar as escritas da API
+    ARCHIVE_DATABASE_URL = os.environ.get('ARCHIVE_DATABASE_URL')
+    ACTION_ARCHIVE_DAYS = int(os.environ.get('ACTION_ARCHIVE_DAYS', 365))
+    ACTION_ARCHIVE_BATCH_SIZE = int(os.environ.get('ACTION_ARCHIVE_BATCH_SIZE', 2000))
+    ACTION_ARCHIVE_PAUSE = float(os.environ.get('ACTION_ARCHIVE_PAUSE', 0.05))
+
+    # PRAGMAs aplicados a cada conexão SQLite (database.configure_engine): modo do journal,
+    # espera pelo lock de escrita em ms, durabilidade, cache de páginas em KiB, bytes mapeados
+    # em memória (0 desliga) e tabelas temporárias
+    SQLITE_JOURNAL_MODE = os.environ.get('SQLITE_JOURNAL_MODE', 'WAL')
+    SQLITE_BUSY_TIMEOUT = int(os.environ.get('SQLITE_BUSY_TIMEOUT', 5000))
+    SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')
+    SQLITE_CACHE_SIZE_KB = int(os.environ.get('SQLITE_CACHE_SIZE_KB', 16384))
+    SQLITE_MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE', 0))
+    SQLITE_TEMP_STORE = os.environ.get('SQLITE_TEMP_STORE', 'MEMORY')
+
+    # Tamanho máximo de página aceito nas listagens paginadas por cursor
+    OVERDUE_PAGE_SIZE_MAX = int(os.environ.get('OVERDUE_PAGE_SIZE_MAX', 1000))
+
+    # Parcelas em atraso listadas por padrão no resumo de /api/dashboard
+    DASHBOARD_OVERDUE_LIMIT = int(os.environ.get('DASHBOARD_OVERDUE_LIMIT', 20))
+
+    # Ações devolvidas na primeira página de /api/clients/<cpf>/workspace
+    WORKSPACE_ACTIONS_LIMIT = int(os.environ.get('WORKSPACE_ACTIONS_LIMIT', 50))
+
+    # Ações por página em /api/actions/<client_id> quando ?limit= não é informado e o maior
+    # limit aceito (também no actions_limit do workspace)
+    CLIENT_ACTIONS_PAGE_SIZE = int(os.environ.get('CLIENT_ACTIONS_PAGE_SIZE', 50))
+    CLIENT_ACTIONS_PAGE_SIZE_MAX = int(os.environ.get('CLIENT_ACTIONS_PAGE_SIZE_MAX', 1000))
+
+    # Resultados devolvidos por /api/clients/search (padrão e máximo aceito em ?limit=)
+    CLIENT_SEARCH_LIMIT = int(os.environ.get('CLIENT_SEARCH_LIMIT', 20))
+    CLIENT_SEARCH_LIMIT_MAX = int(os.environ.get('CLIENT_SEARCH_LIMIT_MAX', 50))
+
+    # Linhas lidas do cursor do banco por vez nas respostas em streaming (NDJSON)
+    STREAM_BATCH_SIZE = int(os.environ.get('STREAM_BATCH_SIZE', 1000))
+
+    # Limites superiores (em dias de atraso) das faixas de aging da carteira; a última faixa é aberta
+    AGING_BUCKETS = [int(edge) for edge in os.environ.get('AGING_BUCKETS', '30,60,90,180').split(',')]
+
+    # Regras de atualização de saldo por tipo de contrato, em taxas mensais: multa ('fine', uma vez
+    # sobre a parcela vencida), juros de mora ('interest', pro rata die) e correção monetária
+    # ('correction', composta). 'default' vale para os tipos não listados; VALUATION_RULES (JSON)
+    # substitui a tabela inteira.
+    VALUATION_RULES = json.loads(os.environ['VALUATION_RULES']) if 'VALUATION_RULES' in os.environ else {
+        'default': {'fine': 0.02, 'interest': 0.01, 'correction': 0.0},
+        'Crédito Rural': {'fine': 0.02, 'interest': 0.01, 'correction': 0.0},
+        'Financiamento Veículo': {'fine': 0.02, 'interest': 0.01, 'correction': 0.004},
+        'Empréstimo Pessoal': {'fine': 0.02, 'interest': 0.01, 'correction': 0.004},
+        'Conta Corrente': {'fine': 0.02, 'interest': 0.08, 'correction': 0.0},
+    }
+
+    # Linhas gravadas por transação na importação de carteira (XLSX/CSV) e máximo aceito em
+    # /api/import: cada lote vira listas IN (...) nas consultas de upsert, e o SQLite limita o
+    # número de parâmetros por comando (32766)
+    IMPORT_CHUNK_SIZE = int(os.environ.get('IMPORT_CHUNK_SIZE', 5000))
+    IMPORT_CHUNK_SIZE_MAX = int(os.environ.get('IMPORT_CHUNK_SIZE_MAX', 20000))
+
+    # Quantidade máxima de ações aceitas em uma chamada de /api/actions/batch
+    ACTIONS_BATCH_MAX_SIZE = int(os.environ.get('ACTIONS_BATCH_MAX_SIZE', 50000))
+
+    # Cache de respostas dos dashboards: 'memory' (por processo), 'sqlite' (compartilhado
+    # entre workers da máquina, em CACHE_SQLITE_PATH) ou 'null' (desligado)
+    CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'memory')
+    CACHE_DEFAULT_TTL = int(os.environ.get('CACHE_DEFAULT_TTL', 30))
+    CACHE_MAX_ENTRIES = int(os.environ.get('CACHE_MAX_ENTRIES', 1024))
+    CACHE_SQLITE_PATH = os.environ.get('CACHE_SQLITE_PATH')
+
+    # Pub/sub dos streams SSE: 'memory' (por processo) ou 'sqlite' (compartilhado entre os
+    # workers da máquina, em EVENTS_SQLITE_PATH, lido por polling a cada EVENTS_POLL_INTERVAL s)
+    EVENTS_BACKEND = os.environ.get('EVENTS_BACKEND', 'memory')
+    EVENTS_SQLITE_PATH = os.environ.get('EVENTS_SQLITE_PATH')
+    EVENTS_POLL_INTERVAL = float(os.environ.get('EVENTS_POLL_INTERVAL', 0.2))
+
+    # Intervalo dos comentários de keep-alive enviados nos streams SSE ociosos
+    SSE_KEEPALIVE_SECONDS = int(os.environ.get('SSE_KEEPALIVE_SECONDS', 15))
+
+    # Instrumentação (instrumentation.py): cabeçalho Server-Timing nas respostas, histogramas
+    # por rota em /metrics e log dos SQLs acima de SLOW_QUERY_MS ms com o plano de execução
+    # (0 desliga o log). Com METRICS_TOKEN, /metrics exige `Authorization: Bearer <token>`;
+    # sem ele a rota fica aberta e só pode ser exposta na rede interna. Os parâmetros dos SQLs
+    # lentos (senhas, CPFs, telefones) só vão para o log com SLOW_QUERY_LOG_PARAMETERS=1
+    SERVER_TIMING_ENABLED = os.environ.get('SERVER_TIMING_ENABLED', '1') == '1'
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', '1') == '1'
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+    SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', 0))
+    SLOW_QUERY_EXPLAIN = os.environ.get('SLOW_QUERY_EXPLAIN', '1') == '1'
+    SLOW_QUERY_LOG_PARAMETERS = os.environ.get('SLOW_QUERY_LOG_PARAMETERS', '0') == '1'
+
+
+class DevelopmentConfig(Config):
+    pass
+
+
+class TestingConfig(Config):
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite://'
+
+
+class ProductionConfig(Config):
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 10))
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 20))
+    DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 1800))
+    DB_POOL_PRE_PING = os.environ.get('DB_POOL_PRE_PING', '1') == '1'
+    SQLITE_CACHE_SIZE_KB = int(os.environ.get('SQLITE_CACHE_SIZE_KB', 65536))
+    SQLITE_MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))
+
+
+# Perfis selecionados pela variável de ambiente APP_ENV
+PROFILES = {
+    'development': DevelopmentConfig,
+    'testing': TestingConfig,
+    'production': ProductionConfig,
+}
+
+
+def get_config(name=None):
+    """Classe de configuração do perfil `name` (padrão: APP_ENV, ou 'development')."""
+    name = name or os.environ.get('APP_ENV', 'development')
+    try:
+        return PROFILES[name]
+    except KeyError:
+        raise ValueError(f"APP_ENV inválido: {name!r} (use {', '.join(PROFILES)})") from None
@@ -0,0 +1,52 @@
+"""Normalização e validação de CPF.
+
+O CPF é gravado em `Client.cpf_digits` só com os 11 dígitos, chave de todas as buscas; o
+campo `Client.cpf` guarda a forma formatada (000.000.000-00) usada na exibição.
+"""
+
+
+def cpf_digits(value):
+    """Extrai os dígitos do CPF em qualquer formato, ou None se não sobrarem 11 dígitos."""
+    if value is None:
+        return None
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    if isinstance(value, int):
+        # Células numéricas de planilha perdem os zeros à esquerda
+        text = str(value).zfill(11)
+    else:
+        text = ''.join(char for char in str(value) if char.isdigit())
+    return text if len(text) == 11 else None
+
+
+def is_valid_cpf(digits):
+    """Confere os dois dígitos verificadores de um CPF com 11 dígitos.
+
+    Sequências de um só dígito (111.111.111-11) passam no cálculo, mas não são CPFs emitidos.
+    """
+    if not digits or len(digits) != 11 or not digits.isdigit():
+        return False
+    if len(set(digits)) == 1:
+        return False
+    return cpf_from_base(digits[:9]) == digits
+
+
+def cpf_from_base(base):
+    """Completa os 9 primeiros dígitos com os dois verificadores."""
+    numbers = [int(char) for char in base]
+    for weights_start in (10, 11):
+        total = sum(number * weight for number, weight in zip(numbers, range(weights_start, 1, -1)))
+        numbers.append(total * 10 % 11 % 10)
+    return ''.join(str(number) for number in numbers)
+
+
+def format_cpf(digits):
+    return f'{digits[:3]}.{digits[3:6]}.{digits[6:9]}-{digits[9:]}'
+
+
+def parse_cpf(value):
+    """Devolve os 11 dígitos de um CPF válido; ValueError se o formato ou os verificadores falharem."""
+    digits = cpf_digits(value)
+    if digits is None or not is_valid_cpf(digits):
+        raise ValueError(f"CPF inválido: {value!r}")
+    return digits
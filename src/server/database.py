@@ -0,0 +1,65 @@
+"""Configuração do engine do banco: opções de pool e PRAGMAs do SQLite por conexão.
+
+Os valores vêm do perfil de configuração ativo (`APP_ENV`, ver config.py). No SQLite em arquivo
+cada conexão nova recebe os PRAGMAs de `sqlite_pragmas`: WAL para que leituras não bloqueiem a
+escrita (e vice-versa), `busy_timeout` para que escritores concorrentes esperem o lock em vez de
+falharem com "database is locked", `synchronous=NORMAL` (seguro com WAL), cache de páginas e
+I/O mapeado em memória.
+"""
+from sqlalchemy import event, make_url
+
+
+def _is_memory_sqlite(url):
+    return url.get_backend_name() == 'sqlite' and url.database in (None, '', ':memory:')
+
+
+def pool_options(url, config, pool_size=None):
+    """Opções de pool do perfil para um engine em `url`.
+
+    SQLite em memória usa uma conexão única (StaticPool), que não aceita opções de pool.
+    """
+    if _is_memory_sqlite(make_url(url)):
+        return {}
+    return {
+        'pool_size': pool_size or config['DB_POOL_SIZE'],
+        'max_overflow': config['DB_MAX_OVERFLOW'],
+        'pool_recycle': config['DB_POOL_RECYCLE'],
+        'pool_pre_ping': config['DB_POOL_PRE_PING'],
+    }
+
+
+def engine_options(config):
+    """SQLALCHEMY_ENGINE_OPTIONS com o pool do perfil; as opções já definidas prevalecem."""
+    return {**pool_options(config['SQLALCHEMY_DATABASE_URI'], config),
+            **(config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})}
+
+
+def sqlite_pragmas(config, url):
+    """PRAGMAs aplicados a cada conexão, na ordem; journal_mode só vale para arquivos."""
+    pragmas = [
+        ('busy_timeout', config['SQLITE_BUSY_TIMEOUT']),
+        ('synchronous', config['SQLITE_SYNCHRONOUS']),
+        # Negativo: tamanho em KiB, e não em páginas
+        ('cache_size', -config['SQLITE_CACHE_SIZE_KB']),
+        ('mmap_size', config['SQLITE_MMAP_SIZE']),
+        ('temp_store', config['SQLITE_TEMP_STORE']),
+    ]
+    if not _is_memory_sqlite(url):
+        pragmas.insert(0, ('journal_mode', config['SQLITE_JOURNAL_MODE']))
+    return pragmas
+
+
+def configure_engine(engine, config):
+    """Registra no `engine` o hook que aplica os PRAGMAs do SQLite a cada conexão nova."""
+    if engine.dialect.name != 'sqlite':
+        return
+    pragmas = sqlite_pragmas(config, engine.url)
+
+    @event.listens_for(engine, 'connect')
+    def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas:
+                cursor.execute(f'PRAGMA {name}={value}')
+        finally:
+            cursor.close()
@@ -0,0 +1,346 @@
+"""Importação em lote da carteira (clientes, contratos e parcelas) a partir de XLSX ou CSV.
+
+A planilha tem uma linha por parcela. As linhas são lidas em streaming (openpyxl em modo
+`read_only` ou `csv`), agrupadas em lotes e gravadas com inserts/updates em lote, fazendo
+upsert de clientes pelo CPF, de contratos pelo número e de parcelas por (contrato, número).
+"""
+import codecs
+import csv
+import io
+import time
+import unicodedata
+import zipfile
+from datetime import date, datetime
+from itertools import islice
+
+from openpyxl import load_workbook
+from openpyxl.utils.exceptions import InvalidFileException
+from sqlalchemy import delete, select, update
+
+from cpf import format_cpf, parse_cpf
+from models import db, Client, ClientPhone, Contract, Installment, bump_client_versions, refresh_contract_aggregates
+from phones import parse_phones
+
+COLUMN_ALIASES = {
+    'cpf': ('cpf', 'cpf_cliente'),
+    'name': ('name', 'nome', 'cliente', 'nome_cliente'),
+    'phones': ('phones', 'telefones', 'telefone'),
+    'contract_number': ('contract_number', 'contrato', 'numero_contrato'),
+    'contract_type': ('contract_type', 'tipo', 'tipo_contrato'),
+    'installment_number': ('installment_number', 'parcela', 'numero_parcela'),
+    'due_date': ('due_date', 'vencimento', 'data_vencimento'),
+    'amount': ('amount', 'valor', 'valor_parcela'),
+}
+OPTIONAL_COLUMNS = {'phones'}
+SUPPORTED_FORMATS = ('xlsx', 'csv')
+MAX_REPORTED_ERRORS = 100
+
+
+class ImportFormatError(ValueError):
+    """Arquivo que não pode ser importado (formato ou cabeçalho inválido)."""
+
+
+def _decode_as_cp1252(error):
+    # O Excel em pt-BR salva CSV em Windows-1252 (Latin-1): os bytes que não formam UTF-8
+    # válido são lidos nessa codificação, sem exigir que o usuário converta o arquivo
+    return error.object[error.start:error.end].decode('cp1252', errors='replace'), error.end
+
+
+codecs.register_error('importer.cp1252', _decode_as_cp1252)
+
+
+def detect_format(filename):
+    extension = filename.rsplit('.', 1)[-1].lower() if filename and '.' in filename else ''
+    if extension not in SUPPORTED_FORMATS:
+        raise ImportFormatError("Formato não suportado: use .xlsx ou .csv")
+    return extension
+
+
+def import_portfolio(stream, file_format, chunk_size=5000, progress=None):
+    """Importa o arquivo binário `stream` e devolve as estatísticas da carga.
+
+    `progress`, se informado, é chamado após cada lote com as estatísticas parciais.
+    """
+    started = time.perf_counter()
+    stats = {
+        'rows': 0, 'rejected': 0,
+        'clientsCreated': 0, 'clientsUpdated': 0,
+        'contractsCreated': 0, 'contractsUpdated': 0,
+        'installmentsCreated': 0, 'installmentsUpdated': 0,
+        'errors': [],
+    }
+
+    rows = _iter_rows(stream, file_format)
+    columns = _resolve_columns(next(rows, None))
+
+    line_number = 1
+    while True:
+        raw_chunk = list(islice(rows, chunk_size))
+        if not raw_chunk:
+            break
+        records = []
+        for raw in raw_chunk:
+            line_number += 1
+            if raw is None or all(value in (None, '') for value in raw):
+                continue
+            try:
+                records.append(_parse_record(raw, columns))
+            except ValueError as exc:
+                stats['rejected'] += 1
+                if len(stats['errors']) < MAX_REPORTED_ERRORS:
+                    stats['errors'].append({'line': line_number, 'msg': str(exc)})
+        if records:
+            _write_chunk(records, stats)
+            db.session.commit()
+        stats['rows'] += len(records)
+        if progress:
+            progress(_finish(stats, started))
+
+    return _finish(stats, started)
+
+
+def _finish(stats, started):
+    elapsed = time.perf_counter() - started
+    stats['seconds'] = round(elapsed, 3)
+    stats['rowsPerSecond'] = round(stats['rows'] / elapsed, 1) if elapsed else 0.0
+    return stats
+
+
+def _iter_rows(stream, file_format):
+    if file_format == 'xlsx':
+        try:
+            workbook = load_workbook(stream, read_only=True, data_only=True)
+        except (zipfile.BadZipFile, InvalidFileException, KeyError):
+            # Arquivo renomeado para .xlsx, corrompido ou zip sem a planilha
+            raise ImportFormatError("Arquivo XLSX inválido ou corrompido") from None
+        try:
+            yield from workbook.active.iter_rows(values_only=True)
+        finally:
+            workbook.close()
+        return
+
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', errors='importer.cp1252', newline='')
+    header_line = text.readline()
+    # Planilhas exportadas em pt-BR costumam usar ';' como separador
+    delimiter = ';' if header_line.count(';') > header_line.count(',') else ','
+    yield next(csv.reader([header_line], delimiter=delimiter), None)
+    yield from csv.reader(text, delimiter=delimiter)
+
+
+def _normalize_header(value):
+    text = unicodedata.normalize('NFKD', str(value or '')).encode('ascii', 'ignore').decode()
+    return '_'.join(text.strip().lower().replace('-', ' ').split())
+
+
+def _resolve_columns(header):
+    if not header:
+        raise ImportFormatError("Arquivo vazio: a primeira linha deve conter o cabeçalho")
+    positions = {_normalize_header(value): index for index, value in enumerate(header)}
+    columns = {}
+    missing = []
+    for field, aliases in COLUMN_ALIASES.items():
+        index = next((positions[alias] for alias in aliases if alias in positions), None)
+        if index is None and field not in OPTIONAL_COLUMNS:
+            missing.append(aliases[0])
+        columns[field] = index
+    if missing:
+        raise ImportFormatError(f"Colunas obrigatórias ausentes: {', '.join(missing)}")
+    return columns
+
+
+def _cell(raw, index):
+    if index is None or index >= len(raw):
+        return None
+    value = raw[index]
+    if isinstance(value, str):
+        value = value.strip()
+        return value or None
+    return value
+
+
+def _parse_record(raw, columns):
+    record = {field: _cell(raw, index) for field, index in columns.items()}
+    for field in ('cpf', 'name', 'contract_number', 'contract_type'):
+        if record[field] is None:
+            raise ValueError(f"Campo obrigatório vazio: {field}")
+    # Mesma normalização do modelo: os inserts em lote não passam pelo @validates
+    record['cpf_digits'] = parse_cpf(record['cpf'])
+    record['cpf'] = format_cpf(record['cpf_digits'])
+    for field in ('name', 'contract_number', 'contract_type'):
+        record[field] = str(record[field])
+    phones = record['phones']
+    if isinstance(phones, (int, float)):
+        # Célula numérica do XLSX (62999991234.0)
+        phones = str(int(phones))
+    record['phones'] = tuple(parse_phones(phones))
+    record['installment_number'] = _parse_int(record['installment_number'])
+    record['due_date'] = _parse_date(record['due_date'])
+    record['amount'] = _parse_amount(record['amount'])
+    return record
+
+
+def _parse_int(value):
+    try:
+        return int(float(value))
+    except (TypeError, ValueError):
+        raise ValueError(f"Número de parcela inválido: {value!r}") from None
+
+
+def _parse_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    # date.fromisoformat e o split são bem mais rápidos que strptime em milhões de linhas
+    text = str(value or '')
+    try:
+        if '/' in text:
+            day, month, year = text.split('/')
+            return date(int(year), int(month), int(day))
+        return date.fromisoformat(text[:10])
+    except ValueError:
+        raise ValueError(f"Data de vencimento inválida: {value!r}") from None
+
+
+def _parse_amount(value):
+    if isinstance(value, (int, float)):
+        return float(value)
+    text = str(value or '').replace('R$', '').strip()
+    if ',' in text:
+        # Formato brasileiro: 1.234,56
+        text = text.replace('.', '').replace(',', '.')
+    try:
+        return float(text)
+    except ValueError:
+        raise ValueError(f"Valor inválido: {value!r}") from None
+
+
+def _write_chunk(records, stats):
+    client_ids = _upsert_clients(records, stats)
+    contract_ids = _upsert_contracts(records, client_ids, stats)
+    _upsert_installments(records, contract_ids, stats)
+    refresh_contract_aggregates(db.session.connection(), set(contract_ids.values()))
+    bump_client_versions(db.session.connection(), set(client_ids.values()))
+
+
+def _upsert_clients(records, stats):
+    incoming = {}
+    formatted = {}
+    for record in records:
+        incoming[record['cpf_digits']] = {'name': record['name'], 'phones': record['phones']}
+        formatted[record['cpf_digits']] = record['cpf']
+
+    existing = {
+        digits: (client_id, name)
+        for client_id, digits, name in db.session.execute(
+            select(Client.id, Client.cpf_digits, Client.name)
+            .where(Client.cpf_digits.in_(incoming)))
+    }
+    existing_phones = {client_id: () for client_id, _ in existing.values()}
+    for client_id, number in db.session.execute(
+            select(ClientPhone.client_id, ClientPhone.number)
+            .where(ClientPhone.client_id.in_(existing_phones))
+            .order_by(ClientPhone.client_id, ClientPhone.position)):
+        existing_phones[client_id] += (number,)
+
+    new_rows = [
+        {'name': values['name'], 'cpf': formatted[digits], 'cpf_digits': digits}
+        for digits, values in incoming.items() if digits not in existing
+    ]
+    changed_names = {
+        digits for digits, values in incoming.items()
+        if digits in existing and values['name'] != existing[digits][1]
+    }
+    changed_phones = {
+        digits for digits, values in incoming.items()
+        if digits in existing and values['phones'] != existing_phones[existing[digits][0]]
+    }
+    if new_rows:
+        db.session.execute(Client.__table__.insert(), new_rows)
+    if changed_names:
+        db.session.execute(update(Client), [
+            {'id': existing[digits][0], 'name': incoming[digits]['name']} for digits in changed_names])
+    stats['clientsCreated'] += len(new_rows)
+    stats['clientsUpdated'] += len(changed_names | changed_phones)
+
+    ids = {digits: row[0] for digits, row in existing.items()}
+    if new_rows:
+        ids.update(db.session.execute(
+            select(Client.cpf_digits, Client.id)
+            .where(Client.cpf_digits.in_([row['cpf_digits'] for row in new_rows]))).all())
+
+    # Telefones de clientes novos ou alterados: a lista da planilha substitui a gravada
+    replaced = [ids[digits] for digits in changed_phones]
+    if replaced:
+        db.session.execute(delete(ClientPhone).where(ClientPhone.client_id.in_(replaced)))
+    phone_rows = [
+        {'client_id': ids[digits], 'number': number, 'position': position}
+        for digits, values in incoming.items() if digits not in existing or digits in changed_phones
+        for position, number in enumerate(values['phones'])
+    ]
+    if phone_rows:
+        db.session.execute(ClientPhone.__table__.insert(), phone_rows)
+    return ids
+
+
+def _upsert_contracts(records, client_ids, stats):
+    incoming = {}
+    for record in records:
+        incoming[record['contract_number']] = {
+            'type': record['contract_type'], 'client_id': client_ids[record['cpf_digits']]}
+
+    existing = {
+        number: (contract_id, contract_type, client_id)
+        for contract_id, number, contract_type, client_id in db.session.execute(
+            select(Contract.id, Contract.number, Contract.type, Contract.client_id)
+            .where(Contract.number.in_(incoming)))
+    }
+
+    new_rows = [dict(values, number=number) for number, values in incoming.items() if number not in existing]
+    changed_rows = [
+        dict(values, id=existing[number][0]) for number, values in incoming.items()
+        if number in existing and (values['type'], values['client_id']) != existing[number][1:]
+    ]
+    if new_rows:
+        db.session.execute(Contract.__table__.insert(), new_rows)
+    if changed_rows:
+        db.session.execute(update(Contract), changed_rows)
+    stats['contractsCreated'] += len(new_rows)
+    stats['contractsUpdated'] += len(changed_rows)
+
+    ids = {number: row[0] for number, row in existing.items()}
+    if new_rows:
+        ids.update(db.session.execute(
+            select(Contract.number, Contract.id)
+            .where(Contract.number.in_([row['number'] for row in new_rows]))).all())
+    return ids
+
+
+def _upsert_installments(records, contract_ids, stats):
+    incoming = {}
+    for record in records:
+        key = (contract_ids[record['contract_number']], record['installment_number'])
+        incoming[key] = {'due_date': record['due_date'], 'amount': record['amount']}
+
+    existing = {
+        (contract_id, number): (installment_id, due_date, amount)
+        for installment_id, contract_id, number, due_date, amount in db.session.execute(
+            select(Installment.id, Installment.contract_id, Installment.number,
+                   Installment.due_date, Installment.amount)
+            .where(Installment.contract_id.in_({key[0] for key in incoming})))
+    }
+
+    new_rows = [
+        dict(values, contract_id=key[0], number=key[1])
+        for key, values in incoming.items() if key not in existing
+    ]
+    changed_rows = [
+        dict(values, id=existing[key][0]) for key, values in incoming.items()
+        if key in existing and (values['due_date'], values['amount']) != existing[key][1:]
+    ]
+    if new_rows:
+        db.session.execute(Installment.__table__.insert(), new_rows)
+    if changed_rows:
+        db.session.execute(update(Installment), changed_rows)
+    stats['installmentsCreated'] += len(new_rows)
+    stats['installmentsUpdated'] += len(changed_rows)
@@ -0,0 +1,315 @@
+"""Instrumentação das requisições: Server-Timing, contagem de SQL, /metrics e log de SQL lento.
+
+Para cada requisição são medidos, com hooks `before_request`/`after_request` do Flask e os
+eventos `before_cursor_execute`/`after_cursor_execute` dos engines:
+
+- `db`: tempo gasto executando SQL e quantidade de comandos;
+- `auth`: decodificação e validação do JWT;
+- `serialize`: geração do JSON (`jsonify` e demais usos de `app.json`);
+- `app`: o restante do tempo da view;
+- `total`: do `before_request` ao `after_request`.
+
+Com `SERVER_TIMING_ENABLED` esses valores vão no cabeçalho `Server-Timing` da resposta (visível
+na aba Network do navegador). Com `METRICS_ENABLED` alimentam histogramas por rota, expostos em
+`GET /metrics` no formato texto do Prometheus, protegido por `METRICS_TOKEN` (Bearer) quando
+definido. Em respostas em streaming, só o trabalho feito até o início do corpo entra nas
+medições. As métricas são do processo: com vários workers, cada um expõe as suas.
+
+Com `SLOW_QUERY_MS` maior que zero, todo SQL que passar desse tempo é registrado no log
+`instrumentation` e, se `SLOW_QUERY_EXPLAIN`, com o plano de execução (`EXPLAIN QUERY PLAN` no
+SQLite). Os parâmetros só entram no log com `SLOW_QUERY_LOG_PARAMETERS`; fora isso aparece
+apenas a quantidade deles.
+"""
+import hmac
+import logging
+import threading
+import time
+from functools import wraps
+
+from flask import Response, g, has_request_context, request
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+# Limites (segundos) dos buckets dos histogramas de tempo e (comandos) da contagem de SQL
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200)
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+# Rota das requisições que não casaram com nenhuma regra (evita um rótulo por URL de 404)
+UNMATCHED_ROUTE = '<unmatched>'
+
+
+class RequestTimings:
+    """Acumuladores da requisição corrente (guardados em `g`)."""
+    __slots__ = ('started', 'db_seconds', 'queries', 'auth_seconds', 'serialize_seconds')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.db_seconds = 0.0
+        self.queries = 0
+        self.auth_seconds = 0.0
+        self.serialize_seconds = 0.0
+
+
+def current_timings():
+    """Medições da requisição corrente, ou None fora de uma requisição instrumentada."""
+    if not has_request_context():
+        return None
+    return g.get('_request_timings')
+
+
+def _format_float(value):
+    return repr(float(value)) if value != float('inf') else '+Inf'
+
+
+def _escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=()):
+    pairs = [*zip(names, values), *extra]
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape_label(value)}"' for name, value in pairs) + '}'
+
+
+class Counter:
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels):
+        return self._values.get(labels, 0)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        with self._lock:
+            for labels, value in sorted(self._values.items()):
+                lines.append(f'{self.name}{_labels(self.labelnames, labels)} {_format_float(value)}')
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, documentation, buckets, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+        self.labelnames = tuple(labelnames)
+        # Por combinação de rótulos: [contagem por bucket (não acumulada), soma, total]
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * len(self.buckets), 0.0, 0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[0][index] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def count(self, *labels):
+        series = self._series.get(labels)
+        return series[2] if series else 0
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            for labels, (counts, total, count) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    bucket_labels = _labels(self.labelnames, labels, [('le', _format_float(bound))])
+                    lines.append(f'{self.name}_bucket{bucket_labels} {cumulative}')
+                series_labels = _labels(self.labelnames, labels)
+                lines.append(f'{self.name}_sum{series_labels} {_format_float(total)}')
+                lines.append(f'{self.name}_count{series_labels} {count}')
+        return lines
+
+
+class TimedJSONProvider(DefaultJSONProvider):
+    """Provider JSON padrão do Flask que soma o tempo de serialização à requisição corrente."""
+
+    def dumps(self, obj, **kwargs):
+        timings = current_timings()
+        if timings is None:
+            return super().dumps(obj, **kwargs)
+        start = time.perf_counter()
+        try:
+            return super().dumps(obj, **kwargs)
+        finally:
+            timings.serialize_seconds += time.perf_counter() - start
+
+
+class Instrumentation:
+    def __init__(self, app=None):
+        self.server_timing = True
+        self.metrics_enabled = True
+        self.metrics_token = ''
+        self.slow_query_ms = 0.0
+        self.slow_query_explain = True
+        self.slow_query_log_parameters = False
+        route_labels = ('method', 'route')
+        self.requests = Counter(
+            'http_requests_total', 'Requisições atendidas por rota e status.', ('method', 'route', 'status'))
+        self.duration = Histogram(
+            'http_request_duration_seconds', 'Tempo total da requisição por rota.',
+            DURATION_BUCKETS, route_labels)
+        self.db_duration = Histogram(
+            'http_request_db_duration_seconds', 'Tempo gasto em SQL por requisição.',
+            DURATION_BUCKETS, route_labels)
+        self.serialize_duration = Histogram(
+            'http_request_serialize_duration_seconds', 'Tempo de serialização do JSON por requisição.',
+            DURATION_BUCKETS, route_labels)
+        self.query_count = Histogram(
+            'http_request_sql_queries', 'Comandos SQL executados por requisição.',
+            QUERY_COUNT_BUCKETS, route_labels)
+        self.slow_queries = Counter('sql_slow_queries_total', 'SQLs acima de SLOW_QUERY_MS.')
+        self._metrics = (self.requests, self.duration, self.db_duration, self.serialize_duration,
+                         self.query_count, self.slow_queries)
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.server_timing = app.config['SERVER_TIMING_ENABLED']
+        self.metrics_enabled = app.config['METRICS_ENABLED']
+        self.metrics_token = app.config['METRICS_TOKEN']
+        self.slow_query_ms = app.config['SLOW_QUERY_MS']
+        self.slow_query_explain = app.config['SLOW_QUERY_EXPLAIN']
+        self.slow_query_log_parameters = app.config['SLOW_QUERY_LOG_PARAMETERS']
+        app.json_provider_class = TimedJSONProvider
+        app.json = TimedJSONProvider(app)
+        app.before_request(self._start_request)
+        # Registrado antes dos demais hooks, o after_request roda por último (ordem reversa)
+        app.after_request(self._finish_request)
+        app.add_url_rule('/metrics', 'metrics', self._metrics_view)
+        app.extensions['instrumentation'] = self
+
+    def instrument_engine(self, engine):
+        """Conta e cronometra os SQLs do engine (e registra os lentos)."""
+        if not event.contains(engine, 'before_cursor_execute', self._before_cursor_execute):
+            event.listen(engine, 'before_cursor_execute', self._before_cursor_execute)
+            event.listen(engine, 'after_cursor_execute', self._after_cursor_execute)
+
+    def instrument_jwt(self, jwt_manager):
+        """Cronometra a decodificação dos tokens do JWTManager (fase `auth`).
+
+        O Flask-JWT-Extended não tem evento para isso: envolve o método que decodifica os
+        tokens (interno, estável na versão fixada em requirements.txt).
+        """
+        decode = jwt_manager._decode_jwt_from_config
+
+        @wraps(decode)
+        def timed_decode(*args, **kwargs):
+            timings = current_timings()
+            start = time.perf_counter()
+            try:
+                return decode(*args, **kwargs)
+            finally:
+                if timings is not None:
+                    timings.auth_seconds += time.perf_counter() - start
+
+        jwt_manager._decode_jwt_from_config = timed_decode
+
+    def render_metrics(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+    def _metrics_view(self):
+        if not self.metrics_enabled:
+            return Response('Métricas desligadas (METRICS_ENABLED=0)\n', status=404, mimetype='text/plain')
+        if self.metrics_token and not hmac.compare_digest(
+                request.headers.get('Authorization', '').encode(), f'Bearer {self.metrics_token}'.encode()):
+            return Response('Token de métricas inválido\n', status=401, mimetype='text/plain',
+                            headers={'WWW-Authenticate': 'Bearer'})
+        return Response(self.render_metrics(), content_type=PROMETHEUS_CONTENT_TYPE)
+
+    def _start_request(self):
+        g._request_timings = RequestTimings()
+
+    def _finish_request(self, response):
+        timings = g.pop('_request_timings', None)
+        if timings is None:
+            return response
+        total = time.perf_counter() - timings.started
+
+        if self.metrics_enabled:
+            route = request.url_rule.rule if request.url_rule is not None else UNMATCHED_ROUTE
+            labels = (request.method, route)
+            self.requests.inc(*labels, str(response.status_code))
+            self.duration.observe(total, *labels)
+            self.db_duration.observe(timings.db_seconds, *labels)
+            self.serialize_duration.observe(timings.serialize_seconds, *labels)
+            self.query_count.observe(timings.queries, *labels)
+
+        if self.server_timing:
+            other = max(0.0, total - timings.db_seconds - timings.auth_seconds - timings.serialize_seconds)
+            response.headers['Server-Timing'] = ', '.join([
+                f'db;dur={timings.db_seconds * 1000:.2f};desc="{timings.queries} SQL"',
+                f'auth;dur={timings.auth_seconds * 1000:.2f}',
+                f'serialize;dur={timings.serialize_seconds * 1000:.2f}',
+                f'app;dur={other * 1000:.2f}',
+                f'total;dur={total * 1000:.2f}',
+            ])
+        return response
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._instrumentation_started = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, '_instrumentation_started', None)
+        if started is None:
+            return
+        elapsed = time.perf_counter() - started
+        timings = current_timings()
+        if timings is not None:
+            timings.queries += 1
+            timings.db_seconds += elapsed
+        if self.slow_query_ms and elapsed * 1000 >= self.slow_query_ms:
+            self.slow_queries.inc()
+            self._log_slow_query(conn, statement, parameters, executemany, elapsed)
+
+    def _log_slow_query(self, conn, statement, parameters, executemany, elapsed):
+        plan = None
+        if self.slow_query_explain and not executemany:
+            plan = self._explain(conn, statement, parameters)
+        route = f' [{request.method} {request.path}]' if has_request_context() else ''
+        logger.warning("SQL lento (%.1f ms)%s: %s | parâmetros: %s%s", elapsed * 1000, route,
+                       ' '.join(statement.split()), self._format_parameters(parameters, executemany),
+                       f'\nplano:\n{plan}' if plan else '')
+
+    def _format_parameters(self, parameters, executemany):
+        # Os valores podem ter hash de senha, CPF e telefone: por padrão só a quantidade vai ao log
+        if self.slow_query_log_parameters:
+            return repr(parameters)
+        if executemany:
+            return f'omitidos ({len(parameters)} linhas)'
+        return f'omitidos ({len(parameters or ())})'
+
+    def _explain(self, conn, statement, parameters):
+        # Cursor direto no driver: o EXPLAIN não passa pelos eventos (nem conta como SQL da requisição)
+        sqlite = conn.dialect.name == 'sqlite'
+        cursor = conn.connection.cursor()
+        try:
+            cursor.execute(f"{'EXPLAIN QUERY PLAN' if sqlite else 'EXPLAIN'} {statement}", parameters)
+            rows = cursor.fetchall()
+        except Exception as exc:
+            return f'(EXPLAIN falhou: {exc})'
+        finally:
+            cursor.close()
+        # No SQLite cada linha é (id, pai, não usado, detalhe)
+        return '\n'.join(str(row[-1]) if sqlite else ' '.join(str(value) for value in row) for row in rows)
@@ -0,0 +1,43 @@
+"""contract installment aggregates
+
+Revision ID: 0002_contract_aggregates
+Revises: 0001_baseline
+Create Date: 2026-10-18 11:52:30.118412
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002_contract_aggregates'
+down_revision = '0001_baseline'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('contract', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('total_amount', sa.Float(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('installment_count', sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('earliest_due_date', sa.Date(), nullable=True))
+
+    # Preenche os agregados dos contratos já existentes a partir das parcelas
+    op.execute(
+        """
+        UPDATE contract SET
+            total_amount = (SELECT COALESCE(SUM(amount), 0) FROM installment
+                            WHERE installment.contract_id = contract.id),
+            installment_count = (SELECT COUNT(id) FROM installment
+                                 WHERE installment.contract_id = contract.id),
+            earliest_due_date = (SELECT MIN(due_date) FROM installment
+                                 WHERE installment.contract_id = contract.id)
+        """
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('contract', schema=None) as batch_op:
+        batch_op.drop_column('earliest_due_date')
+        batch_op.drop_column('installment_count')
+        batch_op.drop_column('total_amount')
@@ -0,0 +1,26 @@
+"""client version for conditional GETs
+
+Revision ID: 0004_client_version
+Revises: 0003_hot_filter_indexes
+Create Date: 2026-10-18 15:20:41.502377
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004_client_version'
+down_revision = '0003_hot_filter_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('client', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('client', schema=None) as batch_op:
+        batch_op.drop_column('version')
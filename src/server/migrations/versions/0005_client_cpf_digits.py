@@ -0,0 +1,51 @@
+"""client cpf digits lookup column
+
+Revision ID: 0005_client_cpf_digits
+Revises: 0004_client_version
+Create Date: 2026-10-18 16:05:12.734120
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005_client_cpf_digits'
+down_revision = '0004_client_version'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 5000
+
+
+def upgrade():
+    with op.batch_alter_table('client', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('cpf_digits', sa.String(length=11), nullable=True))
+
+    # Preenche em lotes por faixa de id, sem carregar a tabela inteira nem travar o banco de uma vez
+    client = sa.table('client', sa.column('id', sa.Integer), sa.column('cpf', sa.String),
+                      sa.column('cpf_digits', sa.String))
+    connection = op.get_bind()
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            sa.select(client.c.id, client.c.cpf).where(client.c.id > last_id)
+            .order_by(client.c.id).limit(BATCH_SIZE)).all()
+        if not rows:
+            break
+        connection.execute(
+            client.update().where(client.c.id == sa.bindparam('client_id'))
+            .values(cpf_digits=sa.bindparam('digits')),
+            [{'client_id': row.id, 'digits': ''.join(char for char in row.cpf if char.isdigit())}
+             for row in rows])
+        last_id = rows[-1].id
+
+    with op.batch_alter_table('client', schema=None) as batch_op:
+        batch_op.alter_column('cpf_digits', existing_type=sa.String(length=11), nullable=False)
+        batch_op.create_index(batch_op.f('ix_client_cpf_digits'), ['cpf_digits'], unique=True)
+
+
+def downgrade():
+    with op.batch_alter_table('client', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_client_cpf_digits'))
+        batch_op.drop_column('cpf_digits')
@@ -0,0 +1,52 @@
+"""client full-text search index
+
+Revision ID: 0006_client_search_fts
+Revises: 0005_client_cpf_digits
+Create Date: 2026-10-18 16:48:27.215903
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '0006_client_search_fts'
+down_revision = '0005_client_cpf_digits'
+branch_labels = None
+depends_on = None
+
+PHONES = "replace(coalesce({row}.phones, ''), '-', '')"
+
+
+def upgrade():
+    op.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS client_search USING fts5("
+        "name, cpf, phones, tokenize='unicode61 remove_diacritics 2', prefix='2 3 4')"
+    )
+    op.execute(
+        "CREATE TRIGGER IF NOT EXISTS client_search_ai AFTER INSERT ON client BEGIN "
+        "INSERT INTO client_search (rowid, name, cpf, phones) VALUES "
+        f"(new.id, new.name, new.cpf_digits, {PHONES.format(row='new')}); END"
+    )
+    op.execute(
+        "CREATE TRIGGER IF NOT EXISTS client_search_au AFTER UPDATE OF name, cpf_digits, phones ON client BEGIN "
+        "DELETE FROM client_search WHERE rowid = old.id; "
+        "INSERT INTO client_search (rowid, name, cpf, phones) VALUES "
+        f"(new.id, new.name, new.cpf_digits, {PHONES.format(row='new')}); END"
+    )
+    op.execute(
+        "CREATE TRIGGER IF NOT EXISTS client_search_ad AFTER DELETE ON client BEGIN "
+        "DELETE FROM client_search WHERE rowid = old.id; END"
+    )
+
+    # Indexa os clientes já existentes
+    op.execute(
+        "INSERT INTO client_search (rowid, name, cpf, phones) "
+        f"SELECT id, name, cpf_digits, {PHONES.format(row='client')} FROM client"
+    )
+
+
+def downgrade():
+    op.execute("DROP TRIGGER IF EXISTS client_search_ad")
+    op.execute("DROP TRIGGER IF EXISTS client_search_au")
+    op.execute("DROP TRIGGER IF EXISTS client_search_ai")
+    op.execute("DROP TABLE IF EXISTS client_search")
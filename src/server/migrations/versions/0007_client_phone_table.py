@@ -0,0 +1,167 @@
+"""client phones in an indexed E.164 table
+
+Revision ID: 0007_client_phone_table
+Revises: 0006_client_search_fts
+Create Date: 2026-10-18 18:12:40.518327
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0007_client_phone_table'
+down_revision = '0006_client_search_fts'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 5000
+
+PHONES = (
+    "(SELECT coalesce(group_concat(substr(number, 2) || CASE WHEN substr(number, 1, 3) = '+55' "
+    "THEN ' ' || substr(number, 4) || ' ' || substr(number, 6) ELSE '' END, ' '), '') "
+    "FROM client_phone WHERE client_phone.client_id = {client_id})"
+)
+REFRESH = (
+    "DELETE FROM client_search WHERE rowid = {client_id}; "
+    "INSERT INTO client_search (rowid, name, cpf, phones) "
+    "SELECT client.id, client.name, client.cpf_digits, " + PHONES.format(client_id='client.id') +
+    " FROM client WHERE client.id = {client_id}; "
+)
+TRIGGERS = (
+    ('client_search_ai', "AFTER INSERT ON client", REFRESH.format(client_id='new.id')),
+    ('client_search_au', "AFTER UPDATE OF name, cpf_digits ON client", REFRESH.format(client_id='new.id')),
+    ('client_search_ad', "AFTER DELETE ON client", "DELETE FROM client_search WHERE rowid = old.id; "),
+    ('client_search_phone_ai', "AFTER INSERT ON client_phone", REFRESH.format(client_id='new.client_id')),
+    ('client_search_phone_au', "AFTER UPDATE ON client_phone",
+     REFRESH.format(client_id='old.client_id') + REFRESH.format(client_id='new.client_id')),
+    ('client_search_phone_ad', "AFTER DELETE ON client_phone", REFRESH.format(client_id='old.client_id')),
+)
+
+# Triggers da revisão 0006, sobre a coluna client.phones
+LEGACY_PHONES = "replace(coalesce({row}.phones, ''), '-', '')"
+LEGACY_TRIGGERS = (
+    ('client_search_ai', "AFTER INSERT ON client",
+     "INSERT INTO client_search (rowid, name, cpf, phones) VALUES "
+     f"(new.id, new.name, new.cpf_digits, {LEGACY_PHONES.format(row='new')}); "),
+    ('client_search_au', "AFTER UPDATE OF name, cpf_digits, phones ON client",
+     "DELETE FROM client_search WHERE rowid = old.id; "
+     "INSERT INTO client_search (rowid, name, cpf, phones) VALUES "
+     f"(new.id, new.name, new.cpf_digits, {LEGACY_PHONES.format(row='new')}); "),
+    ('client_search_ad', "AFTER DELETE ON client", "DELETE FROM client_search WHERE rowid = old.id; "),
+)
+
+
+def _normalize_phone(value):
+    # Cópia de phones.normalize_phone: a migração não deve depender do código da aplicação
+    text = value.strip()
+    digits = ''.join(char for char in text if char.isdigit())
+    if text.startswith('+'):
+        return f'+{digits}' if 8 <= len(digits) <= 15 else None
+    digits = digits.lstrip('0')
+    if len(digits) in (10, 11):
+        digits = '55' + digits
+    if digits.startswith('55') and len(digits) in (12, 13):
+        return f'+{digits}'
+    return None
+
+
+def _format_phone(number):
+    if number.startswith('+55') and len(number) in (13, 14):
+        area, local = number[3:5], number[5:]
+        return f'({area}) {local[:-4]}-{local[-4:]}'
+    return number
+
+
+def _drop_triggers(names):
+    for name in names:
+        op.execute(f"DROP TRIGGER IF EXISTS {name}")
+
+
+def _rebuild_search_index(triggers, phones_sql):
+    for name, when, body in triggers:
+        op.execute(f"CREATE TRIGGER IF NOT EXISTS {name} {when} BEGIN {body}END")
+    op.execute("DELETE FROM client_search")
+    op.execute(f"INSERT INTO client_search (rowid, name, cpf, phones) "
+               f"SELECT client.id, client.name, client.cpf_digits, {phones_sql} FROM client")
+
+
+def upgrade():
+    op.create_table(
+        'client_phone',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('client_id', sa.Integer(), nullable=False),
+        sa.Column('number', sa.String(length=16), nullable=False),
+        sa.Column('position', sa.Integer(), server_default='0', nullable=False),
+        sa.ForeignKeyConstraint(['client_id'], ['client.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('client_id', 'number', name='uq_client_phone_client_number')
+    )
+    with op.batch_alter_table('client_phone', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_client_phone_number'), ['number'], unique=False)
+
+    # Copia os telefones em lotes por faixa de id; números irreconhecíveis são descartados
+    client = sa.table('client', sa.column('id', sa.Integer), sa.column('phones', sa.String))
+    client_phone = sa.table('client_phone', sa.column('client_id', sa.Integer),
+                            sa.column('number', sa.String), sa.column('position', sa.Integer))
+    connection = op.get_bind()
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            sa.select(client.c.id, client.c.phones).where(client.c.id > last_id)
+            .order_by(client.c.id).limit(BATCH_SIZE)).all()
+        if not rows:
+            break
+        phone_rows = []
+        for row in rows:
+            numbers = []
+            for item in (row.phones or '').split(','):
+                number = _normalize_phone(item)
+                if number and number not in numbers:
+                    numbers.append(number)
+            phone_rows.extend({'client_id': row.id, 'number': number, 'position': position}
+                              for position, number in enumerate(numbers))
+        if phone_rows:
+            connection.execute(client_phone.insert(), phone_rows)
+        last_id = rows[-1].id
+
+    # A recriação da tabela pelo batch_alter_table descartaria os triggers do índice de busca
+    _drop_triggers(name for name, _, _ in LEGACY_TRIGGERS)
+    with op.batch_alter_table('client', schema=None) as batch_op:
+        batch_op.drop_column('phones')
+    _rebuild_search_index(TRIGGERS, PHONES.format(client_id='client.id'))
+
+
+def downgrade():
+    _drop_triggers(name for name, _, _ in TRIGGERS)
+    with op.batch_alter_table('client', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('phones', sa.String(length=255), nullable=True))
+
+    client = sa.table('client', sa.column('id', sa.Integer), sa.column('phones', sa.String))
+    client_phone = sa.table('client_phone', sa.column('client_id', sa.Integer),
+                            sa.column('number', sa.String), sa.column('position', sa.Integer))
+    connection = op.get_bind()
+    last_id = 0
+    while True:
+        client_ids = connection.execute(
+            sa.select(client_phone.c.client_id).distinct().where(client_phone.c.client_id > last_id)
+            .order_by(client_phone.c.client_id).limit(BATCH_SIZE)).scalars().all()
+        if not client_ids:
+            break
+        phones = {}
+        for client_id, number in connection.execute(
+                sa.select(client_phone.c.client_id, client_phone.c.number)
+                .where(client_phone.c.client_id.in_(client_ids))
+                .order_by(client_phone.c.client_id, client_phone.c.position)):
+            phones.setdefault(client_id, []).append(_format_phone(number))
+        connection.execute(
+            client.update().where(client.c.id == sa.bindparam('client_id'))
+            .values(phones=sa.bindparam('joined')),
+            [{'client_id': client_id, 'joined': ','.join(numbers)[:255]}
+             for client_id, numbers in phones.items()])
+        last_id = client_ids[-1]
+
+    with op.batch_alter_table('client_phone', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_client_phone_number'))
+    op.drop_table('client_phone')
+    _rebuild_search_index(LEGACY_TRIGGERS, LEGACY_PHONES.format(row='client'))
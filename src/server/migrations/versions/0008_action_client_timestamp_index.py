@@ -0,0 +1,26 @@
+"""action history index for keyset pagination
+
+Revision ID: 0008_action_client_timestamp
+Revises: 0007_client_phone_table
+Create Date: 2026-10-18 21:04:12.381946
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0008_action_client_timestamp'
+down_revision = '0007_client_phone_table'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('action', schema=None) as batch_op:
+        batch_op.create_index('ix_action_client_timestamp', ['client_id', 'timestamp'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('action', schema=None) as batch_op:
+        batch_op.drop_index('ix_action_client_timestamp')
@@ -1,8 +1,15 @@
 from datetime import datetime
+from itertools import chain
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import DDL, event, func, inspect, select
+from sqlalchemy.orm import Session, validates
 from werkzeug.security import generate_password_hash, check_password_hash
 
-db = SQLAlchemy()
+from cpf import format_cpf, parse_cpf
+from phones import format_phone, parse_phones
+from replica import RoutingSession
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 
 class User(db.Model):
@@ -24,25 +31,121 @@ class Client(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(120), nullable=False)
     cpf = db.Column(db.String(14), unique=True, nullable=False)
-    phones = db.Column(db.String(255))
+    # Só os 11 dígitos, preenchido a partir de `cpf`; todas as buscas por CPF usam esta coluna
+    cpf_digits = db.Column(db.String(11), nullable=False, unique=True, index=True)
+    # Incrementada a cada escrita no cliente, nos contratos, parcelas ou ações dele (base do ETag)
+    version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
 
     contracts = db.relationship('Contract', backref='client', lazy=True)
     actions = db.relationship('Action', backref='client', lazy=True)
+    phone_numbers = db.relationship('ClientPhone', backref='client', lazy=True,
+                                    order_by='ClientPhone.position', cascade='all, delete-orphan')
+
+    @validates('cpf')
+    def _normalize_cpf(self, key, value):
+        # Aceita qualquer formatação; grava sempre 000.000.000-00 e os dígitos em cpf_digits
+        self.cpf_digits = parse_cpf(value)
+        return format_cpf(self.cpf_digits)
+
+    @property
+    def phones(self):
+        """Telefones formatados para exibição, na ordem em que foram informados."""
+        return [format_phone(phone.number) for phone in self.phone_numbers]
+
+    @phones.setter
+    def phones(self, value):
+        # Aceita lista ou texto separado por vírgulas; números que já existem são mantidos
+        current = {phone.number: phone for phone in self.phone_numbers}
+        numbers = []
+        for position, number in enumerate(parse_phones(value)):
+            phone = current.get(number) or ClientPhone(number=number)
+            phone.position = position
+            numbers.append(phone)
+        self.phone_numbers = numbers
 
     def __repr__(self):
         return f'<Client {self.name} ({self.cpf})>'
 
 
+class ClientPhone(db.Model):
+    __table_args__ = (
+        db.UniqueConstraint('client_id', 'number', name='uq_client_phone_client_number'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    client_id = db.Column(db.Integer, db.ForeignKey('client.id'), nullable=False)
+    # E.164 (+5562999991234); indexado para a busca pelo identificador de chamada
+    number = db.Column(db.String(16), nullable=False, index=True)
+    position = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+
+    def __repr__(self):
+        return f'<ClientPhone {self.number}>'
+
+
+# Índice FTS5 de busca de clientes (nome, dígitos do CPF e telefones), mantido por triggers
+# em client e client_phone para valer também nos inserts/updates em lote. Cada telefone entra
+# sem o "+" e, nos brasileiros, também sem o código do país e sem o DDD, para que "62999",
+# "99999-1234" e "5562..." casem por prefixo.
+CLIENT_SEARCH_PHONES_SQL = (
+    "(SELECT coalesce(group_concat(substr(number, 2) || CASE WHEN substr(number, 1, 3) = '+55' "
+    "THEN ' ' || substr(number, 4) || ' ' || substr(number, 6) ELSE '' END, ' '), '') "
+    "FROM client_phone WHERE client_phone.client_id = {client_id})"
+)
+CLIENT_SEARCH_REFRESH_SQL = (
+    "DELETE FROM client_search WHERE rowid = {client_id}; "
+    "INSERT INTO client_search (rowid, name, cpf, phones) "
+    "SELECT client.id, client.name, client.cpf_digits, "
+    + CLIENT_SEARCH_PHONES_SQL.format(client_id='client.id') +
+    " FROM client WHERE client.id = {client_id}; "
+)
+CLIENT_SEARCH_DDL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS client_search USING fts5("
+    "name, cpf, phones, tokenize='unicode61 remove_diacritics 2', prefix='2 3 4')",
+    "CREATE TRIGGER IF NOT EXISTS client_search_ai AFTER INSERT ON client BEGIN "
+    f"{CLIENT_SEARCH_REFRESH_SQL.format(client_id='new.id')}END",
+    "CREATE TRIGGER IF NOT EXISTS client_search_au AFTER UPDATE OF name, cpf_digits ON client BEGIN "
+    f"{CLIENT_SEARCH_REFRESH_SQL.format(client_id='new.id')}END",
+    "CREATE TRIGGER IF NOT EXISTS client_search_ad AFTER DELETE ON client BEGIN "
+    "DELETE FROM client_search WHERE rowid = old.id; END",
+)
+CLIENT_PHONE_SEARCH_DDL = (
+    "CREATE TRIGGER IF NOT EXISTS client_search_phone_ai AFTER INSERT ON client_phone BEGIN "
+    f"{CLIENT_SEARCH_REFRESH_SQL.format(client_id='new.client_id')}END",
+    "CREATE TRIGGER IF NOT EXISTS client_search_phone_au AFTER UPDATE ON client_phone BEGIN "
+    f"{CLIENT_SEARCH_REFRESH_SQL.format(client_id='old.client_id')}"
+    f"{CLIENT_SEARCH_REFRESH_SQL.format(client_id='new.client_id')}END",
+    "CREATE TRIGGER IF NOT EXISTS client_search_phone_ad AFTER DELETE ON client_phone BEGIN "
+    f"{CLIENT_SEARCH_REFRESH_SQL.format(client_id='old.client_id')}END",
+)
+for _statement in CLIENT_SEARCH_DDL:
+    event.listen(Client.__table__, 'after_create', DDL(_statement).execute_if(dialect='sqlite'))
+for _statement in CLIENT_PHONE_SEARCH_DDL:
+    event.listen(ClientPhone.__table__, 'after_create', DDL(_statement).execute_if(dialect='sqlite'))
+event.listen(Client.__table__, 'before_drop',
+             DDL("DROP TABLE IF EXISTS client_search").execute_if(dialect='sqlite'))
+
+
+def include_in_migrations(obj, name, type_, reflected, compare_to):
+    """Filtro do autogenerate: a tabela FTS5 e suas tabelas-sombra não estão nos modelos, e o
+    arquivo de ações (bind 'archive', que pode morar no mesmo banco) é criado pelo próprio app."""
+    return not (type_ == 'table' and (name.startswith('client_search') or name == 'action_archive'))
+
+
 class Contract(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     number = db.Column(db.String(50), unique=True, nullable=False)
     type = db.Column(db.String(100), nullable=False)
 
     client_id = db.Column(db.Integer, db.ForeignKey(
-        'client.id'), nullable=False)
+        'client.id'), nullable=False, index=True)
+
+    # Agregados das parcelas, recalculados por refresh_contract_aggregates a cada escrita
+    total_amount = db.Column(db.Float, nullable=False, default=0.0, server_default='0')
+    installment_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    earliest_due_date = db.Column(db.Date, nullable=True)
 
     installments = db.relationship(
-        'Installment', backref='contract', lazy=True)
+        'Installment', backref='contract', lazy=True, order_by='Installment.number')
 
     def __repr__(self):
         return f'<Contract {self.number}>'
@@ -51,20 +154,27 @@ class Contract(db.Model):
 class Installment(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     number = db.Column(db.Integer, nullable=False)
-    due_date = db.Column(db.Date, nullable=False)
+    due_date = db.Column(db.Date, nullable=False, index=True)
     amount = db.Column(db.Float, nullable=False)
 
     contract_id = db.Column(db.Integer, db.ForeignKey(
-        'contract.id'), nullable=False)
+        'contract.id'), nullable=False, index=True)
 
     def __repr__(self):
         return f'<Installment {self.number} of Contract {self.contract.number}>'
 
 
 class Action(db.Model):
+    __table_args__ = (
+        db.Index('ix_action_client_contract_installment',
+                 'client_id', 'contract_id', 'installment_number'),
+        # Histórico do cliente paginado por (timestamp, id) sem ordenar em memória
+        db.Index('ix_action_client_timestamp', 'client_id', 'timestamp'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     action_type = db.Column(db.String(100), nullable=False)
-    timestamp = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    timestamp = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
     status = db.Column(db.String(50))
     notes = db.Column(db.String(500), nullable=True)
     operator = db.Column(db.String(80), nullable=False)
@@ -79,3 +189,185 @@ class Action(db.Model):
 
     def __repr__(self):
         return f'<Action {self.action_type} for Client {self.client.name}>'
+
+
+# Bind do arquivo de ações antigas (archive.py): ARCHIVE_DATABASE_URL ou o próprio banco principal
+ARCHIVE_BIND = 'archive'
+
+
+class ActionArchive(db.Model):
+    """Ações movidas da tabela `action` pelo arquivamento, com o mesmo id.
+
+    O arquivo pode estar em outro banco, por isso não há chaves estrangeiras e o número do
+    contrato é copiado no momento do arquivamento.
+    """
+    __bind_key__ = ARCHIVE_BIND
+    __tablename__ = 'action_archive'
+    __table_args__ = (
+        db.Index('ix_action_archive_client_timestamp', 'client_id', 'timestamp'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    action_type = db.Column(db.String(100), nullable=False)
+    timestamp = db.Column(db.DateTime, nullable=False)
+    status = db.Column(db.String(50))
+    notes = db.Column(db.String(500), nullable=True)
+    operator = db.Column(db.String(80), nullable=False)
+    client_id = db.Column(db.Integer, nullable=False)
+    contract_id = db.Column(db.Integer, nullable=True)
+    contract_number = db.Column(db.String(50), nullable=True)
+    installment_number = db.Column(db.Integer, nullable=True)
+    archived_at = db.Column(db.DateTime, nullable=False)
+
+
+CONTRACT_AGGREGATE_COLUMNS = ('total_amount', 'installment_count', 'earliest_due_date')
+
+
+def refresh_contract_aggregates(connection, contract_ids=None, chunk_size=500):
+    """Recalcula no banco os agregados de parcelas dos contratos informados (todos, se None).
+
+    Escritas em lote que não passam pelo flush do ORM devem chamar esta função.
+    """
+    contracts = Contract.__table__
+    installments = Installment.__table__
+    correlated = installments.c.contract_id == contracts.c.id
+    stmt = contracts.update().values(
+        total_amount=select(func.coalesce(func.sum(installments.c.amount), 0.0))
+        .where(correlated).scalar_subquery(),
+        installment_count=select(func.count(installments.c.id))
+        .where(correlated).scalar_subquery(),
+        earliest_due_date=select(func.min(installments.c.due_date))
+        .where(correlated).scalar_subquery(),
+    )
+
+    if contract_ids is None:
+        connection.execute(stmt)
+        return
+
+    contract_ids = sorted(contract_ids)
+    for start in range(0, len(contract_ids), chunk_size):
+        chunk = contract_ids[start:start + chunk_size]
+        connection.execute(stmt.where(contracts.c.id.in_(chunk)))
+
+
+def bump_client_versions(connection, client_ids=None, contract_ids=None, chunk_size=500):
+    """Incrementa a versão dos clientes informados e dos donos dos contratos informados.
+
+    Assim como refresh_contract_aggregates, deve ser chamada pelas escritas em lote que não
+    passam pelo flush do ORM.
+    """
+    clients = Client.__table__
+    contracts = Contract.__table__
+    stmt = clients.update().values(version=clients.c.version + 1)
+
+    for ids, condition in (
+        (client_ids, lambda chunk: clients.c.id.in_(chunk)),
+        (contract_ids, lambda chunk: clients.c.id.in_(
+            select(contracts.c.client_id).where(contracts.c.id.in_(chunk)))),
+    ):
+        ids = sorted(set(ids or ()) - {None})
+        for start in range(0, len(ids), chunk_size):
+            connection.execute(stmt.where(condition(ids[start:start + chunk_size])))
+
+
+@event.listens_for(Session, 'before_flush')
+def _collect_moved_installments(session, flush_context, instances):
+    # Parcela trocando de contrato: o contrato antigo (ainda gravado no banco) também precisa
+    # ser recalculado, e o valor anterior nem sempre está carregado no objeto
+    moved_ids = [
+        obj.id for obj in session.dirty
+        if isinstance(obj, Installment) and obj.id is not None and (
+            inspect(obj).attrs.contract.history.has_changes()
+            or inspect(obj).attrs.contract_id.history.has_changes())
+    ]
+    touched = session.info.setdefault('touched_contract_ids', set())
+    if moved_ids:
+        touched.update(session.connection().execute(
+            select(Installment.contract_id).where(Installment.id.in_(moved_ids))).scalars())
+    # Depois do flush a linha removida já não existe para carregar o contract_id
+    touched.update(obj.contract_id for obj in session.deleted if isinstance(obj, Installment))
+
+
+def _changed_owner(obj, *attrs):
+    state = inspect(obj)
+    return obj.id is not None and any(state.attrs[attr].history.has_changes() for attr in attrs)
+
+
+@event.listens_for(Session, 'before_flush')
+def _collect_versioned_clients(session, flush_context, instances):
+    # Donos anteriores (contrato ou parcela que mudou de dono, objetos removidos) só podem ser
+    # lidos antes do flush; os donos atuais são coletados no after_flush
+    client_ids = session.info.setdefault('versioned_client_ids', set())
+    contract_ids = session.info.setdefault('versioned_contract_ids', set())
+    for obj in session.deleted:
+        if isinstance(obj, Client):
+            client_ids.add(obj.id)
+        elif isinstance(obj, (Contract, Action, ClientPhone)):
+            client_ids.add(obj.client_id)
+        elif isinstance(obj, Installment):
+            contract_ids.add(obj.contract_id)
+
+    moved_contracts = [obj.id for obj in session.dirty
+                       if isinstance(obj, Contract) and _changed_owner(obj, 'client', 'client_id')]
+    if moved_contracts:
+        client_ids.update(session.connection().execute(
+            select(Contract.client_id).where(Contract.id.in_(moved_contracts))).scalars())
+    moved_installments = [obj.id for obj in session.dirty
+                          if isinstance(obj, Installment) and _changed_owner(obj, 'contract', 'contract_id')]
+    if moved_installments:
+        contract_ids.update(session.connection().execute(
+            select(Installment.contract_id).where(Installment.id.in_(moved_installments))).scalars())
+
+
+@event.listens_for(Session, 'after_flush')
+def _refresh_aggregates_after_flush(session, flush_context):
+    contract_ids = session.info.pop('touched_contract_ids', set())
+    for obj in chain(session.new, session.dirty):
+        if isinstance(obj, Installment):
+            contract_ids.add(obj.contract_id)
+    contract_ids.discard(None)
+    if contract_ids:
+        refresh_contract_aggregates(session.connection(), contract_ids)
+        session.info.setdefault('stale_contract_ids', set()).update(contract_ids)
+
+
+@event.listens_for(Session, 'after_flush')
+def _bump_versions_after_flush(session, flush_context):
+    client_ids = session.info.pop('versioned_client_ids', set())
+    contract_ids = session.info.pop('versioned_contract_ids', set())
+    dirty = session.dirty
+    for obj in chain(session.new, dirty):
+        if obj in dirty and not session.is_modified(obj):
+            continue
+        if isinstance(obj, Client):
+            # Cliente novo começa na versão 0
+            if obj in dirty:
+                client_ids.add(obj.id)
+        elif isinstance(obj, (Contract, Action, ClientPhone)):
+            client_ids.add(obj.client_id)
+        elif isinstance(obj, Installment):
+            contract_ids.add(obj.contract_id)
+    client_ids.discard(None)
+    contract_ids.discard(None)
+    if client_ids or contract_ids:
+        bump_client_versions(session.connection(), client_ids, contract_ids)
+        session.info['stale_client_versions'] = True
+
+
+@event.listens_for(Session, 'after_flush_postexec')
+def _expire_client_versions(session, flush_context):
+    if not session.info.pop('stale_client_versions', False):
+        return
+    for obj in list(session.identity_map.values()):
+        if isinstance(obj, Client):
+            session.expire(obj, ['version'])
+
+
+@event.listens_for(Session, 'after_flush_postexec')
+def _expire_refreshed_contracts(session, flush_context):
+    stale_ids = session.info.pop('stale_contract_ids', None)
+    if not stale_ids:
+        return
+    for obj in list(session.identity_map.values()):
+        if isinstance(obj, Contract) and obj.id in stale_ids:
+            session.expire(obj, CONTRACT_AGGREGATE_COLUMNS)
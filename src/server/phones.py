@@ -0,0 +1,54 @@
+"""Normalização de telefones para E.164 (+5562999991234) e formatação para exibição.
+
+Os números ficam em `ClientPhone.number` já em E.164, que é a chave da busca reversa por
+identificador de chamada (`/api/clients/by_phone`).
+"""
+BRAZIL_COUNTRY_CODE = '55'
+
+
+def normalize_phone(value):
+    """Converte um telefone em qualquer formato para E.164, ou None se não for reconhecível.
+
+    Números sem código de país são tratados como brasileiros e precisam do DDD
+    (10 ou 11 dígitos); um zero de discagem interurbana à frente é descartado.
+    """
+    if value is None:
+        return None
+    text = str(value).strip()
+    digits = ''.join(char for char in text if char.isdigit())
+    if text.startswith('+'):
+        return f'+{digits}' if 8 <= len(digits) <= 15 else None
+    digits = digits.lstrip('0')
+    if len(digits) in (10, 11):
+        digits = BRAZIL_COUNTRY_CODE + digits
+    if digits.startswith(BRAZIL_COUNTRY_CODE) and len(digits) in (12, 13):
+        return f'+{digits}'
+    return None
+
+
+def parse_phones(value):
+    """Lista de telefones em E.164 a partir de uma lista ou do texto separado por vírgulas.
+
+    ValueError se algum número não puder ser normalizado; duplicados são descartados.
+    """
+    if value is None:
+        return []
+    items = value.split(',') if isinstance(value, str) else value
+    numbers = []
+    for item in items:
+        if item is None or not str(item).strip():
+            continue
+        number = normalize_phone(item)
+        if number is None:
+            raise ValueError(f"Telefone inválido: {str(item).strip()!r}")
+        if number not in numbers:
+            numbers.append(number)
+    return numbers
+
+
+def format_phone(number):
+    """Formato nacional para números brasileiros, (62) 99999-1234; os demais ficam em E.164."""
+    if number.startswith('+' + BRAZIL_COUNTRY_CODE) and len(number) in (13, 14):
+        area, local = number[3:5], number[5:]
+        return f'({area}) {local[:-4]}-{local[-4:]}'
+    return number
@@ -0,0 +1,175 @@
+"""Leituras das rotas GET em uma réplica do banco, com as escritas sempre no primário.
+
+Com `REPLICA_DATABASE_URL` definida, o engine da réplica é o bind `replica` do Flask-SQLAlchemy
+e a sessão (`RoutingSession`) escolhe o engine a cada consulta:
+
+- SELECTs feitos durante uma requisição GET/HEAD vão para a réplica;
+- flushes, INSERT/UPDATE/DELETE e qualquer acesso fora de uma requisição GET vão para o primário;
+- por `REPLICA_STICKY_SECONDS` depois de uma requisição de escrita bem-sucedida, as leituras do
+  mesmo usuário continuam no primário, para que ele enxergue o que acabou de gravar apesar do
+  atraso da replicação (read-your-writes);
+- se a réplica falhar (erro de conexão ou de consulta, ou sem tabelas), ela é deixada de lado
+  por `REPLICA_RETRY_INTERVAL` segundos e as leituras voltam para o primário; a requisição que
+  encontrou o erro é repetida no primário em vez de responder 500.
+
+As marcas de escrita por usuário ficam na memória do processo.
+"""
+import logging
+import sqlite3
+import threading
+import time
+
+from flask import current_app, g, has_app_context, has_request_context, request
+from flask_jwt_extended import get_jwt_identity
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event, inspect
+from sqlalchemy.exc import DBAPIError
+
+REPLICA_BIND = 'replica'
+READ_METHODS = frozenset({'GET', 'HEAD', 'OPTIONS'})
+# Acima disso as marcas vencidas são descartadas a cada nova escrita
+STICKY_PRUNE_SIZE = 1024
+
+logger = logging.getLogger(__name__)
+
+
+def _is_read(clause):
+    # select(Model).from_statement(...) chega como FromStatement, que embrulha o SELECT textual
+    return bool(getattr(clause, 'is_select', False)
+                or getattr(getattr(clause, 'element', None), 'is_select', False))
+
+
+def _current_identity():
+    try:
+        return get_jwt_identity()
+    except RuntimeError:
+        # Rota sem @jwt_required (ex.: /api/register)
+        return None
+
+
+class RoutingSession(Session):
+    """Sessão do Flask-SQLAlchemy que manda os SELECTs das requisições de leitura à réplica."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        engine = super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+        # Só as leituras do banco principal têm cópia na réplica (o arquivo de ações, por
+        # exemplo, fica no seu próprio bind)
+        if bind is None and not self._flushing and _is_read(clause) and has_app_context() \
+                and engine is self._db.engine:
+            router = current_app.extensions.get('replica_router')
+            if router is not None and router.reads_from_replica():
+                return router.engine
+        return engine
+
+
+class ReplicaRouter:
+    def __init__(self, app=None, engine=None):
+        self.engine = None
+        self.sticky_seconds = 5.0
+        self.retry_interval = 10.0
+        self._lock = threading.Lock()
+        self._sticky_until = {}
+        self._unhealthy_until = 0.0
+        self._verified = False
+        if app is not None:
+            self.init_app(app, engine)
+
+    def init_app(self, app, engine):
+        self.sticky_seconds = app.config['REPLICA_STICKY_SECONDS']
+        self.retry_interval = app.config['REPLICA_RETRY_INTERVAL']
+        self.set_engine(engine)
+        app.extensions['replica_router'] = self
+        app.after_request(self._stick_after_write)
+        app.register_error_handler(DBAPIError, self._retry_on_primary)
+
+    def set_engine(self, engine):
+        """Troca o engine da réplica (None desliga o roteamento) e zera o estado de saúde."""
+        with self._lock:
+            self.engine = engine
+            self._sticky_until.clear()
+            self._unhealthy_until = 0.0
+            self._verified = False
+        if engine is not None and not event.contains(engine, 'handle_error', self._on_error):
+            event.listen(engine, 'handle_error', self._on_error)
+
+    def reads_from_replica(self):
+        if self.engine is None or not has_request_context() or request.method not in READ_METHODS:
+            return False
+        return not self.is_sticky(_current_identity()) and self.healthy()
+
+    def healthy(self):
+        """A réplica está fora enquanto durar o intervalo após uma falha; depois é testada de novo."""
+        if time.monotonic() < self._unhealthy_until:
+            return False
+        if not self._verified:
+            self._verified = self._probe()
+            if not self._verified:
+                self.mark_unhealthy()
+        return self._verified
+
+    def mark_unhealthy(self):
+        with self._lock:
+            self._unhealthy_until = time.monotonic() + self.retry_interval
+            self._verified = False
+
+    def record_write(self, identity):
+        if identity is None or self.engine is None:
+            return
+        now = time.monotonic()
+        with self._lock:
+            self._sticky_until[identity] = now + self.sticky_seconds
+            if len(self._sticky_until) > STICKY_PRUNE_SIZE:
+                for key, until in list(self._sticky_until.items()):
+                    if until <= now:
+                        del self._sticky_until[key]
+
+    def sticky_request(self):
+        """O usuário da requisição atual gravou há pouco e lê do primário."""
+        if self.engine is None or not has_request_context():
+            return False
+        return self.is_sticky(_current_identity())
+
+    def is_sticky(self, identity):
+        if identity is None:
+            return False
+        return self._sticky_until.get(identity, 0.0) > time.monotonic()
+
+    def _probe(self):
+        # Um SQLite inexistente seria criado vazio pela conexão: exige ao menos uma tabela
+        try:
+            with self.engine.connect() as conn:
+                return bool(inspect(conn).get_table_names())
+        except Exception as exc:
+            logger.warning("Réplica indisponível: %s", exc)
+            return False
+
+    def _on_error(self, exception_context):
+        # A réplica só recebe leituras: qualquer erro dela é tratado como indisponibilidade
+        logger.warning("Falha na réplica; leituras no primário por %ss: %s", self.retry_interval,
+                       exception_context.original_exception)
+        self.mark_unhealthy()
+        if has_request_context():
+            g.replica_failed = True
+
+    def _retry_on_primary(self, exc):
+        # Com a réplica marcada como fora, a view refeita lê tudo do primário
+        if not g.pop('replica_failed', False) or request.method not in READ_METHODS:
+            raise exc
+        current_app.extensions['sqlalchemy'].session.rollback()
+        return current_app.dispatch_request()
+
+    def _stick_after_write(self, response):
+        if request.method not in READ_METHODS and response.status_code < 400:
+            self.record_write(_current_identity())
+        return response
+
+
+def copy_database(primary_path, replica_path):
+    """Copia o SQLite primário sobre a réplica (backup online), simulando um ciclo de replicação."""
+    source = sqlite3.connect(primary_path)
+    target = sqlite3.connect(replica_path)
+    try:
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
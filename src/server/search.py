@@ -0,0 +1,58 @@
+"""Busca de clientes por digitação (typeahead) sobre o índice FTS5 `client_search`.
+
+Cada palavra digitada vira um termo de prefixo (`"ana"*`) e todas precisam casar em alguma
+coluna (nome, dígitos do CPF ou telefones). O resultado é ordenado pelo bm25 do FTS5, com peso
+maior para CPF e telefone, que identificam o cliente sem ambiguidade.
+
+Só os primeiros `RANK_CANDIDATES` resultados (em ordem de rowid) são ranqueados: termos curtos
+e comuns ("mar mart") casam com centenas de milhares de clientes, e calcular o bm25 de todos
+custava centenas de ms em 2 milhões de clientes. Buscas específicas, que são as que importam
+ao final da digitação, têm menos candidatos que o limite e saem com o ranking exato.
+"""
+import re
+
+from sqlalchemy import or_, text
+from sqlalchemy.orm import selectinload
+
+from models import db, Client, ClientPhone
+
+# Pesos do bm25 por coluna, na ordem (name, cpf, phones)
+RANK_WEIGHTS = (1.0, 10.0, 5.0)
+MIN_QUERY_LENGTH = 2
+RANK_CANDIDATES = 500
+# Pontuação comum em CPF e telefone digitados ("123.456", "99999-1234") some antes de separar
+_JOINED_PUNCTUATION = re.compile(r'[.\-/]')
+_WORD = re.compile(r'\w+')
+
+
+def match_expression(query):
+    """Monta a expressão MATCH do FTS5, ou None se não houver termo pesquisável."""
+    words = _WORD.findall(_JOINED_PUNCTUATION.sub('', query or ''))
+    if not words or sum(len(word) for word in words) < MIN_QUERY_LENGTH:
+        return None
+    # Aspas tornam cada palavra um literal, sem interpretar operadores do FTS5 (AND, NEAR, ^...)
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def search_clients(query, limit=20):
+    expression = match_expression(query)
+    if expression is None:
+        return []
+
+    if db.engine.dialect.name != 'sqlite':
+        # Sem FTS5: busca simples por prefixo, sem ranking
+        pattern = f"{' '.join(_WORD.findall(query))}%"
+        return Client.query.options(selectinload(Client.phone_numbers)).filter(or_(
+            Client.name.ilike(pattern), Client.cpf_digits.like(pattern),
+            Client.phone_numbers.any(ClientPhone.number.like(f'%{pattern}')),
+        )).order_by(Client.name).limit(limit).all()
+
+    weights = ', '.join(str(weight) for weight in RANK_WEIGHTS)
+    statement = text(
+        f"SELECT client.* FROM (SELECT rowid, bm25(client_search, {weights}) AS score "
+        "FROM client_search WHERE client_search MATCH :expression LIMIT :candidates) AS hits "
+        "JOIN client ON client.id = hits.rowid ORDER BY hits.score LIMIT :limit"
+    )
+    return db.session.scalars(
+        db.select(Client).from_statement(statement).options(selectinload(Client.phone_numbers)),
+        {'expression': expression, 'candidates': RANK_CANDIDATES, 'limit': limit}).all()
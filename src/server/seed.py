@@ -0,0 +1,240 @@
+"""Carteira sintética para desenvolvimento e benchmarks (`flask seed`).
+
+Os dados são determinísticos para uma mesma semente e data de referência: nomes, CPFs válidos,
+telefones, contratos com parcelas mensais distribuídas por faixa de atraso e histórico de
+ações. As linhas são gravadas com inserts em lote do SQLAlchemy Core, um bloco de clientes por
+transação, sem montar objetos do ORM; os agregados dos contratos já saem calculados.
+
+Os ids continuam a partir dos maiores existentes, de modo que a carteira pode ser gerada sobre
+um banco que já tem dados. O CPF do cliente de id N é sempre `synthetic_cpf(N)` e o primeiro
+telefone é derivado do id, o que permite aos benchmarks sortear clientes sem consultar o banco.
+"""
+import random
+import time
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import func, select
+
+from cpf import cpf_from_base, format_cpf
+from models import db, Action, Client, ClientPhone, Contract, Installment, User
+
+TEST_USERNAME = 'teste_user'
+TEST_PASSWORD = 'senha_teste'
+
+FIRST_NAMES = ['Ana', 'Bruno', 'Carla', 'Diego', 'Eduarda', 'Felipe', 'Gabriela', 'Henrique', 'Isabela',
+               'João', 'Larissa', 'Marcos', 'Natália', 'Otávio', 'Paula', 'Rafael', 'Sofia', 'Thiago',
+               'Maria', 'José', 'Antônio', 'Francisca', 'Luiz', 'Juliana', 'Pedro', 'Beatriz']
+LAST_NAMES = ['Silva', 'Santos', 'Oliveira', 'Souza', 'Rodrigues', 'Ferreira', 'Alves', 'Pereira',
+              'Lima', 'Gomes', 'Costa', 'Ribeiro', 'Martins', 'Carvalho', 'Almeida', 'Lopes',
+              'Barbosa', 'Araújo', 'Mendes', 'Rocha', 'Dias', 'Nascimento', 'Moreira', 'Cardoso']
+AREA_CODES = ['62', '62', '62', '64', '61', '11', '21', '31', '34', '65']
+
+# Tipo de contrato: (peso no sorteio, faixa do valor da parcela)
+CONTRACT_TYPES = {
+    'Crédito Rural': (3, (2000.0, 40000.0)),
+    'Financiamento Veículo': (3, (600.0, 4000.0)),
+    'Empréstimo Pessoal': (2, (150.0, 2500.0)),
+    'Conta Corrente': (1, (100.0, 8000.0)),
+}
+# Faixas de atraso do primeiro vencimento em dias (negativo: a vencer) e seus pesos
+AGING_SPREAD = (
+    (35, (-60, 0)),
+    (25, (1, 30)),
+    (15, (31, 90)),
+    (15, (91, 360)),
+    (10, (361, 1080)),
+)
+ACTION_TYPES = [
+    'Tentativa de contato por telefone',
+    'Envio de notificação por SMS/WhatsApp',
+    'Carta de cobrança enviada',
+    'Negociação realizada',
+    'Promessa de pagamento',
+    'Contato com avalista',
+    'Visita ao cooperado',
+    'Encaminhamento jurídico',
+]
+ACTION_STATUSES = ['Concluída'] * 4 + ['Pendente']
+OPERATORS = [f'operador{number:02d}' for number in range(1, 21)]
+# Histórico de ações espalhado pelos últimos dias
+ACTION_HISTORY_DAYS = 180
+
+
+def synthetic_cpf(client_id):
+    """CPF válido (só dígitos) do cliente sintético de id `client_id`."""
+    return cpf_from_base(f'{client_id:09d}')
+
+
+def synthetic_phone(client_id):
+    """Celular (E.164) do cliente sintético de id `client_id`, com DDD também derivado do id."""
+    area_code = AREA_CODES[client_id % len(AREA_CODES)]
+    return f'+55{area_code}9{client_id // 10000 % 10000:04d}{client_id % 10000:04d}'
+
+
+def ensure_test_user():
+    """Cria o usuário de teste (teste_user / senha_teste) se ele ainda não existir."""
+    if User.query.filter_by(username=TEST_USERNAME).first():
+        return False
+    user = User(username=TEST_USERNAME)
+    user.set_password(TEST_PASSWORD)
+    db.session.add(user)
+    db.session.commit()
+    return True
+
+
+# Clientes fixos de demonstração, usados nos testes funcionais da interface:
+# (nome, CPF, telefones, [(contrato, tipo, valor da parcela, [vencimentos])])
+DEMO_CLIENTS = [
+    ('Maria Silva Santos', '123.456.789-09', '(62) 99999-1234,(62) 3333-5678', [
+        ('123456789', 'Crédito Rural', 15420.50,
+         [date(2024, 9, 15), date(2024, 10, 15), date(2024, 11, 15), date(2024, 12, 15)]),
+        ('987654321', 'Financiamento Veículo', 2890.75,
+         [date(2024, 10, 1), date(2024, 11, 1), date(2024, 12, 1)]),
+        # Contrato de parcela única
+        ('111222333', 'Empréstimo Pessoal', 1000.00, [date(2024, 11, 20)]),
+    ]),
+    ('João Carlos Oliveira', '987.654.321-00', '(62) 98888-2345', [
+        ('456789123', 'Conta Corrente', 5670.00, [date(2024, 12, 10), date(2025, 1, 10)]),
+    ]),
+]
+
+
+def ensure_demo_clients():
+    """Cria os clientes de demonstração (CPF 123.456.789-09, contrato 123456789...) que faltarem."""
+    created = 0
+    for name, cpf, phones, contracts in DEMO_CLIENTS:
+        if Client.query.filter_by(cpf=cpf).first():
+            continue
+        client = Client(name=name, cpf=cpf, phones=phones)
+        for number, contract_type, amount, due_dates in contracts:
+            contract = Contract(number=number, type=contract_type, client=client)
+            contract.installments = [Installment(number=index, due_date=due_date, amount=amount)
+                                     for index, due_date in enumerate(due_dates, start=1)]
+        db.session.add(client)
+        created += 1
+    db.session.commit()
+    return created
+
+
+# Colunas gravadas por tabela, na ordem dos valores de cada linha gerada
+COLUMNS = {
+    Client: ('id', 'name', 'cpf', 'cpf_digits', 'version'),
+    ClientPhone: ('client_id', 'number', 'position'),
+    Contract: ('id', 'number', 'type', 'client_id', 'total_amount', 'installment_count', 'earliest_due_date'),
+    Installment: ('id', 'number', 'due_date', 'amount', 'contract_id'),
+    Action: ('id', 'action_type', 'timestamp', 'status', 'notes', 'operator', 'client_id', 'contract_id',
+             'installment_number'),
+}
+
+
+def seed_portfolio(clients, contracts_per_client=3, installments=12, actions_per_client=4, seed=42,
+                   chunk_size=10000, today=None, progress=None):
+    """Gera `clients` clientes com seus contratos, parcelas e ações; devolve as contagens.
+
+    Cada cliente recebe exatamente `contracts_per_client` contratos de `installments` parcelas
+    mensais; `actions_per_client` é a média de ações (sorteadas entre zero e o dobro).
+    `progress`, se informado, recebe as contagens parciais a cada bloco gravado.
+    """
+    today = today or date.today()
+    rng = random.Random(seed)
+    started = time.perf_counter()
+    stats = {'clients': 0, 'phones': 0, 'contracts': 0, 'installments': 0, 'actions': 0}
+    next_ids = {model: (db.session.scalar(select(func.max(model.id))) or 0) + 1
+                for model in (Client, Contract, Installment, Action)}
+    first_client_id = next_ids[Client]
+    type_names = list(CONTRACT_TYPES)
+    type_weights = [CONTRACT_TYPES[name][0] for name in type_names]
+    aging_weights = [weight for weight, _ in AGING_SPREAD]
+    now = datetime.combine(today, datetime.min.time()) + timedelta(hours=18)
+    dialect = db.session.connection().dialect
+    date_param = _bind_processor(Installment.__table__.c.due_date, dialect)
+    datetime_param = _bind_processor(Action.__table__.c.timestamp, dialect)
+
+    for chunk_start in range(first_client_id, first_client_id + clients, chunk_size):
+        chunk_end = min(chunk_start + chunk_size, first_client_id + clients)
+        rows = {model: [] for model in COLUMNS}
+        for client_id in range(chunk_start, chunk_end):
+            digits = synthetic_cpf(client_id)
+            name = f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {rng.choice(LAST_NAMES)}'
+            rows[Client].append((client_id, name, format_cpf(digits), digits, 0))
+            mobile = synthetic_phone(client_id)
+            rows[ClientPhone].append((client_id, mobile, 0))
+            if rng.random() < 0.4:
+                rows[ClientPhone].append((client_id, f'{mobile[:5]}3{rng.randrange(10 ** 7):07d}', 1))
+
+            contracts = []
+            for _ in range(contracts_per_client):
+                contract_id = next_ids[Contract]
+                next_ids[Contract] += 1
+                contract_type = rng.choices(type_names, type_weights)[0]
+                low, high = CONTRACT_TYPES[contract_type][1]
+                amount = round(rng.uniform(low, high), 2)
+                days_low, days_high = rng.choices(AGING_SPREAD, aging_weights)[0][1]
+                first_due = today - timedelta(days=rng.randint(days_low, days_high))
+                rows[Contract].append((
+                    contract_id, f'{contract_id:09d}', contract_type, client_id,
+                    round(amount * installments, 2), installments,
+                    date_param(first_due) if installments else None,
+                ))
+                installment_id = next_ids[Installment]
+                rows[Installment].extend(
+                    (installment_id + index, index + 1, date_param(first_due + timedelta(days=30 * index)),
+                     amount, contract_id)
+                    for index in range(installments))
+                next_ids[Installment] += installments
+                # Parcelas já vencidas (as ações referenciam uma delas)
+                overdue = min(installments, max(0, ((today - first_due).days - 1) // 30 + 1))
+                contracts.append((contract_id, overdue))
+
+            for _ in range(rng.randint(0, 2 * actions_per_client) if contracts else 0):
+                contract_id, overdue = rng.choice(contracts)
+                rows[Action].append((
+                    next_ids[Action],
+                    rng.choice(ACTION_TYPES),
+                    datetime_param(now - timedelta(seconds=rng.randrange(ACTION_HISTORY_DAYS * 86400))),
+                    rng.choice(ACTION_STATUSES),
+                    '',
+                    rng.choice(OPERATORS),
+                    client_id,
+                    contract_id,
+                    rng.randint(1, overdue) if overdue else None,
+                ))
+                next_ids[Action] += 1
+
+        connection = db.session.connection()
+        for model, model_rows in rows.items():
+            _insert(connection, model.__table__, COLUMNS[model], model_rows)
+        db.session.commit()
+
+        stats['clients'] += len(rows[Client])
+        stats['phones'] += len(rows[ClientPhone])
+        stats['contracts'] += len(rows[Contract])
+        stats['installments'] += len(rows[Installment])
+        stats['actions'] += len(rows[Action])
+        stats['seconds'] = time.perf_counter() - started
+        if progress:
+            progress(stats)
+
+    stats['seconds'] = time.perf_counter() - started
+    return stats
+
+
+def _bind_processor(column, dialect):
+    """Conversão do valor Python para o driver (no SQLite, datas viram texto ISO)."""
+    processor = column.type.dialect_impl(dialect).bind_processor(dialect)
+    return processor or (lambda value: value)
+
+
+def _insert(connection, table, columns, rows):
+    """executemany direto no driver: a montagem de parâmetros do Core por linha custava mais que
+    o próprio insert em milhões de parcelas. Os valores já vêm convertidos para o driver."""
+    if not rows:
+        return
+    compiled = table.insert().compile(dialect=connection.dialect, column_keys=list(columns))
+    if not connection.dialect.positional:
+        rows = [dict(zip(columns, row)) for row in rows]
+    elif list(compiled.positiontup) != list(columns):
+        # Colunas com default no Python entram no INSERT compilado: a ordem segue a do driver
+        order = [columns.index(name) for name in compiled.positiontup]
+        rows = [tuple(row[index] for index in order) for row in rows]
+    connection.exec_driver_sql(str(compiled), rows)
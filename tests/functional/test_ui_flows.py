@@ -132,11 +132,11 @@ def test_registrar_acao_contrato_parcela(driver, base_urls):
     )
     search_input = driver.find_element(By.XPATH, "//input[@placeholder='Digite o nome ou CPF...']")
     search_input.clear()
-    search_input.send_keys("123.456.789-01")
+    search_input.send_keys("123.456.789-09")
 
     # Clicar no resultado do cooperado (texto contém CPF)
     WebDriverWait(driver, 20).until(
-        EC.element_to_be_clickable((By.XPATH, "//button[contains(@class,'p-3')][.//*[contains(., '123.456.789-01')]]"))
+        EC.element_to_be_clickable((By.XPATH, "//button[contains(@class,'p-3')][.//*[contains(., '123.456.789-09')]]"))
     ).click()
 
     # Prosseguir para Contratos
@@ -0,0 +1,69 @@
+import os
+import sys
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import event
+
+# Garante que `from models import ...` em app.py funcione adicionando src/server ao sys.path
+CURRENT_DIR = os.path.dirname(__file__)
+PROJECT_ROOT = os.path.abspath(os.path.join(CURRENT_DIR, "..", ".."))
+SERVER_DIR = os.path.join(PROJECT_ROOT, "src", "server")
+if SERVER_DIR not in sys.path:
+    sys.path.insert(0, SERVER_DIR)
+
+# Os testes nunca devem tocar o instance/site.db versionado: usa SQLite em memória
+os.environ["APP_ENV"] = "testing"
+os.environ["DATABASE_URL"] = "sqlite://"
+
+import app as app_module  # noqa: E402
+from models import db  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def clear_response_cache():
+    # Respostas em cache de um teste não podem vazar para o próximo
+    app_module.cache.clear()
+    yield
+    app_module.cache.clear()
+
+
+@pytest.fixture
+def db_app():
+    """App Flask com o schema criado em um SQLite em memória, limpo ao final do teste."""
+    with app_module.app.app_context():
+        db.create_all()
+        yield app_module.app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def db_client(db_app):
+    return db_app.test_client()
+
+
+@pytest.fixture
+def auth_header():
+    with app_module.app.app_context():
+        token = app_module.create_access_token(identity="tester")
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture
+def count_queries(db_app):
+    """Context manager que coleta os SQLs emitidos pelo engine durante o bloco."""
+    @contextmanager
+    def _count():
+        statements = []
+
+        def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(db.engine, "before_cursor_execute", _before_cursor_execute)
+        try:
+            yield statements
+        finally:
+            event.remove(db.engine, "before_cursor_execute", _before_cursor_execute)
+
+    return _count
@@ -0,0 +1,707 @@
+import csv
+import io
+import json
+import zipfile
+from datetime import date, datetime, timedelta
+
+import pytest
+from openpyxl import load_workbook
+
+from exporter import stream_xlsx
+from models import db, Client, Contract, Installment, Action
+import app as app_module
+
+
+def _seed_overdue(today):
+    """Popula dois clientes com parcelas vencidas e a vencer em datas relativas a hoje."""
+    ana = Client(name="Ana", cpf="111.444.777-35", phones="(62) 99999-1234")
+    bia = Client(name="Bia", cpf="222.333.666-38", phones=None)
+    rural = Contract(number="C-1", type="Crédito Rural", client=ana)
+    veiculo = Contract(number="C-2", type="Financiamento Veículo", client=bia)
+    db.session.add_all([ana, bia, rural, veiculo])
+    db.session.add_all([
+        Installment(contract=rural, number=1, due_date=today - timedelta(days=90), amount=1000.0),
+        Installment(contract=rural, number=2, due_date=today - timedelta(days=60), amount=1000.0),
+        Installment(contract=rural, number=3, due_date=today - timedelta(days=30), amount=1000.0),
+        Installment(contract=rural, number=4, due_date=today + timedelta(days=5), amount=1000.0),
+        Installment(contract=veiculo, number=1, due_date=today - timedelta(days=45), amount=250.0),
+        Installment(contract=veiculo, number=2, due_date=today - timedelta(days=10), amount=250.0),
+    ])
+    db.session.commit()
+
+
+def test_overdue_installments_sorted_by_days_overdue(db_client, auth_header):
+    today = date.today()
+    _seed_overdue(today)
+
+    resp = db_client.get("/api/overdue_installments", headers=auth_header)
+    assert resp.status_code == 200
+    data = resp.get_json()
+    assert [item["daysOverdue"] for item in data] == [10, 30, 45, 60, 90]
+    assert data[0] == {
+        "id": data[0]["id"],
+        "clientName": "Bia",
+        "cpf": "222.333.666-38",
+        "contractNumber": "C-2",
+        "installmentNumber": 2,
+        "dueDate": (today - timedelta(days=10)).isoformat(),
+        "daysOverdue": 10,
+        "amount": 250.0,
+    }
+    assert "X-Next-Cursor" not in resp.headers
+
+
+def test_overdue_installments_single_query(db_client, auth_header, count_queries):
+    _seed_overdue(date.today())
+
+    with count_queries() as statements:
+        resp = db_client.get("/api/overdue_installments", headers=auth_header)
+    assert resp.status_code == 200
+    assert len(statements) == 1
+    assert "JOIN contract" in statements[0] and "JOIN client" in statements[0]
+
+
+def test_overdue_installments_filters(db_client, auth_header):
+    _seed_overdue(date.today())
+
+    resp = db_client.get("/api/overdue_installments?contract_type=Crédito Rural", headers=auth_header)
+    assert {item["contractNumber"] for item in resp.get_json()} == {"C-1"}
+
+    resp = db_client.get("/api/overdue_installments?max_amount=500", headers=auth_header)
+    assert [item["daysOverdue"] for item in resp.get_json()] == [10, 45]
+
+    resp = db_client.get("/api/overdue_installments?min_days_overdue=30&max_days_overdue=60", headers=auth_header)
+    assert [item["daysOverdue"] for item in resp.get_json()] == [30, 45, 60]
+
+
+def test_overdue_installments_keyset_pagination(db_client, auth_header):
+    _seed_overdue(date.today())
+
+    seen = []
+    url = "/api/overdue_installments?limit=2"
+    while True:
+        resp = db_client.get(url, headers=auth_header)
+        assert resp.status_code == 200
+        page = resp.get_json()
+        assert len(page) <= 2
+        seen.extend(item["daysOverdue"] for item in page)
+        cursor = resp.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+        url = f"/api/overdue_installments?limit=2&cursor={cursor}"
+
+    assert seen == [10, 30, 45, 60, 90]
+
+
+@pytest.mark.parametrize("cursor", ["nao-e-cursor", "WzFd"])
+def test_overdue_installments_invalid_cursor(db_client, auth_header, cursor):
+    resp = db_client.get(f"/api/overdue_installments?cursor={cursor}", headers=auth_header)
+    assert resp.status_code == 400
+
+
+def test_overdue_installments_ndjson_stream(db_client, auth_header):
+    _seed_overdue(date.today())
+
+    resp = db_client.get("/api/overdue_installments", headers={**auth_header, "Accept": "application/x-ndjson"})
+    assert resp.status_code == 200
+    assert resp.mimetype == "application/x-ndjson"
+    lines = [json.loads(line) for line in resp.get_data(as_text=True).splitlines()]
+    assert [item["daysOverdue"] for item in lines] == [10, 30, 45, 60, 90]
+
+    json_resp = db_client.get("/api/overdue_installments", headers=auth_header)
+    assert lines == json_resp.get_json()
+
+
+def test_clients_stream_flag(db_client, auth_header):
+    _seed_overdue(date.today())
+
+    resp = db_client.get("/api/clients?stream=1", headers=auth_header)
+    assert resp.mimetype == "application/x-ndjson"
+    lines = [json.loads(line) for line in resp.get_data(as_text=True).splitlines()]
+    assert [c["name"] for c in lines] == ["Ana", "Bia"]
+    assert lines[0]["phones"] == ["(62) 99999-1234"]
+    assert lines[1]["phones"] == []
+
+    # Accept genérico continua recebendo o array JSON
+    resp = db_client.get("/api/clients", headers={**auth_header, "Accept": "*/*"})
+    assert resp.mimetype == "application/json"
+    assert len(resp.get_json()) == 2
+
+
+def test_portfolio_aging_buckets(db_client, auth_header, count_queries):
+    _seed_overdue(date.today())
+
+    with count_queries() as statements:
+        resp = db_client.get("/api/portfolio/aging", headers=auth_header)
+    assert resp.status_code == 200
+    assert len(statements) == 1 and "GROUP BY" in statements[0]
+
+    data = resp.get_json()
+    assert [(b["label"], b["count"], b["amount"]) for b in data["buckets"]] == [
+        ("1-30", 2, 1250.0),
+        ("31-60", 2, 1250.0),
+        ("61-90", 1, 1000.0),
+        ("91-180", 0, 0.0),
+        ("181+", 0, 0.0),
+    ]
+    assert data["totals"] == {"count": 5, "amount": 3500.0}
+    assert [b["count"] for b in data["byType"]["Financiamento Veículo"]] == [1, 1, 0, 0, 0]
+    assert [b["amount"] for b in data["byType"]["Crédito Rural"]] == [1000.0, 1000.0, 1000.0, 0.0, 0.0]
+
+
+def test_portfolio_aging_configurable_edges(db_app, db_client, auth_header, monkeypatch):
+    _seed_overdue(date.today())
+    monkeypatch.setitem(db_app.config, "AGING_BUCKETS", [45])
+
+    data = db_client.get("/api/portfolio/aging", headers=auth_header).get_json()
+    assert [(b["label"], b["count"]) for b in data["buckets"]] == [("1-45", 3), ("46+", 2)]
+
+
+def test_contracts_use_constant_number_of_queries(db_client, auth_header, count_queries):
+    today = date.today()
+    client = Client(name="Carla", cpf="333.666.999-57", phones=None)
+    db.session.add(client)
+    for n in range(50):
+        contract = Contract(number=f"K-{n}", type="Conta Corrente", client=client)
+        db.session.add_all([
+            contract,
+            Installment(contract=contract, number=1, due_date=today - timedelta(days=40), amount=10.0),
+            Installment(contract=contract, number=2, due_date=today - timedelta(days=10), amount=15.0),
+        ])
+    db.session.commit()
+    db.session.expunge_all()
+
+    with count_queries() as statements:
+        resp = db_client.get("/api/contracts?cpf=333.666.999-57", headers=auth_header)
+    assert resp.status_code == 200
+    # Cliente + contratos + parcelas (IN), independente do número de contratos
+    assert len(statements) == 3
+
+    data = resp.get_json()
+    assert len(data) == 50
+    assert data[0]["installmentValue"] == 25.0
+    assert data[0]["installmentCount"] == 2
+    assert data[0]["dueDate"] == (today - timedelta(days=40)).isoformat()
+    assert data[0]["daysOverdue"] == 40
+    assert [inst["number"] for inst in data[0]["installments"]] == [1, 2]
+
+
+def test_export_overdue_installments_csv_and_xlsx(db_client, auth_header):
+    today = date.today()
+    _seed_overdue(today)
+
+    resp = db_client.get("/api/overdue_installments/export?format=csv&contract_type=Crédito Rural",
+                         headers=auth_header)
+    assert resp.status_code == 200
+    assert resp.mimetype == "text/csv"
+    assert "attachment" in resp.headers["Content-Disposition"]
+    lines = resp.get_data().decode("utf-8-sig").splitlines()
+    assert lines[0] == "Cliente;CPF;Contrato;Parcela;Vencimento;Dias em atraso;Valor"
+    assert lines[1] == f"Ana;111.444.777-35;C-1;3;{(today - timedelta(days=30)).isoformat()};30;1000.0"
+    assert len(lines) == 4
+
+    resp = db_client.get("/api/overdue_installments/export", headers=auth_header)
+    assert resp.status_code == 200
+    sheet = load_workbook(io.BytesIO(resp.get_data()), read_only=True).active
+    rows = list(sheet.iter_rows(values_only=True))
+    assert rows[0][0] == "Cliente"
+    assert [row[5] for row in rows[1:]] == [10, 30, 45, 60, 90]
+
+    resp = db_client.get("/api/overdue_installments/export?format=pdf", headers=auth_header)
+    assert resp.status_code == 400
+
+
+def test_stream_xlsx_sends_first_block_before_reading_all_rows():
+    consumed = []
+
+    def rows():
+        for number in range(20000):
+            consumed.append(number)
+            yield (f"Cliente {number} <&>", number, 12.5, date(2024, 1, 31), datetime(2024, 5, 1, 10, 30),
+                   None, "=1+1", "controle\x01")
+
+    body = stream_xlsx("Ações", ["Nome", "Número", "Valor", "Data", "Hora", "Vazio", "Fórmula", "Texto"], rows())
+    first = next(body)
+    assert first.startswith(b"PK") and len(consumed) < 20000
+
+    sheet = load_workbook(io.BytesIO(first + b"".join(body)), read_only=True)["Ações"]
+    data = list(sheet.iter_rows(values_only=True))
+    assert len(data) == 20001
+    assert data[1] == ("Cliente 0 <&>", 0, 12.5, datetime(2024, 1, 31), datetime(2024, 5, 1, 10, 30),
+                       None, "'=1+1", "controle")
+
+
+def test_stream_xlsx_writes_non_finite_numbers_as_empty_cells():
+    body = b"".join(stream_xlsx("Valores", ["A", "B", "C", "D"],
+                                [(float("nan"), float("inf"), float("-inf"), 1.5)]))
+    with zipfile.ZipFile(io.BytesIO(body)) as package:
+        sheet_xml = package.read("xl/worksheets/sheet1.xml").decode()
+    assert "nan" not in sheet_xml and "inf" not in sheet_xml
+
+    sheet = load_workbook(io.BytesIO(body), read_only=True)["Valores"]
+    assert list(sheet.iter_rows(min_row=2, values_only=True)) == [(None, None, None, 1.5)]
+
+
+def test_export_actions_by_client(db_client, auth_header):
+    _seed_overdue(date.today())
+    ana = Client.query.filter_by(name="Ana").one()
+    contract = Contract.query.filter_by(number="C-1").one()
+    db.session.add_all([
+        Action(client_id=ana.id, contract_id=contract.id, installment_number=1, action_type="Ligação",
+               status="Concluída", notes="=HYPERLINK(\"x\")", operator="op",
+               timestamp=datetime(2024, 5, 1, 10, 0)),
+        Action(client_id=ana.id, action_type="SMS", status="Concluída", operator="op",
+               timestamp=datetime(2024, 5, 2, 9, 30)),
+    ])
+    db.session.commit()
+
+    resp = db_client.get(f"/api/actions/{ana.id}/export?format=csv", headers=auth_header)
+    assert resp.status_code == 200
+    rows = list(csv.reader(resp.get_data().decode("utf-8-sig").splitlines(), delimiter=";"))
+    assert [row[1] for row in rows[1:]] == ["SMS", "Ligação"]
+    assert rows[2][3].startswith("'=")
+    assert rows[2][4] == "C-1"
+
+
+def _seed_action_history(client, contract, count=7):
+    # Pares de ações no mesmo instante para o desempate por id entrar em jogo
+    db.session.add_all([
+        Action(client_id=client.id, contract_id=contract.id if n % 2 else None, action_type=f"Ação {n}",
+               operator="op", timestamp=datetime(2024, 3, 1) + timedelta(hours=n // 2))
+        for n in range(count)
+    ])
+    db.session.commit()
+
+
+def test_actions_by_client_keyset_pagination(db_client, auth_header, count_queries):
+    _seed_overdue(date.today())
+    ana = Client.query.filter_by(name="Ana").one()
+    _seed_action_history(ana, Contract.query.filter_by(number="C-1").one())
+
+    seen, pages = [], []
+    url = f"/api/actions/{ana.id}?limit=3"
+    while url:
+        db.session.expunge_all()
+        with count_queries() as statements:
+            resp = db_client.get(url, headers=auth_header)
+        assert resp.status_code == 200
+        pages.append(len(statements))
+        seen.extend(resp.get_json())
+        cursor = resp.headers.get("X-Next-Cursor")
+        url = f"/api/actions/{ana.id}?limit=3&cursor={cursor}" if cursor else None
+
+    assert [item["actionType"] for item in seen] == [f"Ação {n}" for n in (6, 5, 4, 3, 2, 1, 0)]
+    assert [item["contractNumber"] for item in seen[:2]] == [None, "C-1"]
+    # Cliente e ações (já com o número do contrato) em duas consultas por página
+    assert pages == [2, 2, 2]
+
+
+def test_actions_by_client_since_and_default_page(db_client, auth_header):
+    _seed_overdue(date.today())
+    ana = Client.query.filter_by(name="Ana").one()
+    _seed_action_history(ana, Contract.query.filter_by(number="C-1").one())
+
+    resp = db_client.get(f"/api/actions/{ana.id}?since=2024-03-01T02:00:00", headers=auth_header)
+    assert [item["actionType"] for item in resp.get_json()] == ["Ação 6", "Ação 5", "Ação 4"]
+    assert "X-Next-Cursor" not in resp.headers
+
+    app_module.app.config["CLIENT_ACTIONS_PAGE_SIZE"] = 4
+    try:
+        resp = db_client.get(f"/api/actions/{ana.id}", headers=auth_header)
+    finally:
+        app_module.app.config["CLIENT_ACTIONS_PAGE_SIZE"] = 50
+    assert len(resp.get_json()) == 4 and resp.headers["X-Next-Cursor"]
+
+
+def test_actions_by_client_page_size_is_clamped(db_client, auth_header, monkeypatch):
+    _seed_overdue(date.today())
+    ana = Client.query.filter_by(name="Ana").one()
+    _seed_action_history(ana, Contract.query.filter_by(number="C-1").one())
+    monkeypatch.setitem(app_module.app.config, "CLIENT_ACTIONS_PAGE_SIZE_MAX", 3)
+
+    resp = db_client.get(f"/api/actions/{ana.id}?limit=100", headers=auth_header)
+    assert len(resp.get_json()) == 3 and resp.headers["X-Next-Cursor"]
+    resp = db_client.get(f"/api/actions/{ana.id}?limit=0", headers=auth_header)
+    assert len(resp.get_json()) == 1
+    workspace = db_client.get(f"/api/clients/{ana.cpf_digits}/workspace?actions_limit=100",
+                              headers=auth_header).get_json()
+    assert len(workspace["actions"]) == 3 and workspace["hasMoreActions"] is True
+
+
+def test_actions_by_client_since_validation_and_timezone(db_client, auth_header):
+    _seed_overdue(date.today())
+    ana = Client.query.filter_by(name="Ana").one()
+    _seed_action_history(ana, Contract.query.filter_by(number="C-1").one())
+
+    # Com fuso, vale o mesmo instante em UTC (como as ações gravadas); sem fuso, já é UTC
+    resp = db_client.get(f"/api/actions/{ana.id}?since=2024-02-29T23:00:00-03:00", headers=auth_header)
+    assert resp.status_code == 200
+    assert [item["actionType"] for item in resp.get_json()] == ["Ação 6", "Ação 5", "Ação 4"]
+
+    for url in (f"/api/actions/{ana.id}?since=ontem", f"/api/actions/{ana.id}/export?since=2024-13-01",
+                f"/api/clients/{ana.cpf_digits}/workspace?since=x"):
+        resp = db_client.get(url, headers=auth_header)
+        assert resp.status_code == 400
+        assert resp.get_json()["msg"] == "Data inválida em since"
+
+
+@pytest.mark.parametrize("cursor", ["nao-e-cursor", "WzFd", "WyJvbnRlbSIsMV0"])
+def test_actions_by_client_invalid_cursor(db_client, auth_header, cursor):
+    _seed_overdue(date.today())
+    ana = Client.query.filter_by(name="Ana").one()
+    resp = db_client.get(f"/api/actions/{ana.id}?cursor={cursor}", headers=auth_header)
+    assert resp.status_code == 400
+
+
+def test_create_actions_batch(db_client, auth_header, count_queries):
+    _seed_overdue(date.today())
+    payload = {"actions": [
+        {"clientCpf": "111.444.777-35", "actionType": "Ligação", "contractNumber": "C-1",
+         "selectedInstallmentNumber": 1, "notes": "Promessa"},
+        {"clientCpf": "222.333.666-38", "actionType": "SMS", "timestamp": "2024-05-01T10:00:00"},
+        {"clientCpf": "999.888.777-14", "actionType": "SMS"},
+        {"clientCpf": "222.333.666-38", "actionType": "SMS", "contractNumber": "C-1"},
+        {"actionType": "SMS"},
+        {"clientCpf": "111.444.777-35", "actionType": "SMS", "timestamp": "ontem"},
+    ]}
+
+    with count_queries() as statements:
+        resp = db_client.post("/api/actions/batch", json=payload, headers=auth_header)
+    assert resp.status_code == 207
+    # Uma consulta para os CPFs, outra para os contratos, o executemany, os ids e a versão dos clientes
+    assert [s.split()[0] for s in statements] == ["SELECT", "SELECT", "INSERT", "SELECT", "UPDATE"]
+
+    body = resp.get_json()
+    assert (body["created"], body["failed"]) == (2, 4)
+    assert [r["status"] for r in body["results"]] == [201, 201, 404, 404, 400, 400]
+    assert [r["index"] for r in body["results"]] == list(range(6))
+
+    first, second = (db.session.get(Action, r["action_id"]) for r in body["results"][:2])
+    assert (first.client.name, first.contract.number, first.installment_number, first.operator) == (
+        "Ana", "C-1", 1, "tester")
+    assert (second.client.name, second.timestamp) == ("Bia", datetime(2024, 5, 1, 10, 0))
+
+
+@pytest.mark.parametrize("size", [1, 50, 2000])
+def test_create_actions_batch_statement_count_is_constant(db_client, auth_header, count_queries, size):
+    _seed_overdue(date.today())
+    cpfs = ["111.444.777-35", "222.333.666-38"]
+    payload = [{"clientCpf": cpfs[n % 2], "actionType": "SMS", "contractNumber": "C-1" if n % 2 == 0 else None,
+                "notes": f"nota {n}"} for n in range(size)]
+
+    with count_queries() as statements:
+        resp = db_client.post("/api/actions/batch", json=payload, headers=auth_header)
+    assert resp.status_code == 201
+    assert len(statements) == 5
+
+    # Os ids relidos correspondem a cada item, na ordem do lote
+    results = resp.get_json()["results"]
+    notes = dict(db.session.query(Action.id, Action.notes).filter(Action.id.in_([r["action_id"] for r in results])))
+    assert [notes[r["action_id"]] for r in results] == [f"nota {n}" for n in range(size)]
+
+
+def test_create_actions_batch_checks_field_types(db_client, auth_header):
+    _seed_overdue(date.today())
+    resp = db_client.post("/api/actions/batch", headers=auth_header, json=[
+        {"clientCpf": "111.444.777-35", "actionType": "SMS", "contractNumber": []},
+        {"clientCpf": "111.444.777-35", "actionType": {}},
+        {"clientCpf": 11144477735, "actionType": "SMS", "selectedInstallmentNumber": "1"},
+        {"clientCpf": "111.444.777-35", "actionType": "SMS", "selectedInstallmentNumber": True},
+        {"clientCpf": "111.444.777-35", "actionType": "SMS", "timestamp": 1714557600},
+        {"clientCpf": "111.444.777-35", "actionType": "SMS", "status": None, "contractNumber": "C-1"},
+    ])
+    assert resp.status_code == 207
+    body = resp.get_json()
+    assert [r["status"] for r in body["results"]] == [400, 400, 400, 400, 400, 201]
+    assert [r.get("msg") for r in body["results"][:3]] == [
+        "Tipo inválido nos campos: contractNumber",
+        "Tipo inválido nos campos: actionType",
+        "Tipo inválido nos campos: clientCpf, selectedInstallmentNumber",
+    ]
+
+
+def test_create_actions_batch_normalizes_timezones_to_utc(db_client, auth_header):
+    _seed_overdue(date.today())
+    resp = db_client.post("/api/actions/batch", headers=auth_header, json=[
+        {"clientCpf": "111.444.777-35", "actionType": "SMS", "timestamp": "2024-01-01T10:00:00-03:00"},
+        {"clientCpf": "111.444.777-35", "actionType": "SMS", "timestamp": "2024-01-01T12:00:00"},
+        {"clientCpf": "111.444.777-35", "actionType": "SMS", "timestamp": "2024-01-01T14:00:00+00:00"},
+    ])
+    assert resp.status_code == 201
+    timestamps = [db.session.get(Action, r["action_id"]).timestamp for r in resp.get_json()["results"]]
+    assert timestamps == [datetime(2024, 1, 1, 13, 0), datetime(2024, 1, 1, 12, 0), datetime(2024, 1, 1, 14, 0)]
+    assert all(timestamp.tzinfo is None for timestamp in timestamps)
+
+
+def test_create_actions_batch_validation(db_client, auth_header, db_app, monkeypatch):
+    assert db_client.post("/api/actions/batch", json={"actions": []}, headers=auth_header).status_code == 400
+    assert db_client.post("/api/actions/batch", json={"x": 1}, headers=auth_header).status_code == 400
+
+    monkeypatch.setitem(db_app.config, "ACTIONS_BATCH_MAX_SIZE", 2)
+    resp = db_client.post("/api/actions/batch", json=[{"clientCpf": "1", "actionType": "SMS"}] * 3,
+                          headers=auth_header)
+    assert resp.status_code == 413
+
+
+def test_dashboard_cache_invalidated_by_writes(db_client, auth_header, count_queries):
+    today = date.today()
+    _seed_overdue(today)
+    ana = Client.query.filter_by(name="Ana").one()
+
+    first = db_client.get("/api/actions/today_count", headers=auth_header).get_json()
+    with count_queries() as statements:
+        assert db_client.get("/api/actions/today_count", headers=auth_header).get_json() == first
+        overdue = db_client.get("/api/overdue_installments", headers=auth_header).get_json()
+        assert db_client.get("/api/overdue_installments", headers=auth_header).get_json() == overdue
+    # Só a primeira chamada de overdue_installments foi ao banco
+    assert len(statements) == 1
+
+    resp = db_client.post("/api/actions", json={"clientCpf": ana.cpf, "actionType": "SMS"}, headers=auth_header)
+    assert resp.status_code == 201
+    assert db_client.get("/api/actions/today_count", headers=auth_header).get_json() == {"count": first["count"] + 1}
+
+    # Escrita de parcela invalida as rotas da carteira
+    contract = Contract.query.filter_by(number="C-1").one()
+    db.session.add(Installment(contract=contract, number=5, due_date=today - timedelta(days=1), amount=10.0))
+    db.session.commit()
+    refreshed = db_client.get("/api/overdue_installments", headers=auth_header).get_json()
+    assert len(refreshed) == len(overdue) + 1
+
+    stats = db_client.get("/api/cache/stats", headers=auth_header).get_json()
+    assert stats["backend"] == "memory"
+    assert stats["hits"] == 2
+
+
+@pytest.mark.parametrize("route", ["/api/client_by_cpf", "/api/contracts"])
+def test_client_reads_support_conditional_get(db_client, auth_header, count_queries, route):
+    today = date.today()
+    _seed_overdue(today)
+    ana = Client.query.filter_by(name="Ana").one()
+    url = f"{route}?cpf={ana.cpf}"
+
+    first = db_client.get(url, headers=auth_header)
+    etag = first.headers["ETag"]
+    assert first.status_code == 200
+    assert "no-cache" in first.headers["Cache-Control"]
+
+    with count_queries() as statements:
+        resp = db_client.get(url, headers={**auth_header, "If-None-Match": etag})
+    assert resp.status_code == 304
+    assert resp.get_data() == b""
+    assert resp.headers["ETag"] == etag
+    assert len(statements) == 1  # apenas a busca do cliente pelo CPF
+
+    # Uma ação registrada para o cliente gera uma nova versão
+    db_client.post("/api/actions", json={"clientCpf": ana.cpf, "actionType": "SMS"}, headers=auth_header)
+    resp = db_client.get(url, headers={**auth_header, "If-None-Match": etag})
+    assert resp.status_code == 200
+    assert resp.headers["ETag"] != etag
+    assert resp.get_json() == first.get_json()
+
+
+def test_actions_batch_bumps_client_version(db_client, auth_header):
+    _seed_overdue(date.today())
+    ana = Client.query.filter_by(name="Ana").one()
+    etag = db_client.get(f"/api/client_by_cpf?cpf={ana.cpf}", headers=auth_header).headers["ETag"]
+
+    resp = db_client.post("/api/actions/batch", json=[{"clientCpf": ana.cpf, "actionType": "SMS"}],
+                          headers=auth_header)
+    assert resp.status_code == 201
+    resp = db_client.get(f"/api/client_by_cpf?cpf={ana.cpf}", headers={**auth_header, "If-None-Match": etag})
+    assert resp.status_code == 200
+
+
+def test_dashboard_single_round_trip(db_client, auth_header, count_queries):
+    today = date.today()
+    _seed_overdue(today)
+    ana = Client.query.filter_by(name="Ana").one()
+    db.session.add_all([
+        Action(client_id=ana.id, action_type="SMS", operator="op", timestamp=datetime.now()),
+        Action(client_id=ana.id, action_type="Ligação", operator="op", timestamp=datetime.now() - timedelta(days=2)),
+    ])
+    db.session.commit()
+
+    with count_queries() as statements:
+        resp = db_client.get("/api/dashboard?overdue_limit=2", headers=auth_header)
+    assert resp.status_code == 200
+    # BEGIN da transação de leitura, totais, top N, ações recentes com o cliente no mesmo
+    # SELECT e contagem do dia
+    assert statements[0] == "BEGIN"
+    assert len(statements) == 5
+
+    body = resp.get_json()
+    assert body["overdue"]["totals"] == {"count": 5, "amount": 3500.0, "clients": 2, "contracts": 2}
+    assert [item["daysOverdue"] for item in body["overdue"]["items"]] == [10, 30]
+    assert [action["actionType"] for action in body["recentActions"]] == ["SMS", "Ligação"]
+    assert body["recentActions"][0]["clientName"] == "Ana"
+    assert body["todayCount"] == 1
+
+
+def test_dashboard_sections_and_filters(db_client, auth_header):
+    _seed_overdue(date.today())
+
+    resp = db_client.get("/api/dashboard?sections=todayCount", headers=auth_header)
+    assert resp.get_json() == {"todayCount": 0}
+
+    resp = db_client.get("/api/dashboard?sections=overdue&contract_type=Crédito Rural&overdue_limit=0",
+                         headers=auth_header)
+    assert resp.get_json() == {"overdue": {"items": [], "totals": {
+        "count": 3, "amount": 3000.0, "clients": 1, "contracts": 1}}}
+
+    resp = db_client.get("/api/dashboard?sections=overdue,grafico", headers=auth_header)
+    assert resp.status_code == 400
+
+
+def test_client_workspace_constant_queries(db_client, auth_header, count_queries):
+    today = date.today()
+    _seed_overdue(today)
+    ana = Client.query.filter_by(name="Ana").one()
+    rural = Contract.query.filter_by(number="C-1").one()
+    extra = [Contract(number=f"C-1{n}", type="Conta Corrente", client=ana) for n in range(5)]
+    db.session.add_all(extra)
+    db.session.flush()
+    db.session.add_all([
+        Action(client_id=ana.id, contract_id=(rural if n % 2 else extra[n % 5]).id, installment_number=1,
+               action_type="SMS", operator="op", timestamp=datetime(2024, 1, 1) + timedelta(hours=n))
+        for n in range(30)
+    ])
+    db.session.commit()
+    url = f"/api/clients/{ana.cpf}/workspace"
+
+    with count_queries() as statements:
+        resp = db_client.get(f"{url}?actions_limit=10", headers=auth_header)
+    assert resp.status_code == 200
+    assert len(statements) == 3
+
+    body = resp.get_json()
+    assert body["client"]["name"] == "Ana"
+    assert [c["number"] for c in body["contracts"]] == ["C-1"] + [c.number for c in extra]
+    assert body["contracts"][0]["installmentCount"] == 4 and "installments" not in body["contracts"][0]
+    assert len(body["actions"]) == 10 and body["hasMoreActions"] is True
+    assert body["actions"][0]["timestamp"] == "2024-01-02T05:00:00"
+    # O histórico continua em /api/actions/<client_id> a partir do cursor do workspace
+    resp = db_client.get(f"/api/actions/{ana.id}?limit=5&cursor={body['nextActionsCursor']}", headers=auth_header)
+    assert resp.get_json()[0]["timestamp"] == "2024-01-01T19:00:00"
+    assert body["actions"][0]["contractNumber"] == "C-1"
+
+    resp = db_client.get(f"{url}?contract_id={rural.id}&actions_limit=15", headers=auth_header)
+    body = resp.get_json()
+    assert len(body["actions"]) == 15 and body["hasMoreActions"] is False
+    assert {a["contractNumber"] for a in body["actions"]} == {"C-1"}
+
+    etag = resp.headers["ETag"]
+    resp = db_client.get(f"{url}?contract_id={rural.id}&actions_limit=15",
+                         headers={**auth_header, "If-None-Match": etag})
+    assert resp.status_code == 304
+
+
+def test_client_workspace_not_found(db_client, auth_header):
+    assert db_client.get("/api/clients/000.111.222-85/workspace", headers=auth_header).status_code == 404
+
+
+def _read_sse_event(chunks):
+    raw = next(chunks)
+    raw = raw.decode() if isinstance(raw, bytes) else raw
+    if raw.startswith(":"):
+        return "comment", raw
+    name, data = raw.strip().split("\n")
+    return name.removeprefix("event: "), json.loads(data.removeprefix("data: "))
+
+
+def test_stream_actions_pushes_deltas(db_app, db_client, auth_header, monkeypatch):
+    _seed_overdue(date.today())
+    ana_cpf = Client.query.filter_by(name="Ana").one().cpf
+    db.session.add(Action(client_id=1, action_type="Visita", operator="op", timestamp=datetime.now()))
+    db.session.commit()
+    monkeypatch.setitem(db_app.config, "SSE_KEEPALIVE_SECONDS", 0.05)
+
+    token = auth_header["Authorization"].split()[1]
+    resp = db_client.get(f"/api/stream/actions?jwt={token}", buffered=False)
+    assert resp.status_code == 200
+    assert resp.mimetype == "text/event-stream"
+    chunks = iter(resp.response)
+
+    name, snapshot = _read_sse_event(chunks)
+    assert name == "snapshot"
+    assert snapshot["todayCount"] == 1
+    assert [a["actionType"] for a in snapshot["recentActions"]] == ["Visita"]
+
+    db_client.post("/api/actions", json={"clientCpf": ana_cpf, "actionType": "SMS"}, headers=auth_header)
+    name, event = _read_sse_event(chunks)
+    assert name == "actions"
+    assert event["todayCount"] == 2
+    assert [a["actionType"] for a in event["actions"]] == ["SMS"]
+    assert event["actions"][0]["clientName"] == "Ana"
+
+    db_client.post("/api/actions/batch", json=[
+        {"clientCpf": ana_cpf, "actionType": "Ligação"},
+        {"clientCpf": ana_cpf, "actionType": "E-mail", "timestamp": "2024-01-01T10:00:00"},
+    ], headers=auth_header)
+    name, event = _read_sse_event(chunks)
+    assert (event["created"], event["todayCount"]) == (2, 3)
+    assert [a["actionType"] for a in event["actions"]] == ["Ligação", "E-mail"]
+
+    assert _read_sse_event(chunks)[0] == "comment"
+    resp.close()
+    assert app_module.broker.subscriber_count() == 0
+
+
+def test_publish_failure_after_commit_keeps_success_status(db_client, auth_header, monkeypatch):
+    _seed_overdue(date.today())
+
+    def broken_publish(topic, message):
+        raise RuntimeError("broker fora do ar")
+
+    monkeypatch.setattr(app_module.broker, "publish", broken_publish)
+    # As ações já estão gravadas: um 500 faria o cliente reenviar e duplicar o lote
+    resp = db_client.post("/api/actions/batch", headers=auth_header, json=[
+        {"clientCpf": "111.444.777-35", "actionType": "SMS"},
+        {"clientCpf": "111.444.777-35", "actionType": "SMS", "timestamp": "2024-01-01T10:00:00"},
+    ])
+    assert resp.status_code == 201
+    resp = db_client.post("/api/actions", headers=auth_header,
+                          json={"clientCpf": "111.444.777-35", "actionType": "Ligação"})
+    assert resp.status_code == 201
+    assert Action.query.count() == 3
+
+
+def test_stream_actions_requires_token(db_client):
+    assert db_client.get("/api/stream/actions").status_code == 401
+
+
+@pytest.mark.parametrize("cpf", ["111.444.777-35", "11144477735", "111444777-35"])
+def test_cpf_lookups_ignore_formatting(db_client, auth_header, count_queries, cpf):
+    _seed_overdue(date.today())
+
+    with count_queries() as statements:
+        resp = db_client.get(f"/api/client_by_cpf?cpf={cpf}", headers=auth_header)
+    assert resp.get_json()["cpf"] == "111.444.777-35"
+    assert len(statements) == 1 and "client.cpf_digits = ?" in statements[0]
+
+    assert [c["number"] for c in db_client.get(f"/api/contracts?cpf={cpf}", headers=auth_header).get_json()] == ["C-1"]
+    assert db_client.get(f"/api/clients/{cpf}/workspace", headers=auth_header).status_code == 200
+    resp = db_client.post("/api/actions", json={"clientCpf": cpf, "actionType": "SMS", "contractNumber": "C-1"},
+                          headers=auth_header)
+    assert resp.status_code == 201
+    resp = db_client.post("/api/actions/batch", json=[{"clientCpf": cpf, "actionType": "SMS"}], headers=auth_header)
+    assert resp.status_code == 201
+
+
+@pytest.mark.parametrize("number", ["(62) 99999-1234", "+5562999991234", "062999991234", "62 9 9999 1234"])
+def test_client_by_phone_lookup(db_client, auth_header, count_queries, number):
+    _seed_overdue(date.today())
+
+    with count_queries() as statements:
+        resp = db_client.get("/api/clients/by_phone", query_string={"number": number}, headers=auth_header)
+    assert resp.status_code == 200
+    assert [(c["name"], c["phones"]) for c in resp.get_json()] == [("Ana", ["(62) 99999-1234"])]
+    # Busca pelo índice de client_phone.number e uma consulta IN para os telefones
+    assert len(statements) == 2 and "client_phone.number = ?" in statements[0]
+
+
+def test_client_by_phone_errors(db_client, auth_header):
+    _seed_overdue(date.today())
+
+    assert db_client.get("/api/clients/by_phone?number=(62) 98888-0000", headers=auth_header).status_code == 404
+    assert db_client.get("/api/clients/by_phone?number=1234", headers=auth_header).status_code == 400
+    assert db_client.get("/api/clients/by_phone", headers=auth_header).status_code == 400
@@ -44,21 +44,27 @@ def _auth_header():
 def test_get_clients_no_db(monkeypatch, client):
     # Faz patch de Client.query
     class _ClientQuery:
+        def options(self, *args):
+            return self
+        def order_by(self, *args):
+            return self
         def all(self):
             C = type("Client", (), {})
-            c1 = C(); c1.id = 1; c1.name = "Ana"; c1.cpf = "111"; c1.phones = "123,456"
-            c2 = C(); c2.id = 2; c2.name = "Bia"; c2.cpf = "222"; c2.phones = None
+            c1 = C(); c1.id = 1; c1.name = "Ana"; c1.cpf = "111"; c1.phones = ["(62) 99999-1234", "(62) 3333-5678"]
+            c2 = C(); c2.id = 2; c2.name = "Bia"; c2.cpf = "222"; c2.phones = []
             return [c1, c2]
 
     class _Client:
         query = _ClientQuery()
+        id = phone_numbers = None
 
     monkeypatch.setattr(app_module, "Client", _Client)
+    monkeypatch.setattr(app_module, "selectinload", lambda *args: None)
 
     resp = client.get("/api/clients", headers=_auth_header())
     assert resp.status_code == 200
     data = resp.get_json()
-    assert data[0]["phones"] == ["123", "456"]
+    assert data[0]["phones"] == ["(62) 99999-1234", "(62) 3333-5678"]
     assert data[1]["phones"] == []
 
 
@@ -69,31 +75,42 @@ def test_get_client_by_cpf_missing_param(monkeypatch, client):
 
 def test_get_client_by_cpf_found(monkeypatch, client):
     class _Query:
-        def filter_by(self, cpf):
+        def filter_by(self, cpf_digits):
             C = type("Client", (), {})
-            c = C(); c.id = 10; c.name = "Nina"; c.cpf = cpf; c.phones = "1,2"
-            return type("_", (), {"first": lambda self: c})()
+            c = C(); c.id = 10; c.name = "Nina"; c.cpf_digits = cpf_digits; c.version = 0
+            c.cpf = f"{cpf_digits[:3]}.{cpf_digits[3:6]}.{cpf_digits[6:9]}-{cpf_digits[9:]}"; c.phones = []
+            return type("_", (), {"one_or_none": lambda self: c})()
 
     class _Client:
-        query = type("Q", (), {"filter_by": lambda self, cpf=None: _Query().filter_by(cpf)})()
+        query = type("Q", (), {"filter_by": lambda self, cpf_digits=None: _Query().filter_by(cpf_digits),
+                               "options": lambda self, *args: self})()
+        phone_numbers = None
 
     monkeypatch.setattr(app_module, "Client", _Client)
+    monkeypatch.setattr(app_module, "joinedload", lambda *args: None)
 
-    resp = client.get("/api/client_by_cpf?cpf=999", headers=_auth_header())
+    # A busca usa só os dígitos, qualquer que seja a formatação recebida
+    resp = client.get("/api/client_by_cpf?cpf=99988877714", headers=_auth_header())
     assert resp.status_code == 200
-    assert resp.get_json()["cpf"] == "999"
+    assert resp.get_json()["cpf"] == "999.888.777-14"
 
 
 def test_get_client_by_cpf_not_found(monkeypatch, client):
     class _Query:
-        def filter_by(self, cpf):
-            return type("_", (), {"first": lambda self: None})()
+        def filter_by(self, cpf_digits):
+            return type("_", (), {"one_or_none": lambda self: None})()
 
     class _Client:
-        query = type("Q", (), {"filter_by": lambda self, cpf=None: _Query().filter_by(cpf)})()
+        query = type("Q", (), {"filter_by": lambda self, cpf_digits=None: _Query().filter_by(cpf_digits),
+                               "options": lambda self, *args: self})()
+        phone_numbers = None
 
     monkeypatch.setattr(app_module, "Client", _Client)
+    monkeypatch.setattr(app_module, "joinedload", lambda *args: None)
 
+    resp = client.get("/api/client_by_cpf?cpf=000.111.222-85", headers=_auth_header())
+    assert resp.status_code == 404
+    # CPF que não tem 11 dígitos nem chega ao banco
     resp = client.get("/api/client_by_cpf?cpf=000", headers=_auth_header())
     assert resp.status_code == 404
 
@@ -115,10 +132,20 @@ def test_contract_helpers_builders():
                 Inst(1, date(2024, 1, 1), 10.0),
                 Inst(2, date(2024, 1, 15), 20.0),
             ]
+            # Agregados persistidos no modelo real
+            self.total_amount = 30.0
+            self.installment_count = 2
+            self.earliest_due_date = date(2024, 1, 1)
 
     contract = Contract()
-    data = app_module._build_contract_data(contract, "123")
-    assert data["fineValue"] == pytest.approx(30.0 * 0.05)
+    # Regra padrão: multa de 2% e juros de 1% ao mês pro rata die (31 e 17 dias de atraso)
+    values = app_module.valuation.revalue_contracts([contract], as_of=date(2024, 2, 1))[contract.id]
+    data = app_module._build_contract_data(contract, "123", values)
+    assert data["fineValue"] == pytest.approx(0.6)
+    assert data["interestValue"] == pytest.approx(round(10.0 * 0.01 * 31 / 30 + 20.0 * 0.01 * 17 / 30, 2))
+    assert data["updatedValue"] == pytest.approx(30.82)
+    assert data["dueDate"] == "2024-01-01"
+    assert data["installmentCount"] == 2
     assert "installments" in data
 
 
@@ -201,6 +228,7 @@ def test_actions_endpoints_without_db(monkeypatch, client):
             self.timestamp = timestamp or datetime(2024, 1, 1, 10, 0, 0)
             self.client = type("C", (), {"name": "Nome", "cpf": "123"})()
             self.contract = type("K", (), {"number": "K-1"})()
+            self.contract_number = "K-1"
             self.installment_number = 1
 
     class _Client:
@@ -215,16 +243,18 @@ def test_actions_endpoints_without_db(monkeypatch, client):
 
     # Armazenamento em memória
     store = {
-        "clients": {"111": _Client(1, "Ana", "111")},
+        "clients": {"11144477735": _Client(1, "Ana", "111.444.777-35")},
         "contracts": { (1, "C-10"): _Contract(5, "C-10", 1) },
         "actions": []
     }
 
     # Stubs para interfaces de consulta (query)
     class _ClientQuery:
-        def filter_by(self, cpf=None):
-            c = store["clients"].get(cpf)
-            return type("_", (), {"first": lambda self: c})()
+        def options(self, *args):
+            return self
+        def filter_by(self, cpf_digits=None):
+            c = store["clients"].get(cpf_digits)
+            return type("_", (), {"one_or_none": lambda self: c})()
         def get_or_404(self, cid):
             c = next((v for v in store["clients"].values() if v.id == cid), None)
             if not c:
@@ -250,6 +280,8 @@ def test_actions_endpoints_without_db(monkeypatch, client):
             return _ActionQuery(sorted(self._items, key=lambda a: a.timestamp, reverse=True))
         def all(self):
             return list(self._items)
+        def options(self, *args):
+            return self
         def limit(self, n):
             return _ActionQuery(sorted(self._items, key=lambda a: a.timestamp, reverse=True)[:n])
         def count(self):
@@ -275,16 +307,21 @@ def test_actions_endpoints_without_db(monkeypatch, client):
             def desc(self):
                 return object()
         timestamp = _TimestampCol()
+        client = None
         query = _ActionQuery([])
         def __init__(self, **kwargs):
             a = _Action()
             for k, v in kwargs.items():
                 setattr(a, k, v)
             self._instance = a
+            # Valor padrão da coluna, que o atributo de classe acima esconderia
+            self.timestamp = a.timestamp
         def __getattr__(self, item):
             return getattr(self._instance, item)
 
     monkeypatch.setattr(app_module, "Action", _ActionModel)
+    # Os stubs não são entidades mapeadas; o carregamento antecipado não se aplica
+    monkeypatch.setattr(app_module, "joinedload", lambda *args, **kwargs: None)
 
     # Faz patch de db.session.add/commit para gravar no armazenamento em memória
     class _Sess:
@@ -303,12 +340,12 @@ def test_actions_endpoints_without_db(monkeypatch, client):
     assert r.status_code == 400
 
     # Criar ação: cliente não encontrado
-    r = client.post("/api/actions", json={"clientCpf": "999", "actionType": "Ligacao"}, headers=_auth_header())
+    r = client.post("/api/actions", json={"clientCpf": "999.888.777-14", "actionType": "Ligacao"}, headers=_auth_header())
     assert r.status_code == 404
 
     # Criar ação: com contrato
     r = client.post("/api/actions", json={
-        "clientCpf": "111",
+        "clientCpf": "111.444.777-35",
         "actionType": "Ligacao",
         "contractNumber": "C-10",
         "selectedInstallmentNumber": 2,
@@ -323,6 +360,8 @@ def test_actions_endpoints_without_db(monkeypatch, client):
     # Buscar ações por cliente
     # Pré-carrega a query com itens criados
     monkeypatch.setattr(_ActionModel, "query", _ActionQuery(store["actions"]))
+    monkeypatch.setattr(app_module, "_client_actions_query",
+                        lambda client_id, args, since=None: _ActionQuery(store["actions"]).order_by())
     r = client.get("/api/actions/1", headers=_auth_header())
     assert r.status_code == 200
     lst = r.get_json()
@@ -342,34 +381,3 @@ def test_actions_endpoints_without_db(monkeypatch, client):
     r = client.get("/api/actions/today_count", headers=_auth_header())
     assert r.status_code == 200
     assert "count" in r.get_json()
-
-
-def test_get_overdue_installments(monkeypatch, client):
-    class _Inst:
-        def __init__(self, id, number, due_date, amount, contract_number, client_name, client_cpf):
-            self.id = id; self.number = number; self.due_date = due_date; self.amount = amount
-            self.contract = type("K", (), {"number": contract_number, "client": type("C", (), {"name": client_name, "cpf": client_cpf})()})()
-
-    # Em atraso e não em atraso
-    today = date.today()
-    overdue = _Inst(1, 1, today.replace(day=max(1, today.day - 5)), 100.0, "C-1", "Ana", "111")
-    due2 = _Inst(2, 2, today, 200.0, "C-1", "Ana", "111")
-
-    class _Query:
-        def filter(self, *expr):
-            return type("_", (), {"all": lambda self: [overdue]})()
-
-    class _Installment:
-    # Emula o atributo de coluna usado na expressão de filtro com um stub comparável
-        class _DueDate:
-            def __lt__(self, other):
-                return ("lt", other)
-        due_date = _DueDate()
-        query = _Query()
-
-    monkeypatch.setattr(app_module, "Installment", _Installment)
-
-    r = client.get("/api/overdue_installments", headers=_auth_header())
-    assert r.status_code == 200
-    arr = r.get_json()
-    assert arr and arr[0]["clientName"] == "Ana"
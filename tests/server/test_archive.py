@@ -0,0 +1,189 @@
+import csv
+from datetime import date, datetime
+
+import pytest
+from sqlalchemy import create_engine, inspect
+
+import app as app_module
+from archive import archive_actions, archive_cutoff
+from models import db, Action, ActionArchive, Client, Contract
+
+CUTOFF = datetime(2025, 1, 1)
+
+
+def _seed():
+    """Cliente com 6 ações antigas (2024) e 3 recentes (2025), alternando com e sem contrato."""
+    client = Client(name="Ana Souza", cpf="111.444.777-35")
+    contract = Contract(number="C1", type="Empréstimo Pessoal", client=client)
+    db.session.add_all([client, contract])
+    db.session.flush()
+    timestamps = [datetime(2024, month, 1) for month in range(1, 7)] + \
+        [datetime(2025, month, 1) for month in range(1, 4)]
+    for index, timestamp in enumerate(timestamps):
+        db.session.add(Action(action_type=f"Ação {index}", timestamp=timestamp, operator="op",
+                              client_id=client.id, installment_number=index,
+                              contract_id=contract.id if index % 2 == 0 else None))
+    db.session.commit()
+    return client
+
+
+def _history(db_client, auth_header, client_id, query=""):
+    ids, cursor = [], None
+    while True:
+        url = f"/api/actions/{client_id}?limit=2{query}" + (f"&cursor={cursor}" if cursor else "")
+        response = db_client.get(url, headers=auth_header)
+        assert response.status_code == 200
+        ids += [action["id"] for action in response.get_json()]
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            return ids
+
+
+def test_archive_moves_old_actions_in_batches(db_app):
+    client = _seed()
+    batches = []
+    stats = archive_actions(CUTOFF, batch_size=4, progress=lambda s: batches.append(s["archived"]))
+
+    assert stats["archived"] == 6 and stats["batches"] == 2 and batches == [4, 6]
+    assert [a.timestamp.year for a in Action.query.order_by(Action.id)] == [2025] * 3
+    archived = ActionArchive.query.order_by(ActionArchive.id).all()
+    assert [a.id for a in archived] == [1, 2, 3, 4, 5, 6]
+    assert [a.contract_number for a in archived] == ["C1", None] * 3
+    assert all(a.archived_at is not None and a.client_id == client.id for a in archived)
+    # A versão muda uma vez por lote, o que troca o ETag do histórico
+    db.session.expire_all()
+    assert db.session.get(Client, client.id).version >= 2
+
+    assert archive_actions(CUTOFF, batch_size=4)["archived"] == 0
+
+
+def test_archive_keeps_newest_action_id(db_app):
+    _seed()
+    # Mesmo com todas as ações vencidas, a de maior id fica para o SQLite não reaproveitar o id
+    archive_actions(datetime(2030, 1, 1), batch_size=100)
+    assert [a.id for a in Action.query] == [9]
+    assert ActionArchive.query.count() == 8
+
+
+def test_archive_resumes_interrupted_batch(db_app, db_client, auth_header):
+    client = _seed()
+    expected = _history(db_client, auth_header, client.id)
+    # Simula uma execução interrompida entre a cópia e a remoção: as ações estão nas duas tabelas
+    archive_actions(CUTOFF, batch_size=3, max_batches=1)
+    db.session.execute(ActionArchive.__table__.insert(), [
+        {"id": action.id, "action_type": action.action_type, "timestamp": action.timestamp,
+         "operator": action.operator, "client_id": action.client_id, "archived_at": datetime.utcnow()}
+        for action in Action.query.filter(Action.id.in_([4, 5]))])
+    db.session.commit()
+
+    assert _history(db_client, auth_header, client.id, "&include_archived=1") == expected
+
+    assert archive_actions(CUTOFF, batch_size=3)["archived"] == 3
+    assert ActionArchive.query.count() == 6 and Action.query.count() == 3
+    assert _history(db_client, auth_header, client.id, "&include_archived=1") == expected
+
+
+def test_history_unions_archive_only_when_asked(db_app, db_client, auth_header):
+    client = _seed()
+    expected = _history(db_client, auth_header, client.id)
+    archive_actions(CUTOFF, batch_size=4)
+
+    # O cursor atravessa a fronteira entre a tabela quente e o arquivo
+    assert _history(db_client, auth_header, client.id) == expected[:3]
+    assert _history(db_client, auth_header, client.id, "&include_archived=1") == expected
+
+    response = db_client.get(f"/api/actions/{client.id}?include_archived=1&contract_id=1&limit=10",
+                             headers=auth_header)
+    assert [(a["id"], a["contractNumber"]) for a in response.get_json()] == [
+        (9, "C1"), (7, "C1"), (5, "C1"), (3, "C1"), (1, "C1")]
+
+    workspace = db_client.get("/api/clients/11144477735/workspace?actions_limit=4&include_archived=1",
+                              headers=auth_header).get_json()
+    assert [a["id"] for a in workspace["actions"]] == expected[:4]
+    assert workspace["hasMoreActions"] is True
+
+
+def test_export_includes_archived_actions(db_app, db_client, auth_header):
+    client = _seed()
+    archive_actions(CUTOFF, batch_size=4)
+
+    def exported(query):
+        response = db_client.get(f"/api/actions/{client.id}/export?format=csv{query}", headers=auth_header)
+        assert response.status_code == 200
+        rows = csv.reader(response.get_data().decode("utf-8-sig").splitlines(), delimiter=";")
+        return [row[1] for row in rows][1:]
+
+    assert exported("") == ["Ação 8", "Ação 7", "Ação 6"]
+    assert exported("&include_archived=1") == [f"Ação {index}" for index in range(8, -1, -1)]
+
+
+def test_history_without_archive_table(db_app, db_client, auth_header):
+    # Banco migrado sem `flask archive-init`: o arquivo ainda não existe
+    client = _seed()
+    ActionArchive.__table__.drop(db.engines[app_module.ARCHIVE_BIND])
+    expected = _history(db_client, auth_header, client.id)
+
+    assert _history(db_client, auth_header, client.id, "&include_archived=1") == expected
+    workspace = db_client.get("/api/clients/11144477735/workspace?include_archived=1", headers=auth_header)
+    assert workspace.status_code == 200
+    assert [a["id"] for a in workspace.get_json()["actions"]] == expected[:len(workspace.get_json()["actions"])]
+    export = db_client.get(f"/api/actions/{client.id}/export?format=csv&include_archived=1", headers=auth_header)
+    assert export.status_code == 200
+    assert len(export.get_data().decode("utf-8-sig").splitlines()) == len(expected) + 1
+
+    # O primeiro arquivamento cria a tabela
+    assert archive_actions(CUTOFF, batch_size=4)["archived"] == 6
+    assert _history(db_client, auth_header, client.id, "&include_archived=1") == expected
+
+
+def test_archive_reads_skip_replica(db_app, db_client, auth_header, tmp_path):
+    client = _seed()
+    archive_actions(CUTOFF, batch_size=10)
+    # Réplica vazia, mas com as tabelas: a tabela quente é lida nela (e não traz nada), o
+    # arquivo continua no seu próprio bind
+    engine = create_engine(f"sqlite:///{tmp_path / 'replica.db'}")
+    db.metadata.create_all(engine)
+    app_module.replicas.set_engine(engine)
+    try:
+        response = db_client.get(f"/api/actions/{client.id}?include_archived=1&limit=10", headers=auth_header)
+    finally:
+        app_module.replicas.set_engine(None)
+        engine.dispose()
+    assert [a["id"] for a in response.get_json()] == [6, 5, 4, 3, 2, 1]
+
+
+def test_archive_command(db_app):
+    _seed()
+    days = (date.today() - date(2025, 1, 1)).days
+    runner = app_module.app.test_cli_runner()
+    result = runner.invoke(args=["archive-actions", "--days", str(days), "--batch-size", "4",
+                                 "--max-batches", "1", "--pause", "0"])
+    assert result.exit_code == 0, result.output
+    assert "4 ações arquivadas em 1 lotes" in result.output
+    assert ActionArchive.query.count() == 4
+
+    result = runner.invoke(args=["archive-actions", "--days", str(days), "--pause", "0"])
+    assert result.exit_code == 0, result.output
+    assert "2 ações anteriores a 2025-01-01 arquivadas" in result.output
+    assert Action.query.count() == 3
+
+    result = runner.invoke(args=["archive-actions", "--days", "0"])
+    assert result.exit_code != 0 and "pelo menos 1 dia" in result.output
+
+
+def test_archive_init_command(db_app):
+    engine = db.engines[app_module.ARCHIVE_BIND]
+    ActionArchive.__table__.drop(engine)
+    assert not inspect(engine).has_table("action_archive")
+
+    runner = app_module.app.test_cli_runner()
+    for _ in range(2):
+        result = runner.invoke(args=["archive-init"])
+        assert result.exit_code == 0, result.output
+    assert inspect(engine).has_table("action_archive")
+
+
+def test_archive_cutoff():
+    assert archive_cutoff(30, today=date(2026, 3, 10)) == datetime(2026, 2, 8)
+    with pytest.raises(ValueError):
+        archive_cutoff(0)
@@ -0,0 +1,50 @@
+import threading
+import time
+
+from broker import RESYNC, MemoryBroker, SQLiteBroker
+
+
+def test_memory_broker_delivers_by_topic():
+    broker = MemoryBroker()
+    with broker.subscribe("actions") as actions, broker.subscribe("outro") as other:
+        broker.publish("actions", {"n": 1})
+        assert actions.get(timeout=0.1) == {"n": 1}
+        assert other.get(timeout=0.01) is None
+        assert broker.subscriber_count() == 2
+    assert broker.subscriber_count() == 0
+
+
+def test_memory_broker_slow_consumer_gets_resync():
+    broker = MemoryBroker(max_pending=2)
+    with broker.subscribe("actions") as subscription:
+        for n in range(3):
+            broker.publish("actions", {"n": n})
+        assert subscription.get(timeout=0.1) is RESYNC
+        assert subscription.get(timeout=0.01) is None
+
+
+def test_sqlite_broker_crosses_instances(tmp_path):
+    path = str(tmp_path / "events.db")
+    publisher = SQLiteBroker(path, poll_interval=0.01)
+    subscriber = SQLiteBroker(path, poll_interval=0.01)
+    publisher.publish("actions", {"n": 0})  # anterior à assinatura, não é entregue
+
+    with subscriber.subscribe("actions") as subscription:
+        timer = threading.Timer(0.05, publisher.publish, args=("actions", {"n": 1}))
+        timer.start()
+        start = time.monotonic()
+        assert subscription.get(timeout=2) == {"n": 1}
+        assert time.monotonic() - start < 1
+        publisher.publish("outro", {"n": 2})
+        assert subscription.get(timeout=0.05) is None
+        timer.join()
+
+
+def test_sqlite_broker_resync_after_retention(tmp_path):
+    path = str(tmp_path / "events.db")
+    broker = SQLiteBroker(path, poll_interval=0.01, retention=2)
+    with broker.subscribe("actions") as subscription:
+        for n in range(5):
+            broker.publish("actions", {"n": n})
+        assert subscription.get(timeout=0.1) is RESYNC
+        assert [subscription.get(timeout=0.1) for _ in range(2)] == [{"n": 3}, {"n": 4}]
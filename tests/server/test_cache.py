@@ -0,0 +1,84 @@
+import os
+
+import pytest
+from flask import Flask, jsonify
+
+from cache import MemoryCacheBackend, SQLiteCacheBackend, ResponseCache
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_memory_backend_ttl_and_lru():
+    clock = _Clock()
+    backend = MemoryCacheBackend(max_entries=2, clock=clock)
+    backend.set("a", 1, ttl=10)
+    backend.set("b", 2, ttl=10)
+    assert backend.get("a") == 1  # "a" passa a ser o mais recente
+    backend.set("c", 3, ttl=10)
+    assert backend.get("b") is None
+    assert (backend.get("a"), backend.get("c")) == (1, 3)
+
+    clock.now += 11
+    assert backend.get("a") is None
+    assert len(backend) == 1
+
+
+@pytest.mark.parametrize("make_backend", [
+    lambda tmp_path, clock: MemoryCacheBackend(clock=clock),
+    lambda tmp_path, clock: SQLiteCacheBackend(str(tmp_path / "cache.db"), clock=clock),
+], ids=["memory", "sqlite"])
+def test_backend_generations(tmp_path, make_backend):
+    backend = make_backend(tmp_path, _Clock())
+    assert backend.generation("actions") == 0
+    backend.bump("actions")
+    backend.bump("actions")
+    assert backend.generation("actions") == 2
+    assert backend.generation("portfolio") == 0
+
+
+def test_sqlite_backend_is_shared_between_instances(tmp_path):
+    clock = _Clock()
+    path = os.path.join(tmp_path, "cache.db")
+    worker_a = SQLiteCacheBackend(path, max_entries=2, clock=clock)
+    worker_b = SQLiteCacheBackend(path, max_entries=2, clock=clock)
+
+    worker_a.set("k", (b"body", "application/json", {}), ttl=5)
+    assert worker_b.get("k") == (b"body", "application/json", {})
+    worker_b.bump("actions")
+    assert worker_a.generation("actions") == 1
+
+    clock.now += 1
+    worker_a.set("k2", 2, ttl=5)
+    clock.now += 1
+    worker_a.set("k3", 3, ttl=5)
+    assert worker_b.get("k") is None  # menos recente, removida pelo LRU
+    clock.now += 10
+    assert worker_b.get("k3") is None
+
+
+def test_response_cache_decorator_and_invalidation():
+    app = Flask(__name__)
+    app.config["CACHE_BACKEND"] = "memory"
+    cache = ResponseCache(app)
+    calls = []
+
+    @app.route("/items")
+    @cache.cached(tags=("items",))
+    def items():
+        calls.append(1)
+        return jsonify(len(calls))
+
+    client = app.test_client()
+    assert client.get("/items").get_json() == 1
+    assert client.get("/items").get_json() == 1
+    assert client.get("/items?page=2").get_json() == 2
+
+    cache.invalidate("items")
+    assert client.get("/items").get_json() == 3
+    assert cache.stats() == {"backend": "memory", "entries": 3, "hits": 1, "misses": 3, "hitRatio": 0.25}
@@ -0,0 +1,64 @@
+import pytest
+from sqlalchemy import create_engine, text
+
+from config import Config, ProductionConfig, TestingConfig, get_config
+from database import configure_engine, engine_options, pool_options
+
+
+def _config(profile, **overrides):
+    config = {name: getattr(profile, name) for name in dir(profile) if name.isupper()}
+    config.update(overrides)
+    return config
+
+
+def test_get_config_profiles(monkeypatch):
+    monkeypatch.setenv("APP_ENV", "production")
+    assert get_config() is ProductionConfig
+    assert get_config("testing") is TestingConfig
+    with pytest.raises(ValueError, match="APP_ENV inválido"):
+        get_config("staging")
+
+
+def test_pool_options_skip_memory_sqlite():
+    config = _config(ProductionConfig)
+    assert pool_options("sqlite://", config) == {}
+    assert pool_options("sqlite:///:memory:", config) == {}
+    assert pool_options("sqlite:////tmp/app.db", config) == {
+        "pool_size": ProductionConfig.DB_POOL_SIZE,
+        "max_overflow": ProductionConfig.DB_MAX_OVERFLOW,
+        "pool_recycle": ProductionConfig.DB_POOL_RECYCLE,
+        "pool_pre_ping": True,
+    }
+    assert pool_options("sqlite:////tmp/app.db", config, pool_size=3)["pool_size"] == 3
+
+
+def test_engine_options_keep_explicit_settings():
+    config = _config(Config, SQLALCHEMY_DATABASE_URI="sqlite:////tmp/app.db",
+                     SQLALCHEMY_ENGINE_OPTIONS={"pool_size": 2, "echo": True})
+    options = engine_options(config)
+    assert options["pool_size"] == 2 and options["echo"] is True
+    assert options["max_overflow"] == Config.DB_MAX_OVERFLOW
+
+
+def test_sqlite_pragmas_applied_to_new_connections(tmp_path):
+    config = _config(ProductionConfig)
+    engine = create_engine(f"sqlite:///{tmp_path / 'app.db'}", **pool_options("sqlite:///x.db", config))
+    configure_engine(engine, config)
+    with engine.connect() as conn:
+        pragma = lambda name: conn.execute(text(f"PRAGMA {name}")).scalar()
+        assert pragma("journal_mode") == "wal"
+        assert pragma("busy_timeout") == ProductionConfig.SQLITE_BUSY_TIMEOUT
+        assert pragma("synchronous") == 1  # NORMAL
+        assert pragma("cache_size") == -ProductionConfig.SQLITE_CACHE_SIZE_KB
+        assert pragma("mmap_size") == ProductionConfig.SQLITE_MMAP_SIZE
+        assert pragma("temp_store") == 2  # MEMORY
+    engine.dispose()
+
+
+def test_memory_sqlite_skips_journal_mode():
+    config = _config(TestingConfig)
+    engine = create_engine("sqlite://")
+    configure_engine(engine, config)
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "memory"
+        assert conn.execute(text("PRAGMA busy_timeout")).scalar() == TestingConfig.SQLITE_BUSY_TIMEOUT
@@ -0,0 +1,141 @@
+import io
+from datetime import date
+
+import pytest
+from openpyxl import Workbook
+
+import app as app_module
+import importer
+from models import Client, Contract, Installment
+
+CSV_HEADER = "cpf;nome;telefones;contrato;tipo;parcela;vencimento;valor\n"
+
+
+def _csv(*lines):
+    return io.BytesIO((CSV_HEADER + "".join(line + "\n" for line in lines)).encode("utf-8"))
+
+
+def test_import_csv_creates_portfolio(db_app):
+    stats = importer.import_portfolio(_csv(
+        "111.444.777-35;Ana;(62) 99999-1234;C-1;Crédito Rural;1;15/01/2024;1.000,50",
+        "111.444.777-35;Ana;(62) 99999-1234;C-1;Crédito Rural;2;2024-02-15;1000,50",
+        "222.333.666-38;Bia;;C-2;Conta Corrente;1;10/03/2024;300",
+    ), "csv", chunk_size=2)
+
+    assert stats["rows"] == 3
+    assert (stats["clientsCreated"], stats["contractsCreated"], stats["installmentsCreated"]) == (2, 2, 3)
+    assert stats["rowsPerSecond"] > 0
+
+    contract = Contract.query.filter_by(number="C-1").one()
+    assert contract.client.cpf == "111.444.777-35"
+    assert (contract.total_amount, contract.installment_count, contract.earliest_due_date) == (
+        2001.0, 2, date(2024, 1, 15))
+    assert Client.query.filter_by(cpf="111.444.777-35").one().phones == ["(62) 99999-1234"]
+    assert Client.query.filter_by(cpf="222.333.666-38").one().phones == []
+
+
+def test_import_upserts_by_cpf_contract_and_installment(db_app):
+    importer.import_portfolio(_csv(
+        "111.444.777-35;Ana;;C-1;Crédito Rural;1;15/01/2024;100",
+    ), "csv")
+    stats = importer.import_portfolio(_csv(
+        "111.444.777-35;Ana Souza;(62) 3333-5678;C-1;Crédito Rural;1;15/01/2024;150",
+        "111.444.777-35;Ana Souza;(62) 3333-5678;C-1;Crédito Rural;2;15/02/2024;150",
+    ), "csv")
+
+    assert (stats["clientsCreated"], stats["clientsUpdated"]) == (0, 1)
+    assert (stats["contractsCreated"], stats["contractsUpdated"]) == (0, 0)
+    assert (stats["installmentsCreated"], stats["installmentsUpdated"]) == (1, 1)
+    assert Client.query.count() == 1
+    assert Client.query.one().name == "Ana Souza"
+    assert Client.query.one().phones == ["(62) 3333-5678"]
+    assert [i.amount for i in Installment.query.order_by(Installment.number)] == [150.0, 150.0]
+    assert Contract.query.one().total_amount == 300.0
+
+
+def test_import_xlsx_read_only(db_app):
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.append(["CPF", "Nome", "Contrato", "Tipo", "Parcela", "Vencimento", "Valor"])
+    sheet.append(["333.666.999-57", "Caio", "C-9", "Empréstimo Pessoal", 1, date(2024, 5, 1), 250.0])
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    buffer.seek(0)
+
+    stats = importer.import_portfolio(buffer, "xlsx")
+    assert stats["installmentsCreated"] == 1
+    assert Installment.query.one().due_date == date(2024, 5, 1)
+
+
+def test_import_reports_invalid_rows(db_app):
+    stats = importer.import_portfolio(_csv(
+        "111.444.777-35;Ana;;C-1;Crédito Rural;1;31/02/2024;100",
+        "111.444.777-35;Ana;;C-1;Crédito Rural;2;15/03/2024;abc",
+        "111.444.777-35;Ana;;C-1;Crédito Rural;3;15/04/2024;100",
+        "111.444.777-35;Ana;12345;C-1;Crédito Rural;4;15/05/2024;100",
+    ), "csv")
+
+    assert stats["rows"] == 1 and stats["rejected"] == 3
+    assert [error["line"] for error in stats["errors"]] == [2, 3, 5]
+    assert "Telefone inválido" in stats["errors"][2]["msg"]
+
+
+def test_import_rejects_missing_columns(db_app):
+    with pytest.raises(importer.ImportFormatError):
+        importer.import_portfolio(io.BytesIO(b"cpf,nome\n1,Ana\n"), "csv")
+
+
+def test_import_endpoint(db_client, auth_header):
+    data = {"file": (_csv("111.444.777-35;Ana;;C-1;Crédito Rural;1;15/01/2024;100"), "carteira.csv")}
+    resp = db_client.post("/api/import", data=data, headers=auth_header, content_type="multipart/form-data")
+    assert resp.status_code == 200
+    assert resp.get_json()["installmentsCreated"] == 1
+
+    resp = db_client.post("/api/import", data={"file": (io.BytesIO(b"x"), "carteira.pdf")},
+                          headers=auth_header, content_type="multipart/form-data")
+    assert resp.status_code == 400
+
+    resp = db_client.post("/api/import", data={}, headers=auth_header, content_type="multipart/form-data")
+    assert resp.status_code == 400
+
+
+def test_import_csv_in_cp1252(db_app):
+    # Padrão do Excel em pt-BR: CSV salvo em Windows-1252, e não em UTF-8
+    data = (CSV_HEADER + "529.982.247-25;João Conceição;;C-1;Crédito Rural;1;15/01/2024;100\n").encode("cp1252")
+    stats = importer.import_portfolio(io.BytesIO(data), "csv")
+    assert stats["rows"] == 1
+    assert Client.query.one().name == "João Conceição"
+    assert Contract.query.one().type == "Crédito Rural"
+
+
+def test_import_rejects_corrupt_xlsx(db_client, auth_header):
+    with pytest.raises(importer.ImportFormatError):
+        importer.import_portfolio(io.BytesIO(b"cpf;nome\n"), "xlsx")
+
+    resp = db_client.post("/api/import", data={"file": (io.BytesIO(b"PK\x03\x04quebrado"), "carteira.xlsx")},
+                          headers=auth_header, content_type="multipart/form-data")
+    assert resp.status_code == 400
+    assert "XLSX inválido" in resp.get_json()["msg"]
+
+
+def test_import_endpoint_clamps_chunk_size(db_client, auth_header, monkeypatch):
+    chunk_sizes = []
+    monkeypatch.setattr(app_module, "import_portfolio",
+                        lambda stream, file_format, chunk_size: chunk_sizes.append(chunk_size) or {})
+    for value in ("1000000000", "-5"):
+        data = {"file": (_csv(), "carteira.csv"), "chunk_size": value}
+        resp = db_client.post("/api/import", data=data, headers=auth_header, content_type="multipart/form-data")
+        assert resp.status_code == 200
+    assert chunk_sizes == [app_module.app.config["IMPORT_CHUNK_SIZE_MAX"], 1]
+
+
+def test_import_normalizes_and_validates_cpf(db_app):
+    stats = importer.import_portfolio(_csv(
+        "11144477735;Ana;;C-1;Crédito Rural;1;15/01/2024;100",
+        "111.444.777-35;Ana;;C-1;Crédito Rural;2;15/02/2024;100",
+        "123.456.789-00;Caio;;C-2;Crédito Rural;1;15/01/2024;100",
+    ), "csv")
+
+    assert (stats["rows"], stats["rejected"], stats["clientsCreated"]) == (2, 1, 1)
+    assert stats["errors"][0]["msg"].startswith("CPF inválido")
+    assert (Client.query.one().cpf, Client.query.one().cpf_digits) == ("111.444.777-35", "11144477735")
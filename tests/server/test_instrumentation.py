@@ -0,0 +1,118 @@
+import logging
+import re
+from datetime import date
+
+import pytest
+
+import app as app_module
+from instrumentation import Histogram
+from models import db, Client, Contract, Installment
+
+
+def _seed():
+    client = Client(name="Ana Souza", cpf="111.444.777-35")
+    contract = Contract(number="C1", type="Empréstimo Pessoal", client=client)
+    installment = Installment(number=1, due_date=date(2026, 1, 10), amount=100.0, contract=contract)
+    db.session.add_all([client, contract, installment])
+    db.session.commit()
+
+
+def _server_timing(response):
+    return {name: (float(dur), desc) for name, dur, desc in re.findall(
+        r'(\w+);dur=([\d.]+)(?:;desc="([^"]*)")?', response.headers["Server-Timing"])}
+
+
+@pytest.fixture
+def instrumentation():
+    instrumentation = app_module.instrumentation
+    yield instrumentation
+    instrumentation.slow_query_ms = app_module.app.config["SLOW_QUERY_MS"]
+
+
+def test_server_timing_header(db_client, auth_header, count_queries):
+    _seed()
+    with count_queries() as statements:
+        response = db_client.get("/api/contracts?cpf=11144477735", headers=auth_header)
+    assert response.status_code == 200
+    timing = _server_timing(response)
+    assert set(timing) == {"db", "auth", "serialize", "app", "total"}
+    assert timing["db"][1] == f"{len(statements)} SQL"
+    assert timing["auth"][0] > 0 and timing["serialize"][0] > 0
+    assert timing["total"][0] >= timing["db"][0] + timing["serialize"][0]
+
+
+def test_metrics_endpoint(db_client, auth_header, instrumentation):
+    _seed()
+    labels = ("GET", "/api/client_by_cpf")
+    before = instrumentation.duration.count(*labels)
+    for _ in range(2):
+        db_client.get("/api/client_by_cpf?cpf=11144477735", headers=auth_header)
+    db_client.get("/api/nao-existe")
+    assert instrumentation.duration.count(*labels) == before + 2
+    assert instrumentation.requests.value(*labels, "200") >= 2
+
+    response = db_client.get("/metrics")
+    assert response.status_code == 200 and response.mimetype == "text/plain"
+    body = response.get_data(as_text=True)
+    assert "# TYPE http_request_duration_seconds histogram" in body
+    assert f'http_request_duration_seconds_count{{method="GET",route="/api/client_by_cpf"}} {before + 2}' in body
+    assert 'http_request_sql_queries_bucket{method="GET",route="/api/client_by_cpf",le="+Inf"}' in body
+    assert 'route="<unmatched>",status="404"' in body
+
+
+def test_metrics_token(db_client, instrumentation, monkeypatch):
+    monkeypatch.setattr(instrumentation, "metrics_token", "segredo")
+    assert db_client.get("/metrics").status_code == 401
+    assert db_client.get("/metrics", headers={"Authorization": "Bearer outro"}).status_code == 401
+    response = db_client.get("/metrics", headers={"Authorization": "Bearer segredo"})
+    assert response.status_code == 200
+    assert "# TYPE http_requests_total counter" in response.get_data(as_text=True)
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = Histogram("latency_seconds", "Latência.", (0.1, 1.0), ("route",))
+    for value in (0.05, 0.5, 0.7, 3.0):
+        histogram.observe(value, '/a"b')
+    assert histogram.render()[2:] == [
+        'latency_seconds_bucket{route="/a\\"b",le="0.1"} 1',
+        'latency_seconds_bucket{route="/a\\"b",le="1.0"} 3',
+        'latency_seconds_bucket{route="/a\\"b",le="+Inf"} 4',
+        'latency_seconds_sum{route="/a\\"b"} 4.25',
+        'latency_seconds_count{route="/a\\"b"} 4',
+    ]
+
+
+def test_slow_query_log_with_plan(db_client, auth_header, instrumentation, caplog):
+    _seed()
+    instrumentation.slow_query_ms = 0.000001
+    with caplog.at_level(logging.WARNING, logger="instrumentation"):
+        db_client.get("/api/client_by_cpf?cpf=11144477735", headers=auth_header)
+    messages = [record.getMessage() for record in caplog.records]
+    assert any("FROM client" in message and "plano:" in message and "ix_client_cpf_digits" in message
+               for message in messages), messages
+
+
+def test_slow_query_log_omits_parameters_by_default(db_client, auth_header, instrumentation, monkeypatch,
+                                                   caplog):
+    _seed()
+    instrumentation.slow_query_ms = 0.000001
+    with caplog.at_level(logging.WARNING, logger="instrumentation"):
+        db_client.get("/api/client_by_cpf?cpf=11144477735", headers=auth_header)
+    messages = [record.getMessage() for record in caplog.records if "FROM client" in record.getMessage()]
+    assert messages and not any("11144477735" in message for message in messages)
+    assert "parâmetros: omitidos (1)" in messages[0]
+
+    caplog.clear()
+    monkeypatch.setattr(instrumentation, "slow_query_log_parameters", True)
+    with caplog.at_level(logging.WARNING, logger="instrumentation"):
+        db_client.get("/api/client_by_cpf?cpf=11144477735", headers=auth_header)
+    assert any("FROM client" in record.getMessage() and "11144477735" in record.getMessage()
+               for record in caplog.records)
+
+
+def test_slow_query_log_off_by_default(db_client, auth_header, caplog):
+    _seed()
+    assert app_module.app.config["SLOW_QUERY_MS"] == 0
+    with caplog.at_level(logging.WARNING, logger="instrumentation"):
+        db_client.get("/api/client_by_cpf?cpf=11144477735", headers=auth_header)
+    assert not caplog.records
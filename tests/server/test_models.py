@@ -28,16 +28,41 @@ def test_user_password_hash_and_check(monkeypatch):
 
 
 def test_client_repr():
-    c = Client(name="Bob", cpf="123.456.789-00", phones="111,222")
+    c = Client(name="Bob", cpf="123.456.789-09", phones="(62) 99999-1234,(62) 3333-5678")
     assert "Client" in repr(c)
     assert "Bob" in repr(c)
 
 
+def test_client_phones_are_stored_as_e164():
+    c = Client(name="Bob", cpf="123.456.789-09", phones="(62) 99999-1234, 062 3333-5678,62999991234")
+    assert [phone.number for phone in c.phone_numbers] == ["+5562999991234", "+556233335678"]
+    assert c.phones == ["(62) 99999-1234", "(62) 3333-5678"]
+
+    kept = c.phone_numbers[1]
+    c.phones = ["+55 62 3333-5678", "+1 415 555 0100"]
+    assert c.phone_numbers[0] is kept and kept.position == 0
+    assert c.phones == ["(62) 3333-5678", "+14155550100"]
+    with pytest.raises(ValueError):
+        c.phones = "99999"
+
+
+@pytest.mark.parametrize("raw", ["123.456.789-09", "12345678909", " 123 456 789 09 ", 12345678909])
+def test_client_cpf_is_normalized(raw):
+    c = Client(name="Bob", cpf=raw)
+    assert (c.cpf, c.cpf_digits) == ("123.456.789-09", "12345678909")
+
+
+@pytest.mark.parametrize("raw", ["123.456.789-00", "1234567890", "", None, "111.111.111-11", "00000000000"])
+def test_client_cpf_rejects_invalid(raw):
+    with pytest.raises(ValueError):
+        Client(name="Bob", cpf=raw)
+
+
 def test_contract_and_installment_repr_relationship_mock():
     # Cria um Contract e um Installment sem tocar em um BD real
     contract = Contract(number="C-001", type="Loan")
     # Anexa uma instância real de Client (mapeada pelo SQLAlchemy) para evitar erros de instrumentação
-    real_client = Client(name="Carol", cpf="000.000.000-00", phones=None)
+    real_client = Client(name="Carol", cpf="000.111.222-85", phones=None)
     contract.client = real_client
 
     inst = Installment(number=1, due_date=date(2024, 1, 1), amount=100.0)
@@ -50,9 +75,93 @@ def test_contract_and_installment_repr_relationship_mock():
 def test_action_repr_and_fields():
     action = Action(action_type="Ligacao", status="Concluída", notes="OK", operator="op1")
     # Anexa uma instância real de Client para que __repr__ acesse client.name
-    action.client = Client(name="Diego", cpf="111.111.111-11", phones=None)
+    action.client = Client(name="Diego", cpf="111.444.777-35", phones=None)
 
     assert "Action Ligacao" in repr(action)
     assert action.status == "Concluída"
     assert action.notes == "OK"
     assert action.operator == "op1"
+
+
+def test_contract_aggregates_follow_installment_writes(db_app):
+    db = models_module.db
+    client = Client(name="Eva", cpf="222.333.666-38", phones=None)
+    first = Contract(number="C-100", type="Loan", client=client)
+    second = Contract(number="C-200", type="Loan", client=client)
+    inst1 = Installment(contract=first, number=1, due_date=date(2024, 3, 1), amount=100.0)
+    inst2 = Installment(contract=first, number=2, due_date=date(2024, 2, 1), amount=50.0)
+    db.session.add_all([client, first, second, inst1, inst2])
+    db.session.commit()
+
+    assert (first.total_amount, first.installment_count, first.earliest_due_date) == (150.0, 2, date(2024, 2, 1))
+    assert (second.total_amount, second.installment_count, second.earliest_due_date) == (0.0, 0, None)
+
+    # Atualização de valor, sem commit: o flush já deixa os agregados corretos
+    inst1.amount = 200.0
+    db.session.flush()
+    assert first.total_amount == 250.0
+
+    # Parcela movida para outro contrato recalcula os dois
+    inst2.contract = second
+    db.session.commit()
+    assert (first.total_amount, first.installment_count, first.earliest_due_date) == (200.0, 1, date(2024, 3, 1))
+    assert (second.total_amount, second.installment_count, second.earliest_due_date) == (50.0, 1, date(2024, 2, 1))
+
+    db.session.delete(inst1)
+    db.session.commit()
+    assert (first.total_amount, first.installment_count, first.earliest_due_date) == (0.0, 0, None)
+
+
+def test_refresh_contract_aggregates_after_bulk_insert(db_app):
+    db = models_module.db
+    client = Client(name="Fabi", cpf="333.666.999-57", phones=None)
+    contract = Contract(number="C-300", type="Loan", client=client)
+    db.session.add_all([client, contract])
+    db.session.commit()
+
+    # Insert em lote não passa pelo flush do ORM; o recálculo é explícito
+    db.session.execute(Installment.__table__.insert(), [
+        {"contract_id": contract.id, "number": n, "due_date": date(2024, n, 10), "amount": 10.0}
+        for n in range(1, 4)
+    ])
+    models_module.refresh_contract_aggregates(db.session.connection(), [contract.id])
+    db.session.commit()
+
+    assert (contract.total_amount, contract.installment_count, contract.earliest_due_date) == (30.0, 3, date(2024, 1, 10))
+
+
+def test_client_version_follows_related_writes(db_app):
+    db = models_module.db
+    ana = Client(name="Ana", cpf="444.555.666-19", phones=None)
+    bia = Client(name="Bia", cpf="555.444.333-80", phones=None)
+    contract = Contract(number="C-400", type="Loan", client=ana)
+    db.session.add_all([ana, bia, contract])
+    db.session.commit()
+    assert (ana.version, bia.version) == (1, 0)  # contrato novo já conta como escrita
+
+    versions = lambda: (ana.version, bia.version)
+    steps = [
+        lambda: db.session.add(Installment(contract=contract, number=1, due_date=date(2024, 1, 1), amount=1.0)),
+        lambda: setattr(contract.installments[0], "amount", 2.0),
+        lambda: db.session.add(Action(client_id=ana.id, action_type="SMS", operator="op")),
+        lambda: setattr(ana, "phones", "(62) 3333-5678"),
+    ]
+    for expected, step in enumerate(steps, start=2):
+        step()
+        db.session.commit()
+        assert versions() == (expected, 0)
+
+    # Contrato trocando de cliente muda os dois
+    contract.client = bia
+    db.session.commit()
+    assert versions() == (6, 1)
+
+    # Flush sem alterações reais não muda a versão
+    bia.name = "Bia"
+    db.session.commit()
+    assert bia.version == 1
+
+    models_module.bump_client_versions(db.session.connection(), contract_ids=[contract.id])
+    db.session.commit()
+    db.session.expire_all()
+    assert versions() == (6, 2)
@@ -0,0 +1,37 @@
+import pytest
+
+from phones import format_phone, normalize_phone, parse_phones
+
+
+@pytest.mark.parametrize("raw,expected", [
+    ("(62) 99999-1234", "+5562999991234"),
+    ("62 3333-5678", "+556233335678"),
+    ("062 99999-1234", "+5562999991234"),
+    ("55 62 99999-1234", "+5562999991234"),
+    ("+55 (62) 99999-1234", "+5562999991234"),
+    ("+1 415 555 0100", "+14155550100"),
+    (6299991234, "+556299991234"),
+    ("99999-1234", None),
+    ("+12", None),
+    ("", None),
+    (None, None),
+])
+def test_normalize_phone(raw, expected):
+    assert normalize_phone(raw) == expected
+
+
+def test_parse_phones():
+    assert parse_phones("(62) 99999-1234, ,62999991234,(62) 3333-5678") == ["+5562999991234", "+556233335678"]
+    assert parse_phones(["+5562999991234", None]) == ["+5562999991234"]
+    assert parse_phones(None) == []
+    with pytest.raises(ValueError, match="Telefone inválido"):
+        parse_phones("(62) 99999-1234,1234")
+
+
+@pytest.mark.parametrize("number,expected", [
+    ("+5562999991234", "(62) 99999-1234"),
+    ("+556233335678", "(62) 3333-5678"),
+    ("+14155550100", "+14155550100"),
+])
+def test_format_phone(number, expected):
+    assert format_phone(number) == expected
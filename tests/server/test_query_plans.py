@@ -0,0 +1,104 @@
+"""Regressão de planos de consulta: nenhuma rota quente pode cair em full scan no SQLite.
+
+Cada rota é executada contra o banco em memória; todo SELECT emitido é repetido com
+`EXPLAIN QUERY PLAN` usando os mesmos parâmetros, e o teste falha se alguma tabela for
+lida com `SCAN <tabela>` sem índice.
+"""
+import re
+from datetime import date, datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from models import db, User, Client, Contract, Installment, Action
+
+FULL_SCAN = re.compile(r"^SCAN (\w+)$")
+# Subconsultas já limitadas por LIMIT, em que o SCAN percorre poucas linhas materializadas
+BOUNDED_SCANS = {"hits"}
+
+
+def _seed():
+    today = date.today()
+    user = User(username="op")
+    user.set_password("pw")
+    ana = Client(name="Ana", cpf="111.444.777-35", phones="(62) 99999-1234")
+    contract = Contract(number="C-1", type="Crédito Rural", client=ana)
+    db.session.add_all([user, ana, contract])
+    db.session.add_all([
+        Installment(contract=contract, number=n, due_date=today - timedelta(days=30 * n), amount=100.0)
+        for n in range(1, 4)
+    ])
+    db.session.flush()
+    db.session.add_all([
+        Action(client_id=ana.id, contract_id=contract.id, installment_number=1, action_type="Ligação",
+               status="Concluída", operator="op", timestamp=datetime.now() - timedelta(hours=h))
+        for h in range(3)
+    ])
+    db.session.commit()
+    return ana
+
+
+@pytest.fixture
+def captured_selects(db_app):
+    statements = []
+
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT") and not executemany:
+            statements.append((statement, parameters))
+
+    event.listen(db.engine, "before_cursor_execute", _before_cursor_execute)
+    yield statements
+    event.remove(db.engine, "before_cursor_execute", _before_cursor_execute)
+
+
+def _full_scans(statements):
+    scans = []
+    with db.engine.connect() as conn:
+        for statement, parameters in statements:
+            plan = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+            scans.extend((match.group(1), statement) for match in
+                         (FULL_SCAN.match(row[-1]) for row in plan)
+                         if match and match.group(1) not in BOUNDED_SCANS)
+    return scans
+
+
+ROUTES = [
+    ("GET", "/api/client_by_cpf?cpf=111.444.777-35", None),
+    ("GET", "/api/clients/search?q=ana", None),
+    ("GET", "/api/clients/by_phone?number=(62) 99999-1234", None),
+    ("GET", "/api/contracts?cpf=111.444.777-35", None),
+    ("GET", "/api/overdue_installments", None),
+    ("GET", "/api/overdue_installments?limit=2", None),
+    ("GET", "/api/overdue_installments?contract_type=Crédito Rural&min_amount=50&min_days_overdue=10", None),
+    ("GET", "/api/portfolio/aging", None),
+    ("GET", "/api/actions/{client_id}", None),
+    ("GET", "/api/actions/{client_id}?contract_id=1&installment_number=1", None),
+    ("GET", "/api/actions/{client_id}?limit=2&cursor=WyIyMDMwLTAxLTAxVDAwOjAwOjAwIiw5OTld", None),
+    ("GET", "/api/actions/{client_id}?since=2000-01-01T00:00:00", None),
+    ("GET", "/api/actions/{client_id}/export?format=csv", None),
+    ("GET", "/api/clients/111.444.777-35/workspace", None),
+    ("GET", "/api/overdue_installments/export?format=csv", None),
+    ("GET", "/api/actions/today_count", None),
+    ("GET", "/api/actions/recent", None),
+    ("GET", "/api/dashboard", None),
+    ("POST", "/api/actions", {"clientCpf": "111.444.777-35", "contractNumber": "C-1", "actionType": "SMS"}),
+    ("POST", "/api/login", {"username": "op", "password": "pw"}),
+    ("POST", "/api/register", {"username": "novo", "password": "pw"}),
+]
+
+
+@pytest.mark.parametrize("method,url,payload", ROUTES, ids=[f"{m} {u}" for m, u, _ in ROUTES])
+def test_route_queries_use_indexes(db_client, auth_header, captured_selects, method, url, payload):
+    client = _seed()
+    captured_selects.clear()
+
+    resp = db_client.open(url.format(client_id=client.id), method=method, json=payload, headers=auth_header)
+    assert resp.status_code < 400
+    assert captured_selects, "a rota deveria consultar o banco"
+    assert _full_scans(captured_selects) == []
+
+
+def test_detects_full_scan(db_app, captured_selects):
+    # Garante que a verificação realmente reprova consultas sem índice
+    Client.query.filter(Client.name == "Ana").all()
+    assert [table for table, _ in _full_scans(captured_selects)] == ["client"]
@@ -0,0 +1,116 @@
+import sqlite3
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+import app as app_module
+from models import db, Action, Client, User
+from replica import copy_database
+
+
+def _seed_primary():
+    db.session.add(Client(name="Ana Souza", cpf="111.444.777-35", phones="(62) 99999-1234"))
+    db.session.commit()
+
+
+@pytest.fixture
+def replica(db_app, tmp_path):
+    """Réplica em arquivo com o mesmo cliente sob outro nome, para saber qual banco respondeu."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'replica.db'}")
+    db.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add(Client(name="Ana Souza (réplica)", cpf="111.444.777-35"))
+        session.commit()
+    _seed_primary()
+    router = app_module.replicas
+    router.set_engine(engine)
+    yield router
+    router.set_engine(None)
+    engine.dispose()
+
+
+def _header(identity):
+    with app_module.app.app_context():
+        return {"Authorization": f"Bearer {app_module.create_access_token(identity=identity)}"}
+
+
+def _client_name(client, headers):
+    response = client.get("/api/client_by_cpf?cpf=11144477735", headers=headers)
+    assert response.status_code == 200
+    return response.get_json()["name"]
+
+
+def test_get_reads_from_replica(replica, db_client, auth_header):
+    assert _client_name(db_client, auth_header) == "Ana Souza (réplica)"
+
+
+def test_writes_go_to_primary_and_stick_reads(replica, db_client, auth_header, monkeypatch):
+    response = db_client.post("/api/actions", headers=auth_header, json={
+        "clientCpf": "111.444.777-35", "actionType": "Ligação"})
+    assert response.status_code == 201
+    assert Action.query.count() == 1
+
+    # Quem gravou lê do primário durante a janela; os demais continuam na réplica
+    assert _client_name(db_client, auth_header) == "Ana Souza"
+    assert _client_name(db_client, _header("outro")) == "Ana Souza (réplica)"
+
+    monkeypatch.setattr(replica, "sticky_seconds", 0)
+    db_client.post("/api/actions", headers=auth_header, json={
+        "clientCpf": "111.444.777-35", "actionType": "Ligação"})
+    assert _client_name(db_client, auth_header) == "Ana Souza (réplica)"
+
+
+def test_failed_write_does_not_stick(replica, db_client, auth_header):
+    response = db_client.post("/api/actions", headers=auth_header, json={
+        "clientCpf": "999.888.777-14", "actionType": "Ligação"})
+    assert response.status_code == 404
+    assert _client_name(db_client, auth_header) == "Ana Souza (réplica)"
+
+
+def test_empty_replica_falls_back_to_primary(db_app, db_client, auth_header, tmp_path):
+    _seed_primary()
+    engine = create_engine(f"sqlite:///{tmp_path / 'missing.db'}")
+    app_module.replicas.set_engine(engine)
+    try:
+        assert _client_name(db_client, auth_header) == "Ana Souza"
+        assert not app_module.replicas.healthy()
+    finally:
+        app_module.replicas.set_engine(None)
+
+
+def test_replica_error_falls_back_to_primary(db_app, db_client, auth_header, tmp_path):
+    _seed_primary()
+    # Réplica com schema incompleto: a consulta falha e a réplica sai de cena
+    engine = create_engine(f"sqlite:///{tmp_path / 'broken.db'}")
+    User.__table__.create(engine)
+    app_module.replicas.set_engine(engine)
+    try:
+        # A própria requisição que encontrou o erro é refeita no primário
+        assert _client_name(db_client, auth_header) == "Ana Souza"
+        assert not app_module.replicas.healthy()
+        assert _client_name(db_client, auth_header) == "Ana Souza"
+    finally:
+        app_module.replicas.set_engine(None)
+
+
+def test_sticky_user_skips_cache_filled_from_replica(replica, db_client, auth_header):
+    app_module.cache.clear()
+    count = lambda headers: db_client.get("/api/actions/today_count", headers=headers).get_json()["count"]
+    db_client.post("/api/actions", headers=auth_header, json={
+        "clientCpf": "111.444.777-35", "actionType": "Ligação"})
+
+    # Outro usuário lê da réplica atrasada e grava a resposta no cache depois da escrita
+    assert count(_header("outro")) == 0
+    assert count(auth_header) == 1
+    assert count(_header("outro")) == 0
+
+
+def test_copy_database(tmp_path):
+    primary, replica = tmp_path / "primary.db", tmp_path / "replica.db"
+    with sqlite3.connect(primary) as conn:
+        conn.execute("CREATE TABLE item (id INTEGER PRIMARY KEY)")
+        conn.execute("INSERT INTO item VALUES (1)")
+    copy_database(str(primary), str(replica))
+    with sqlite3.connect(replica) as conn:
+        assert conn.execute("SELECT id FROM item").fetchall() == [(1,)]
@@ -0,0 +1,85 @@
+import pytest
+
+from models import db, Client, ClientPhone
+from search import match_expression, search_clients
+
+
+@pytest.mark.parametrize("query,expected", [
+    ("ana", '"ana"*'),
+    ("  Ana  Sou ", '"Ana"* "Sou"*'),
+    ("123.456", '"123456"*'),
+    ("99999-1234", '"999991234"*'),
+    ('ana" OR cpf:1', '"ana"* "OR"* "cpf"* "1"*'),
+    ("a", None),
+    ("", None),
+])
+def test_match_expression(query, expected):
+    assert match_expression(query) == expected
+
+
+def _seed():
+    db.session.add_all([
+        Client(name="Ana Souza", cpf="111.444.777-35", phones="(62) 99999-1234"),
+        Client(name="Anabela Reis", cpf="222.333.666-38", phones=None),
+        Client(name="João Anastácio", cpf="123.456.789-09", phones="(11) 3333-5678,(62) 98888-0000"),
+    ])
+    db.session.commit()
+
+
+def test_search_by_name_cpf_and_phone(db_app):
+    _seed()
+    names = lambda query: [client.name for client in search_clients(query)]
+
+    assert names("ana sou") == ["Ana Souza"]
+    assert set(names("ana")) == {"Ana Souza", "Anabela Reis", "João Anastácio"}
+    assert names("joao") == ["João Anastácio"]  # sem acento
+    assert names("123.456") == ["João Anastácio"]
+    assert names("98888") == ["João Anastácio"]
+    assert names("99999-1234") == ["Ana Souza"]
+    assert names("(62) 9999") == ["Ana Souza"]
+    assert names("6298888") == ["João Anastácio"]
+    assert names("zzz") == []
+
+
+def test_search_index_follows_writes(db_app):
+    _seed()
+    ana = Client.query.filter_by(cpf_digits="11144477735").one()
+    ana.name = "Mariana Lima"
+    db.session.commit()
+    assert [client.name for client in search_clients("marian")] == ["Mariana Lima"]
+    assert search_clients("souza") == []
+
+    db.session.delete(ana)
+    db.session.commit()
+    assert search_clients("marian") == []
+
+    # Insert em lote (fora do ORM) também é indexado pelos triggers
+    db.session.execute(Client.__table__.insert(), [
+        {"name": "Bruno Dias", "cpf": "333.666.999-57", "cpf_digits": "33366699957"}])
+    db.session.commit()
+    assert [client.cpf for client in search_clients("bru")] == ["333.666.999-57"]
+
+
+def test_search_index_follows_phone_writes(db_app):
+    _seed()
+    joao = Client.query.filter_by(cpf_digits="12345678909").one()
+    joao.phones = "(62) 97777-1111"
+    db.session.commit()
+    assert [client.name for client in search_clients("97777")] == ["João Anastácio"]
+    assert search_clients("98888") == []
+
+    # Telefones gravados em lote também reindexam o cliente
+    db.session.execute(ClientPhone.__table__.insert(), [
+        {"client_id": joao.id, "number": "+5562966665555", "position": 1}])
+    db.session.commit()
+    assert [client.name for client in search_clients("96666")] == ["João Anastácio"]
+    assert [client.name for client in search_clients("97777")] == ["João Anastácio"]
+
+
+def test_search_endpoint(db_client, auth_header):
+    _seed()
+    resp = db_client.get("/api/clients/search?q=ana&limit=1", headers=auth_header)
+    assert resp.status_code == 200
+    assert len(resp.get_json()) == 1
+    assert set(resp.get_json()[0]) == {"id", "name", "cpf", "phones"}
+    assert db_client.get("/api/clients/search?q=", headers=auth_header).get_json() == []
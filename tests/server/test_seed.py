@@ -0,0 +1,88 @@
+from datetime import date
+
+import app as app_module
+from cpf import is_valid_cpf
+from models import db, Action, Client, ClientPhone, Contract, Installment, refresh_contract_aggregates
+from phones import normalize_phone
+from search import search_clients
+from seed import ensure_demo_clients, seed_portfolio, synthetic_cpf, synthetic_phone
+
+TODAY = date(2026, 3, 10)
+
+
+def _snapshot():
+    return (
+        [(c.id, c.name, c.cpf, c.phones) for c in Client.query.order_by(Client.id)],
+        [(c.id, c.number, c.type, c.total_amount) for c in Contract.query.order_by(Contract.id)],
+        [(i.id, i.due_date, i.amount) for i in Installment.query.order_by(Installment.id)],
+        [(a.id, a.action_type, a.timestamp, a.installment_number) for a in Action.query.order_by(Action.id)],
+    )
+
+
+def test_seed_counts_and_valid_data(db_app):
+    stats = seed_portfolio(30, contracts_per_client=2, installments=4, chunk_size=7, today=TODAY)
+    assert (stats["clients"], stats["contracts"], stats["installments"]) == (30, 60, 240)
+    assert Client.query.count() == 30 and Installment.query.count() == 240
+    assert stats["phones"] == ClientPhone.query.count() >= 30
+    assert stats["actions"] == Action.query.count()
+
+    for client in Client.query:
+        assert client.cpf_digits == synthetic_cpf(client.id) and is_valid_cpf(client.cpf_digits)
+        assert client.version == 0
+        assert client.phone_numbers[0].number == synthetic_phone(client.id)
+        assert all(normalize_phone(phone.number) == phone.number for phone in client.phone_numbers)
+
+    # Ações referenciam parcelas já vencidas do contrato
+    for action in Action.query.filter(Action.installment_number.isnot(None)):
+        installment = Installment.query.filter_by(contract_id=action.contract_id,
+                                                  number=action.installment_number).one()
+        assert installment.due_date < TODAY
+    assert [client.id for client in search_clients(synthetic_cpf(7))] == [7]
+
+
+def test_seed_precomputes_contract_aggregates(db_app):
+    seed_portfolio(10, contracts_per_client=3, installments=5, today=TODAY)
+    before = [(c.total_amount, c.installment_count, c.earliest_due_date)
+              for c in Contract.query.order_by(Contract.id)]
+    refresh_contract_aggregates(db.session.connection())
+    db.session.commit()
+    db.session.expire_all()
+    after = [(c.total_amount, c.installment_count, c.earliest_due_date)
+             for c in Contract.query.order_by(Contract.id)]
+    assert [(round(total, 2), count, due) for total, count, due in after] == before
+
+
+def test_seed_is_deterministic(db_app):
+    seed_portfolio(15, contracts_per_client=2, installments=3, seed=7, today=TODAY)
+    first = _snapshot()
+    db.drop_all()
+    db.create_all()
+    seed_portfolio(15, contracts_per_client=2, installments=3, seed=7, chunk_size=4, today=TODAY)
+    assert _snapshot() == first
+
+
+def test_seed_appends_after_existing_rows(db_app):
+    db.session.add(Client(name="Cliente Existente", cpf="123.456.789-09"))
+    db.session.commit()
+    seed_portfolio(5, contracts_per_client=1, installments=2, today=TODAY)
+    assert [client.id for client in Client.query.order_by(Client.id)] == [1, 2, 3, 4, 5, 6]
+
+
+def test_seed_command(db_app):
+    result = app_module.app.test_cli_runner().invoke(args=[
+        "seed", "--clients", "12", "--contracts-per-client", "1", "--installments", "3"])
+    assert result.exit_code == 0, result.output
+    assert "12 clientes" in result.output and "36 parcelas" in result.output
+    assert Client.query.count() == 12
+
+
+def test_demo_clients_coexist_with_synthetic_portfolio(db_app):
+    assert ensure_demo_clients() == 2
+    seed_portfolio(5, contracts_per_client=1, installments=2, today=TODAY)
+    assert ensure_demo_clients() == 0
+
+    maria = Client.query.filter_by(cpf_digits="12345678909").one()
+    contract = Contract.query.filter_by(number="123456789").one()
+    assert (maria.name, contract.client_id, contract.installment_count) == ("Maria Silva Santos", maria.id, 4)
+    assert contract.total_amount == 4 * 15420.50
+    assert Client.query.count() == 7
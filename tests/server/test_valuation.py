@@ -0,0 +1,146 @@
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+from sqlalchemy import create_engine
+
+import app as app_module
+
+from models import db, Client, Contract, Installment
+import valuation
+from valuation import ValuationEngine
+
+RULES = {
+    "default": {"fine": 0.02, "interest": 0.01, "correction": 0.0},
+    "Conta Corrente": {"fine": 0.05, "interest": 0.06, "correction": 0.0},
+    "Financiamento Veículo": {"fine": 0.02, "interest": 0.01, "correction": 0.01},
+}
+
+
+def _reference(amount, due_date, rule, as_of):
+    days = max((as_of - due_date).days, 0)
+    fine = amount * rule["fine"] if days else 0.0
+    interest = amount * rule["interest"] / 30 * days
+    correction = amount * ((1 + rule["correction"]) ** (days / 30) - 1)
+    return amount + fine + interest + correction
+
+
+def test_revalue_matches_per_installment_rules():
+    engine = ValuationEngine(RULES)
+    as_of = date(2024, 6, 30)
+    cases = [
+        (1000.0, date(2024, 6, 30), "Conta Corrente"),  # vence hoje: sem encargos
+        (1000.0, date(2024, 7, 15), "Conta Corrente"),  # a vencer
+        (1000.0, date(2024, 5, 31), "Conta Corrente"),
+        (500.0, date(2024, 3, 2), "Financiamento Veículo"),
+        (250.0, date(2023, 12, 1), "Tipo sem regra"),
+    ]
+    values = engine.revalue([c[0] for c in cases], [c[1] for c in cases],
+                            [engine.rule_index(c[2]) for c in cases], as_of)
+
+    expected = [_reference(amount, due, RULES.get(kind, RULES["default"]), as_of) for amount, due, kind in cases]
+    assert values["updated"] == pytest.approx(expected)
+    assert values["updated"][:2].tolist() == [1000.0, 1000.0]
+    assert values["fine"][2] == pytest.approx(50.0)
+    assert values["interest"][2] == pytest.approx(1000.0 * 0.06 / 30 * 30)
+    assert values["overdue"].tolist() == [False, False, True, True, True]
+
+
+def test_revalue_contracts_totals_per_contract():
+    engine = ValuationEngine(RULES)
+    inst = lambda amount, due: type("I", (), {"amount": amount, "due_date": due})()
+    contracts = [
+        type("C", (), {"id": 7, "type": "Conta Corrente",
+                       "installments": [inst(100.0, date(2024, 1, 1)), inst(100.0, date(2024, 3, 1))]})(),
+        type("C", (), {"id": 8, "type": "Crédito Rural", "installments": []})(),
+    ]
+    totals = engine.revalue_contracts(contracts, as_of=date(2024, 1, 31))
+    assert totals[7]["principal"] == 200.0
+    assert totals[7]["fine"] == pytest.approx(5.0)
+    assert totals[7]["updated"] == pytest.approx(200.0 + 5.0 + 100.0 * 0.06)
+    assert totals[8] == {field: 0.0 for field in ("principal", "fine", "interest", "correction", "updated")}
+
+
+def test_portfolio_valuation_matches_contracts(db_client, auth_header):
+    today = date.today()
+    ana = Client(name="Ana", cpf="111.444.777-35")
+    rural = Contract(number="C-1", type="Crédito Rural", client=ana)
+    conta = Contract(number="C-2", type="Conta Corrente", client=ana)
+    db.session.add_all([ana, rural, conta])
+    db.session.add_all([
+        Installment(contract=rural, number=1, due_date=today - timedelta(days=90), amount=1000.0),
+        Installment(contract=rural, number=2, due_date=today + timedelta(days=30), amount=1000.0),
+        Installment(contract=conta, number=1, due_date=today - timedelta(days=15), amount=300.0),
+    ])
+    db.session.commit()
+
+    resp = db_client.get("/api/portfolio/valuation", headers=auth_header)
+    assert resp.status_code == 200
+    data = resp.get_json()
+    assert data["asOf"] == today.isoformat()
+    assert set(data["byType"]) == {"Crédito Rural", "Conta Corrente"}
+    assert data["byType"]["Crédito Rural"]["installments"] == 2
+    assert data["byType"]["Crédito Rural"]["overdueInstallments"] == 1
+    assert data["totals"]["contracts"] == 2 and data["totals"]["principal"] == 2300.0
+
+    # A mesma regra vale para os contratos do cliente
+    contracts = db_client.get("/api/contracts?cpf=111.444.777-35", headers=auth_header).get_json()
+    assert sum(c["updatedValue"] for c in contracts) == pytest.approx(data["totals"]["updatedValue"], abs=0.01)
+    assert sum(c["fineValue"] for c in contracts) == pytest.approx(data["totals"]["fineValue"], abs=0.01)
+
+    resp = db_client.get("/api/portfolio/valuation?as_of=2000-01-01", headers=auth_header)
+    assert resp.get_json()["totals"]["updatedValue"] == 2300.0
+    assert db_client.get("/api/portfolio/valuation?as_of=ontem", headers=auth_header).status_code == 400
+
+
+def test_portfolio_valuation_rereads_after_write(db_client, auth_header):
+    contract = Contract(number="C-1", type="Crédito Rural", client=Client(name="Ana", cpf="111.444.777-35"))
+    db.session.add(Installment(contract=contract, number=1, due_date=date(2024, 1, 1), amount=100.0))
+    db.session.commit()
+
+    get = lambda as_of: db_client.get(f"/api/portfolio/valuation?as_of={as_of}", headers=auth_header).get_json()
+    assert get("2024-01-01")["totals"]["updatedValue"] == 100.0
+    assert get("2024-01-31")["totals"]["updatedValue"] == pytest.approx(100.0 + 2.0 + 1.0)
+
+    db.session.add(Installment(contract=contract, number=2, due_date=date(2024, 2, 1), amount=50.0))
+    db.session.commit()
+    assert get("2024-01-31")["totals"]["principal"] == 150.0
+
+
+def test_portfolio_columns_use_routing_and_instrumentation(db_app, count_queries, tmp_path):
+    contract = Contract(number="C-1", type="Crédito Rural", client=Client(name="Ana", cpf="111.444.777-35"))
+    db.session.add(Installment(contract=contract, number=1, due_date=date(2024, 1, 1), amount=100.0))
+    db.session.commit()
+
+    # Os SELECTs passam pelos eventos do engine (contagem e SQL lento da instrumentação)
+    with count_queries() as statements:
+        columns = valuation.PortfolioColumns.load(db.session)
+    assert len(columns.amounts) == 1
+    assert sum("FROM installment" in statement for statement in statements) == 1
+
+    # Num GET com réplica ativa (vazia, mas com as tabelas), a leitura é roteada para ela
+    engine = create_engine(f"sqlite:///{tmp_path / 'replica.db'}")
+    db.metadata.create_all(engine)
+    app_module.replicas.set_engine(engine)
+    try:
+        with db_app.test_request_context("/api/portfolio/valuation"):
+            db.session.remove()
+            assert len(valuation.PortfolioColumns.load(db.session).amounts) == 0
+    finally:
+        app_module.replicas.set_engine(None)
+        engine.dispose()
+
+
+def test_portfolio_valuation_empty(db_client, auth_header):
+    data = db_client.get("/api/portfolio/valuation", headers=auth_header).get_json()
+    assert data["byType"] == {} and data["totals"]["installments"] == 0
+
+
+def test_revalue_is_vectorized_over_large_arrays():
+    engine = ValuationEngine(RULES)
+    rng = np.random.default_rng(1)
+    size = 200000
+    due = np.datetime64("2024-01-01") + rng.integers(-720, 30, size)
+    values = engine.revalue(rng.uniform(100, 1000, size), due, rng.integers(0, 3, size), date(2024, 1, 1))
+    assert values["updated"].shape == (size,)
+    assert (values["updated"] >= values["principal"]).all()